@@ -0,0 +1,271 @@
+# adaptive_schedule.py - Decides when each listing is due for its next price check
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import (ADAPTIVE_STATE_FILE, ADAPTIVE_MIN_INTERVAL_HOURS, ADAPTIVE_MAX_INTERVAL_HOURS,
+                    ADAPTIVE_BACKOFF, ADAPTIVE_THRESHOLD_MARGIN, ADAPTIVE_HISTORY_DAYS,
+                    CHECK_INTERVAL_HOURS, SCHEDULER_JITTER)
+
+logger = logging.getLogger(__name__)
+
+VOLATILITY_WEIGHT = 0.3  # How much one price move counts in the running volatility (exponential average)
+PRICE_EPSILON = 0.005  # Differences smaller than this are rounding, not a price change
+
+
+def state_key(listing):
+    return f"{listing.product_id}|{listing.site}"
+
+
+class CheckPlanner:
+    """
+    Gives every listing its own check interval, learned from how its price behaves.
+    Like a doctor booking check-ups: steady patients come back in a few months, while anyone
+    whose readings are moving - or getting close to a worrying line - is seen again tomorrow.
+
+    A price change resets the listing to the minimum interval; every unchanged check stretches it
+    by ADAPTIVE_BACKOFF, but never beyond half the listing's observed time between changes (so a
+    price that moves every day is still seen at least twice a day) nor beyond the maximum - which is
+    capped at CHECK_INTERVAL_HOURS, so adapting only ever checks a listing more often. Listings
+    whose price is within reach of the product's target stay at the minimum interval, and when one
+    retailer suddenly drops a product's price, its other retailers are checked soon as well - sales
+    rarely come alone. State is kept in a small JSON file, so restarts don't forget what was learned.
+    """
+
+    def __init__(self, path=ADAPTIVE_STATE_FILE, min_interval_hours=ADAPTIVE_MIN_INTERVAL_HOURS,
+                 max_interval_hours=ADAPTIVE_MAX_INTERVAL_HOURS, backoff=ADAPTIVE_BACKOFF,
+                 threshold_margin=ADAPTIVE_THRESHOLD_MARGIN, jitter=SCHEDULER_JITTER):
+        self.path = path
+        self.min_interval = min_interval_hours * 3600
+        self.max_interval = max(min(max_interval_hours, CHECK_INTERVAL_HOURS) * 3600, self.min_interval)
+        self.backoff = backoff
+        self.threshold_margin = threshold_margin
+        self.jitter = jitter
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.listings = {}
+        self._load()
+
+    # --- state -----------------------------------------------------------------------------
+
+    def _load(self):
+        """Reads the state file; a missing or damaged file just means nothing has been learned yet."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.listings = json.load(file).get('listings', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable check schedule {self.path}: {e}")
+
+    def save(self):
+        """Writes the state to disk atomically, so a crash never leaves half a file behind."""
+        with self._lock:
+            if not self._dirty:
+                return
+            serialized = json.dumps({'listings': self.listings}, indent=2)
+            self._dirty = False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False,
+                                             suffix='.tmp', encoding='utf-8') as temp_file:
+                temp_file.write(serialized)
+            os.replace(temp_file.name, self.path)
+        except OSError as e:
+            logger.error(f"Could not save check schedule: {e}")
+
+    def _new_state(self, now, interval=None):
+        return {
+            'interval': interval or CHECK_INTERVAL_HOURS * 3600,
+            'next_due': now,  # Never seen before - check it straight away
+            'first_checked': None,
+            'last_checked': None,
+            'last_price': None,
+            'volatility': 0.0,  # Running average of the relative size of price moves
+            'changes': 0,
+            'checks': 0
+        }
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    # --- learning --------------------------------------------------------------------------
+
+    def seed_from_history(self, listings, rollups=None, days=ADAPTIVE_HISTORY_DAYS, now=None):
+        """
+        Gives listings the schedule has never seen a starting interval from their hourly rollups:
+        how often the price changed in the last `days` days, and by how much.
+        Listings without history start at CHECK_INTERVAL_HOURS.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            unseen = [listing for listing in listings if state_key(listing) not in self.listings]
+        if not unseen:
+            return 0
+
+        try:
+            if rollups is None:
+                from history_rollups import get_rollup_store
+                rollups = get_rollup_store()
+            since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            history = rollups.read_frame('hour', since=since)
+        except Exception as e:
+            logger.warning(f"Could not read history to seed the check schedule: {e}")
+            history = None
+
+        groups = {}
+        if history is not None and not history.empty:
+            groups = {key: group for key, group in history.groupby(['product', 'site'])}
+
+        seeded = 0
+        with self._lock:
+            for listing in unseen:
+                state = self._new_state(now)
+                group = groups.get((listing.product_id, listing.site))
+
+                if group is not None and len(group) > 1:
+                    # Moves inside an hour, plus moves between one hour's close and the next hour's open
+                    moved_within = (group['high'] - group['low']).abs() > PRICE_EPSILON
+                    moved_between = (group['open'] - group['close'].shift()).abs() > PRICE_EPSILON
+                    changes = int(moved_within.sum() + moved_between.sum())
+
+                    span = (group['timestamp'].iloc[-1] - group['timestamp'].iloc[0]).total_seconds() + 3600
+                    moves = group['close'].pct_change().abs()
+                    moves = moves[moves > 0]
+
+                    state.update({
+                        'first_checked': now - span,
+                        'last_price': float(group['close'].iloc[-1]),
+                        'volatility': float(moves.mean()) if len(moves) else 0.0,
+                        'changes': changes,
+                        'interval': self._clamp(span / changes / 2 if changes else self.max_interval)
+                    })
+                    seeded += 1
+
+                self.listings[state_key(listing)] = state
+            self._dirty = True
+
+        logger.info(f"Check schedule: {len(unseen)} new listings, {seeded} seeded from history")
+        return seeded
+
+    def _learn(self, state, price, threshold, now):
+        """
+        Folds one successful check into a listing's state. Returns True for a surprising drop -
+        a fall bigger than the listing's usual swing - which may mean a sale has started.
+        """
+        last_price = state['last_price']
+        changed = last_price is not None and abs(price - last_price) > PRICE_EPSILON
+        surprising_drop = False
+
+        if changed:
+            move = abs(price - last_price) / last_price
+            surprising_drop = price < last_price and move > 2 * state['volatility']
+            state['volatility'] = VOLATILITY_WEIGHT * move + (1 - VOLATILITY_WEIGHT) * state['volatility']
+            state['changes'] += 1
+            state['interval'] = self.min_interval
+        elif last_price is not None:
+            interval = state['interval'] * self.backoff
+            if state['changes'] and state['first_checked']:
+                # Check at least twice per observed change, like sampling a signal fast enough to see it
+                interval = min(interval, (now - state['first_checked']) / state['changes'] / 2)
+            state['interval'] = self._clamp(interval)
+
+        state['first_checked'] = state['first_checked'] or now
+        state['last_checked'] = now
+        state['last_price'] = price
+        state['checks'] += 1
+
+        interval = state['interval']
+        if threshold:
+            # Close enough that an ordinary move could carry it across the target (either way) - keep a close eye on it
+            gap = abs(price - threshold) / price
+            if gap <= self.threshold_margin + 2 * state['volatility']:
+                interval = self.min_interval
+
+        state['next_due'] = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return surprising_drop
+
+    def record_wave(self, listings, prices, catalog, now=None):
+        """
+        Learns from one wave: `listings` were checked, `prices` holds {(product_id, site): price}
+        for the ones that worked. Failed checks keep their interval and are tried again when it ends.
+        """
+        now = time.time() if now is None else now
+        dropped_products = set()
+
+        with self._lock:
+            for listing in listings:
+                state = self.listings.setdefault(state_key(listing), self._new_state(now))
+                price = prices.get(listing.key)
+
+                if price is None:
+                    state['next_due'] = now + state['interval']
+                    continue
+
+                threshold = catalog.product(listing.product_id).price_threshold
+                if self._learn(state, price, threshold, now):
+                    dropped_products.add(listing.product_id)
+
+            # A sudden drop at one retailer often means a sale everywhere - look at the others soon
+            for listing in catalog.listings:
+                if listing.product_id in dropped_products and listing.key not in prices:
+                    state = self.listings.get(state_key(listing))
+                    if state:
+                        state['next_due'] = min(state['next_due'], now + self.min_interval)
+
+            self._dirty = True
+
+        self.save()
+
+    # --- planning --------------------------------------------------------------------------
+
+    def due_listings(self, listings, now=None):
+        """The listings whose next check is due now (or within a few minutes, so waves aren't wasted)."""
+        now = time.time() if now is None else now
+        horizon = now + self.min_interval * self.jitter
+        with self._lock:
+            return [
+                listing for listing in listings
+                if state_key(listing) not in self.listings or self.listings[state_key(listing)]['next_due'] <= horizon
+            ]
+
+    def seconds_until_next_due(self, listings, now=None):
+        """How long until the earliest listing is due again (0 if one is due already)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            due_times = [
+                self.listings[state_key(listing)]['next_due'] if state_key(listing) in self.listings else now
+                for listing in listings
+            ]
+        return max(0.0, min(due_times) - now) if due_times else self.max_interval
+
+    def checks_per_day(self, listings):
+        """Expected checks per day with the current intervals - compare with the fixed schedule's."""
+        with self._lock:
+            return sum(
+                86400 / self.listings[state_key(listing)]['interval'] if state_key(listing) in self.listings
+                else 86400 / (CHECK_INTERVAL_HOURS * 3600)
+                for listing in listings
+            )
+
+
+_shared_planner = None
+_shared_planner_lock = threading.Lock()
+
+
+def get_check_planner():
+    """Returns the process-wide check planner, so every wave learns into the same schedule."""
+    global _shared_planner
+    with _shared_planner_lock:
+        if _shared_planner is None:
+            _shared_planner = CheckPlanner()
+        return _shared_planner
@@ -2,25 +2,28 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import threading
-import queue
 from datetime import datetime, timedelta
 import time
-import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import logging
-from main import PriceTracker  # Import your existing tracker
-from config import EMAIL_CONFIG, PRICE_THRESHOLD  # Import email config and threshold
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from refresh_service import RefreshService  # Wraps your existing tracker
+from storage import get_history_store
+from history_archive import query_history_frame
+from history_rollups import get_rollup_store
+from downsampling import choose_resolution, downsample_frame
+from catalog import get_catalog
+from notifier import get_notifier
+from deal_rules import get_deal_rules
+from config import CHART_WEBGL_THRESHOLD, DASHBOARD_POLL_SECONDS  # Import chart settings
+from logging_setup import setup_logging
+
+# Configure logging - the same queued JSON-lines log as the tracker (already running once main is
+# imported); the dashboard always logs at INFO
+setup_logging(verbose=True)
 logger = logging.getLogger(__name__)
 
 # Page configuration
 st.set_page_config(
-    page_title="G-Shock Price Tracker",
+    page_title="Price Tracker",
     page_icon="⌚",
     layout="wide",
     initial_sidebar_state="expanded"
@@ -62,181 +65,77 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
-if 'auto_refresh_active' not in st.session_state:
-    st.session_state.auto_refresh_active = False
-if 'last_refresh_time' not in st.session_state:
-    st.session_state.last_refresh_time = None
-if 'price_update_queue' not in st.session_state:
-    st.session_state.price_update_queue = queue.Queue()
-if 'background_thread' not in st.session_state:
-    st.session_state.background_thread = None
-
-# Title and description
-st.title("🔍 G-Shock GA-2100-1A1 Price Tracker")
-st.markdown("Real-time price monitoring across multiple e-commerce platforms")
+if 'seen_refresh_version' not in st.session_state:
+    st.session_state.seen_refresh_version = None
 
 # Sidebar controls
 st.sidebar.header("⚙️ Controls")
 
+# Product picker - only needed once the catalog tracks more than one product
+catalog = get_catalog()
+product_ids = list(catalog.products)
+if len(product_ids) > 1:
+    product_id = st.sidebar.selectbox(
+        "⌚ Product:",
+        options=product_ids,
+        key='selected_product',
+        format_func=lambda pid: catalog.products[pid].name
+    )
+else:
+    product_id = product_ids[0] if product_ids else None
+product = catalog.product(product_id)
+price_threshold = product.price_threshold
+
+# Title and description
+st.title(f"🔍 {product.name} Price Tracker")
+st.markdown("Real-time price monitoring across multiple e-commerce platforms")
+
 # Display current threshold info (read-only from config)
-st.sidebar.markdown(f"🎯 **Price Alert Threshold:** ₹{PRICE_THRESHOLD:,}")
+st.sidebar.markdown(f"🎯 **Price Alert Threshold:** ₹{price_threshold:,}")
 st.sidebar.markdown("*Threshold is managed in config.py*")
 
 
 # Email alert functionality
-def send_email_alert(alert_info):
+def send_email_alerts(alerts):
     """
     Sends email notifications when good deals are found.
     This is like having a friend call you when they spot a great sale.
-    """
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_CONFIG['email']
-        msg['To'] = EMAIL_CONFIG['email']
-        msg['Subject'] = f"🎯 G-Shock Deal Alert: {alert_info['site']}"
-
-        # Create a detailed email body
-        body = f"""
-Great news! Your G-Shock GA-2100-1A1 watch has hit a great price!
 
-🏪 Store: {alert_info['site']}
-💰 Current Price: ₹{alert_info['price']:,.2f}
-🎯 Your Target: ₹{PRICE_THRESHOLD:,.2f}
-📈 Historical Low: ₹{alert_info['historical_low']:,.2f}
-
-🔥 Alert Reason: {alert_info['reason']}
-
-⏰ Detected at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🛒 Ready to buy? Here's the link:
-{alert_info['url']}
-
-Happy shopping! 🎉
-
----
-This alert was sent by your automated G-Shock price tracker via Streamlit Dashboard.
-        """
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port']) as server:
-            server.starttls()
-            server.login(EMAIL_CONFIG['email'], EMAIL_CONFIG['password'])
-            server.send_message(msg)
-
-        logger.info(f"Email alert sent successfully for {alert_info['site']}")
-        st.success(f"📧 Email alert sent: {alert_info['site']} - ₹{alert_info['price']:,.2f}")
-        return True
-
-    except Exception as e:
-        logger.error(f"Failed to send email alert: {e}")
-        st.error(f"❌ Failed to send email alert: {e}")
-        return False
+    Alerts are queued with the shared notifier and sent in the background over one reused
+    SMTP connection (as a single digest when NOTIFIER_DIGEST is on). Returns how many were queued.
+    """
+    return get_notifier().send_alerts(alerts, sender="your automated price tracker via Streamlit Dashboard")
 
 
-# Check for deals and send alerts
-def check_for_deals_and_alert(current_prices):
+# Check for deals worth an alert
+def find_deals(catalog_prices):
     """
-    Analyzes current prices and determines if any warrant an alert.
-    Sends email notifications for good deals.
+    Analyzes a wave's prices ({(product_id, site): price}) with the DEAL_RULES and returns
+    the ones that warrant an alert; send_email_alerts sends them.
     """
-    if not current_prices:
-        return 0
-
-    # Load historical data to get lowest ever price
-    df = load_price_data()
-    historical_low = df['price'].min() if not df.empty else float('inf')
-
-    alerts_sent = 0
-
-    for site_name, price in current_prices.items():
-        alert_reasons = []
-
-        # Check if price is at or below threshold
-        if price <= PRICE_THRESHOLD:
-            alert_reasons.append(f"At/below your target of ₹{PRICE_THRESHOLD:,.2f}")
-
-        # Check if this is a new historical low
-        if price < historical_low:
-            alert_reasons.append("New historical low!")
-
-        # Check for significant drops (10% below historical average)
-        if historical_low != float('inf'):
-            if price < historical_low * 0.9:
-                alert_reasons.append("Significant price drop detected")
-
-        # If we have reasons to alert, send the notification
-        if alert_reasons:
-            from config import WATCH_SITES  # Import here to avoid circular imports
-
-            alert_info = {
-                'site': site_name,
-                'price': price,
-                'historical_low': historical_low,
-                'reason': ' | '.join(alert_reasons),
-                'url': WATCH_SITES.get(site_name, {}).get('url', 'N/A')
-            }
-
-            if send_email_alert(alert_info):
-                alerts_sent += 1
-
-    return alerts_sent
+    return get_deal_rules().find_deals(catalog_prices, get_catalog())
 
 
-# Background price fetching function
-def background_price_fetch():
+# One refresh service for the whole Streamlit process, shared by every open tab
+@st.cache_resource
+def get_refresh_service():
     """
-    Background function to fetch prices without blocking the UI.
-    Runs in a separate thread.
+    Creates the process-wide refresh service once. Scheduling and scraping happen there,
+    so N open tabs still mean one scrape per interval.
     """
-    tracker = PriceTracker()
-    try:
-        logger.info("Background price fetch started")
-        current_prices = tracker.get_all_current_prices()
-
-        if current_prices:
-            tracker.save_price_data(current_prices)
-
-            # Check for deals and send alerts
-            alerts_sent = check_for_deals_and_alert(current_prices)
-
-            # Put results in queue for main thread to pick up
-            st.session_state.price_update_queue.put({
-                'success': True,
-                'prices': current_prices,
-                'alerts_sent': alerts_sent,
-                'timestamp': datetime.now()
-            })
-            logger.info(f"Background fetch completed: {len(current_prices)} prices, {alerts_sent} alerts")
-        else:
-            st.session_state.price_update_queue.put({
-                'success': False,
-                'error': 'No prices retrieved',
-                'timestamp': datetime.now()
-            })
-
-    except Exception as e:
-        logger.error(f"Background price fetch error: {e}")
-        st.session_state.price_update_queue.put({
-            'success': False,
-            'error': str(e),
-            'timestamp': datetime.now()
-        })
-    finally:
-        tracker.cleanup()
+    return RefreshService(interval_minutes=60, deal_finder=find_deals, alert_callback=send_email_alerts)
 
 
 # Load historical data with proper error handling
 @st.cache_data(ttl=30)  # Cache for 30 seconds
-def load_price_data():
-    """Load price data from CSV file with comprehensive error handling."""
+def load_price_data(days_back=0, product_id=None):
+    """
+    Load one product's price data for the last days_back days (0 = all time) from the archive and the
+    history store. The filters are applied while reading, so older partitions and rows are never loaded.
+    """
     try:
-        # Check if file exists
-        if not os.path.exists('price_history.csv'):
-            return pd.DataFrame()
-
-        # Read the CSV file
-        df = pd.read_csv('price_history.csv')
+        since = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d %H:%M:%S') if days_back > 0 else None
+        df = query_history_frame(get_history_store(), since=since, product=catalog.product(product_id).product_id)
 
         # Check if dataframe is empty
         if df.empty:
@@ -247,18 +146,9 @@ def load_price_data():
         missing_columns = [col for col in required_columns if col not in df.columns]
 
         if missing_columns:
-            st.error(f"Missing columns in CSV: {missing_columns}")
+            st.error(f"Missing columns in price history: {missing_columns}")
             return pd.DataFrame()
 
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-        # Ensure price is numeric
-        df['price'] = pd.to_numeric(df['price'], errors='coerce')
-
-        # Remove rows with invalid prices
-        df = df.dropna(subset=['price'])
-
         return df
 
     except Exception as e:
@@ -266,53 +156,85 @@ def load_price_data():
         return pd.DataFrame()
 
 
-# Manual refresh function - refactored for better UX
-def manual_price_refresh():
+@st.cache_data(ttl=30)
+def load_chart_data(days_back=0, product_id=None):
     """
-    Manually refresh prices with better user feedback and error handling.
+    Chart-ready price data of one product for the last days_back days (0 = all time), at most CHART_POINT_BUDGET points.
+    Short ranges use individual checks, longer ones the hourly or daily rollups - with each bucket's
+    low and high, and downsampled by the lows, so a short-lived price drop inside a bucket still shows.
+    Returns (DataFrame, resolution).
     """
-    progress_placeholder = st.empty()
-    status_placeholder = st.empty()
+    resolution = choose_resolution(days_back)
+
+    try:
+        if resolution == 'raw':
+            return downsample_frame(load_price_data(days_back, product_id)), resolution
+
+        # The first read rolls up any history saved before the rollups existed
+        since = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d %H:%M:%S') if days_back > 0 else None
+        df = get_rollup_store().read_frame(resolution, since=since, product=catalog.product(product_id).product_id)
+        return downsample_frame(df, y_column='low'), resolution
+
+    except Exception as e:
+        st.error(f"Error loading chart data: {str(e)}")
+        return pd.DataFrame(), resolution
 
+
+@st.cache_data(ttl=30)
+def load_history_summary(product_id=None):
+    """Running min/max/count/sum and latest price per site for one product's whole history, without reading it."""
     try:
-        with progress_placeholder:
-            progress_bar = st.progress(0)
-            status_placeholder.info("🔄 Initializing price tracker...")
+        return get_history_store().get_aggregates(product_id)
+    except Exception as e:
+        st.error(f"Error loading price summary: {str(e)}")
+        return {'global': {'min': None, 'max': None, 'count': 0, 'sum': 0.0, 'last_price': None,
+                           'first_timestamp': None, 'last_timestamp': None}, 'sites': {}}
 
-        tracker = PriceTracker()
 
-        with progress_placeholder:
-            progress_bar.progress(20)
-            status_placeholder.info("🌐 Fetching prices from all sites...")
+def clear_data_caches():
+    """Forget cached history so the next render shows freshly saved prices."""
+    load_price_data.clear()
+    load_chart_data.clear()
+    load_history_summary.clear()
 
-        current_prices = tracker.get_all_current_prices()
 
-        with progress_placeholder:
-            progress_bar.progress(60)
-            status_placeholder.info("💾 Saving price data...")
+# Manual refresh function - refactored for better UX
+def manual_price_refresh():
+    """
+    Manually refresh prices with better user feedback and error handling.
+    Runs through the shared refresh service, so it never overlaps a scheduled refresh.
+    """
+    progress_placeholder = st.empty()
+    status_placeholder = st.empty()
+    service = get_refresh_service()
 
-        if current_prices:
-            tracker.save_price_data(current_prices)
+    with progress_placeholder:
+        progress_bar = st.progress(0)
 
-            with progress_placeholder:
-                progress_bar.progress(80)
-                status_placeholder.info("🔍 Checking for price alerts...")
+    def show_progress(percent, message):
+        progress_bar.progress(percent)
+        if percent == 100:
+            status_placeholder.success(message)
+        else:
+            status_placeholder.info(message)
 
-            # Check for deals and send alerts
-            alerts_sent = check_for_deals_and_alert(current_prices)
+    try:
+        result = service.refresh(progress=show_progress)
 
-            with progress_placeholder:
-                progress_bar.progress(100)
-                status_placeholder.success(f"✅ Successfully updated {len(current_prices)} prices!")
+        if result is None:
+            progress_placeholder.empty()
+            status_placeholder.info("⏳ A price refresh is already running - results will appear when it finishes.")
 
-            if alerts_sent > 0:
-                st.success(f"🎉 {alerts_sent} price alert(s) sent to your email!")
+        elif result['success']:
+            current_prices = {site: price for (pid, site), price in result['prices'].items() if pid == product.product_id}
+            if result['alerts_sent'] > 0:
+                st.success(f"🎉 {result['alerts_sent']} price alert(s) on their way to your email!")
 
-            # Update session state
-            st.session_state.last_refresh_time = datetime.now()
+            # This tab already knows about the new data - no need to be notified again
+            st.session_state.seen_refresh_version = service.version
 
             # Clear cache to force reload
-            load_price_data.clear()
+            clear_data_caches()
 
             # Show summary of fetched prices
             st.subheader("📋 Latest Prices Retrieved:")
@@ -321,23 +243,26 @@ def manual_price_refresh():
             cols = st.columns(min(3, len(sorted_prices)))
             for idx, (site, price) in enumerate(sorted_prices):
                 with cols[idx % len(cols)]:
-                    alert_emoji = "🚨" if price <= PRICE_THRESHOLD else "💰"
+                    alert_emoji = "🚨" if price <= price_threshold else "💰"
                     st.metric(
                         label=f"{alert_emoji} {site}",
                         value=f"₹{price:,.0f}",
-                        delta=f"₹{price - PRICE_THRESHOLD:,.0f}" if price > PRICE_THRESHOLD else "Below target!"
+                        delta=f"₹{price - price_threshold:,.0f}" if price > price_threshold else "Below target!"
                     )
 
-        else:
+        elif result['error'] == 'No prices retrieved':
             progress_placeholder.empty()
             status_placeholder.error("⚠️ No prices could be retrieved. Check your internet connection.")
 
+        else:
+            progress_placeholder.empty()
+            status_placeholder.error(f"❌ Error during price refresh: {result['error']}")
+
     except Exception as e:
         progress_placeholder.empty()
         status_placeholder.error(f"❌ Error during price refresh: {str(e)}")
         logger.error(f"Manual refresh error: {e}")
     finally:
-        tracker.cleanup()
         # Clear progress indicators after 3 seconds
         time.sleep(3)
         progress_placeholder.empty()
@@ -351,101 +276,107 @@ if st.sidebar.button("🔄 Refresh Prices Now", type="primary"):
 st.sidebar.markdown("---")
 st.sidebar.subheader("🤖 Auto-Refresh Settings")
 
-# Auto-refresh toggle
+refresh_service = get_refresh_service()
+interval_options = [30, 60, 120, 180, 360]  # 30 min, 1h, 2h, 3h, 6h
+
+
+def apply_refresh_settings():
+    """Only a tab whose controls were actually changed updates the shared service."""
+    refresh_service.configure(st.session_state.auto_refresh_enabled, st.session_state.refresh_interval_minutes)
+
+
+# Show the shared settings - another tab may have changed them
+st.session_state.auto_refresh_enabled = refresh_service.enabled
+st.session_state.refresh_interval_minutes = (
+    int(refresh_service.interval_minutes) if refresh_service.interval_minutes in interval_options else 60
+)
+
+# Auto-refresh toggle - shared by every open tab, since they share one refresh service
 auto_refresh_enabled = st.sidebar.checkbox(
     "🔄 Enable Auto-refresh",
-    value=st.session_state.auto_refresh_active,
-    help="Automatically refresh prices every hour"
+    key='auto_refresh_enabled',
+    on_change=apply_refresh_settings,
+    help="Automatically refresh prices in the background (for every open tab)"
 )
 
 # Auto-refresh interval
 refresh_interval_minutes = st.sidebar.selectbox(
     "⏰ Refresh Interval:",
-    options=[30, 60, 120, 180, 360],  # 30 min, 1h, 2h, 3h, 6h
-    index=1,  # Default to 60 minutes
+    options=interval_options,
+    key='refresh_interval_minutes',
+    on_change=apply_refresh_settings,
     format_func=lambda x: f"{x} minutes" if x < 60 else f"{x // 60} hour{'s' if x // 60 > 1 else ''}",
     help="How often to automatically refresh prices"
 )
 
-# Update session state
-st.session_state.auto_refresh_active = auto_refresh_enabled
+# A tab that just opened has nothing to catch up on
+if st.session_state.seen_refresh_version is None:
+    st.session_state.seen_refresh_version = refresh_service.version
 
-# Auto-refresh logic with proper thread management
-if auto_refresh_enabled:
-    if st.session_state.last_refresh_time is None:
-        st.session_state.last_refresh_time = datetime.now()
 
-    # Calculate time until next refresh
-    next_refresh_time = st.session_state.last_refresh_time + timedelta(minutes=refresh_interval_minutes)
-    time_until_refresh = next_refresh_time - datetime.now()
+@st.fragment(run_every=timedelta(seconds=DASHBOARD_POLL_SECONDS))
+def refresh_status_panel():
+    """
+    Re-runs on its own every few seconds - only this small panel, never the whole page.
+    When the shared service has saved new prices, the page is reloaded once to show them.
+    """
+    service = get_refresh_service()
+
+    if service.version != st.session_state.seen_refresh_version:
+        st.session_state.seen_refresh_version = service.version
+        clear_data_caches()
+        st.rerun()
 
-    # Display countdown
-    if time_until_refresh.total_seconds() > 0:
+    if service.is_refreshing:
+        st.info("🔄 Fetching prices in the background...")
+    elif service.next_refresh_at:
+        time_until_refresh = max(service.next_refresh_at - datetime.now(), timedelta(0))
         hours, remainder = divmod(int(time_until_refresh.total_seconds()), 3600)
         minutes, seconds = divmod(remainder, 60)
 
-        st.sidebar.markdown(f"""
+        st.markdown(f"""
         <div class="countdown-display">
             🕒 Next refresh in:<br>
             <strong>{hours:02d}:{minutes:02d}:{seconds:02d}</strong>
         </div>
         """, unsafe_allow_html=True)
 
-        # Check if we have queued results from background thread
-        try:
-            if not st.session_state.price_update_queue.empty():
-                result = st.session_state.price_update_queue.get_nowait()
-                if result['success']:
-                    st.sidebar.success(f"🔄 Auto-updated {len(result['prices'])} prices!")
-                    if result['alerts_sent'] > 0:
-                        st.sidebar.success(f"📧 {result['alerts_sent']} alert(s) sent!")
-                    st.session_state.last_refresh_time = result['timestamp']
-                    load_price_data.clear()  # Clear cache
-                else:
-                    st.sidebar.error(f"Auto-refresh failed: {result['error']}")
-        except queue.Empty:
-            pass
-
-    else:
-        # Time to refresh
-        if (st.session_state.background_thread is None or
-                not st.session_state.background_thread.is_alive()):
-            st.sidebar.info("🔄 Starting background price fetch...")
-            st.session_state.background_thread = threading.Thread(
-                target=background_price_fetch,
-                daemon=True
-            )
-            st.session_state.background_thread.start()
+    result = service.last_result
+    if result:
+        last_refresh_str = result['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+        if result['success']:
+            st.success(f"🔄 Updated {len(result['prices'])} prices at {last_refresh_str}")
+            if result['alerts_sent'] > 0:
+                st.success(f"📧 {result['alerts_sent']} alert(s) queued!")
+        else:
+            st.error(f"Last refresh failed ({last_refresh_str}): {result['error']}")
 
-        # Auto-rerun every 5 seconds to update countdown and check for results
-        time.sleep(5)
-        st.rerun()
 
-else:
-    # Auto-refresh is disabled
-    if st.session_state.last_refresh_time:
-        last_refresh_str = st.session_state.last_refresh_time.strftime('%Y-%m-%d %H:%M:%S')
-        st.sidebar.info(f"🕒 Last refresh: {last_refresh_str}")
+with st.sidebar:
+    refresh_status_panel()
 
-# Load the data
-df = load_price_data()
+# Load the summary - the history itself is only read for the selected chart period
+summary = load_history_summary(product.product_id)
 
 # Main dashboard
-if not df.empty:
+if summary['global']['count'] > 0:
     st.header("📊 Current Prices")
 
     # Get latest prices for each site
     try:
-        latest_prices = df.groupby('site').last().reset_index()
-        latest_prices = latest_prices.sort_values('price')
+        latest_prices = pd.DataFrame([
+            {'site': site, 'price': stats['last_price'], 'timestamp': stats['last_timestamp']}
+            for site, stats in summary['sites'].items()
+        ])
+        latest_prices = latest_prices.sort_values('price').reset_index(drop=True)
 
         # Display current prices in columns
         cols = st.columns(min(4, len(latest_prices)))
         for idx, row in latest_prices.iterrows():
             with cols[idx % len(cols)]:
-                price_color = "🟢" if row['price'] <= PRICE_THRESHOLD else "🔴"
-                delta_text = f"vs ₹{PRICE_THRESHOLD:,}" if row[
-                                                               'price'] <= PRICE_THRESHOLD else f"+₹{row['price'] - PRICE_THRESHOLD:,.0f} over target"
+                price_color = "🟢" if row['price'] <= price_threshold else "🔴"
+                delta_text = f"vs ₹{price_threshold:,}" if row[
+                                                               'price'] <= price_threshold else f"+₹{row['price'] - price_threshold:,.0f} over target"
 
                 st.metric(
                     label=f"{price_color} {row['site']}",
@@ -464,7 +395,7 @@ if not df.empty:
             <div class="price-alert">
                 <h4>🏆 Best Current Deal</h4>
                 <p><strong>{best_deal['site']}</strong> - ₹{best_deal['price']:,.0f}</p>
-                <p>{'🚨 Below your target!' if best_deal['price'] <= PRICE_THRESHOLD else '⏳ Still above target'}</p>
+                <p>{'🚨 Below your target!' if best_deal['price'] <= price_threshold else '⏳ Still above target'}</p>
             </div>
             """, unsafe_allow_html=True)
 
@@ -491,31 +422,44 @@ if not df.empty:
                 index=2  # Default to 30 days
             )
 
-        # Filter data based on selection
-        if days_back > 0:
-            cutoff_date = datetime.now() - timedelta(days=days_back)
-            chart_df = df[df['timestamp'] >= cutoff_date]
-        else:
-            chart_df = df
+        # Only the selected period is read, at a resolution that suits its length
+        chart_df, resolution = load_chart_data(days_back, product.product_id)
 
         if not chart_df.empty:
-            # Create interactive plot
+            resolution_label = {'raw': '', 'hour': ' · hourly close, shaded from low to high',
+                                'day': ' · daily close, shaded from low to high'}
+            hover_data = {'price': ':,.0f'}
+            if resolution != 'raw':
+                hover_data.update({'low': ':,.0f', 'high': ':,.0f'})
+
+            # Create interactive plot - WebGL keeps large charts smooth in the browser
             fig = px.line(
                 chart_df,
                 x='timestamp',
                 y='price',
                 color='site',
-                title=f"Price Trends {'(Last ' + str(days_back) + ' days)' if days_back > 0 else '(All Time)'}",
+                title=f"Price Trends {'(Last ' + str(days_back) + ' days)' if days_back > 0 else '(All Time)'}"
+                      f"{resolution_label[resolution]}",
                 labels={'price': 'Price (₹)', 'timestamp': 'Date & Time'},
-                hover_data={'price': ':,.0f'}
+                hover_data=hover_data,
+                render_mode='webgl' if len(chart_df) > CHART_WEBGL_THRESHOLD else 'auto'
             )
 
+            if resolution != 'raw':
+                # Each site's low-high band behind its closing line, so drops within an hour or day stay visible
+                for trace in list(fig.data):
+                    site_df = chart_df[chart_df['site'] == trace.name].sort_values('timestamp')
+                    band = dict(x=site_df['timestamp'], mode='lines', line=dict(width=0, color=trace.line.color),
+                                legendgroup=trace.legendgroup, showlegend=False, hoverinfo='skip')
+                    fig.add_trace(go.Scatter(y=site_df['high'], **band))
+                    fig.add_trace(go.Scatter(y=site_df['low'], fill='tonexty', opacity=0.2, **band))
+
             # Add threshold line
             fig.add_hline(
-                y=PRICE_THRESHOLD,
+                y=price_threshold,
                 line_dash="dash",
                 line_color="red",
-                annotation_text=f"Target: ₹{PRICE_THRESHOLD:,}",
+                annotation_text=f"Target: ₹{price_threshold:,}",
                 annotation_position="bottom right"
             )
 
@@ -543,44 +487,49 @@ if not df.empty:
 
         with col1:
             st.subheader("💰 Price Analysis")
-            st.write(f"**Lowest Ever:** ₹{df['price'].min():,.0f}")
-            st.write(f"**Highest Ever:** ₹{df['price'].max():,.0f}")
+            st.write(f"**Lowest Ever:** ₹{summary['global']['min']:,.0f}")
+            st.write(f"**Highest Ever:** ₹{summary['global']['max']:,.0f}")
             st.write(f"**Current Average:** ₹{latest_prices['price'].mean():,.0f}")
 
             # Show how many sites are below threshold
-            below_threshold = len(latest_prices[latest_prices['price'] <= PRICE_THRESHOLD])
+            below_threshold = len(latest_prices[latest_prices['price'] <= price_threshold])
             st.write(f"**Below Target:** {below_threshold}/{len(latest_prices)} sites")
 
         with col2:
             st.subheader("🏪 Site Performance")
-            avg_by_site = df.groupby('site')['price'].mean().sort_values()
+            avg_by_site = pd.Series({
+                site: stats['sum'] / stats['count'] for site, stats in summary['sites'].items() if stats['count']
+            }).sort_values()
             st.write("**Best Average Prices:**")
             for site, price in avg_by_site.head(3).items():
                 st.write(f"• {site}: ₹{price:,.0f}")
 
         with col3:
             st.subheader("📊 Tracking Stats")
-            st.write(f"**Total Records:** {len(df):,}")
-            st.write(f"**Sites Monitored:** {df['site'].nunique()}")
-            days_tracked = (df['timestamp'].max() - df['timestamp'].min()).days + 1
-            st.write(f"**Days Tracked:** {days_tracked}")
-            st.write(f"**Last Updated:** {df['timestamp'].max().strftime('%Y-%m-%d %H:%M')}")
+            first_seen = pd.to_datetime(summary['global']['first_timestamp'])
+            last_seen = pd.to_datetime(summary['global']['last_timestamp'])
+            st.write(f"**Total Records:** {summary['global']['count']:,}")
+            st.write(f"**Sites Monitored:** {len(summary['sites'])}")
+            if pd.notna(first_seen):
+                days_tracked = (last_seen - first_seen).days + 1
+                st.write(f"**Days Tracked:** {days_tracked}")
+            st.write(f"**Last Updated:** {last_seen.strftime('%Y-%m-%d %H:%M')}")
 
         # Alerts section
         st.header("🚨 Current Alerts")
 
-        alert_sites = latest_prices[latest_prices['price'] <= PRICE_THRESHOLD]
+        alert_sites = latest_prices[latest_prices['price'] <= price_threshold]
         if not alert_sites.empty:
             st.success(f"🎉 {len(alert_sites)} site(s) currently below your target price!")
             for _, site in alert_sites.iterrows():
-                st.write(f"• **{site['site']}**: ₹{site['price']:,.0f} (Save ₹{PRICE_THRESHOLD - site['price']:,.0f})")
+                st.write(f"• **{site['site']}**: ₹{site['price']:,.0f} (Save ₹{price_threshold - site['price']:,.0f})")
         else:
             st.info("😔 No sites currently below your target price. Keep watching!")
 
         # Raw data table (expandable)
-        with st.expander("🗂️ View Raw Data"):
+        with st.expander("🗂️ View Chart Data (selected period)"):
             # Show most recent data first
-            display_df = df.sort_values('timestamp', ascending=False)
+            display_df = chart_df.sort_values('timestamp', ascending=False) if not chart_df.empty else chart_df
             st.dataframe(display_df, use_container_width=True)
 
     except Exception as e:
@@ -603,7 +552,7 @@ else:
     3. **Set up a scheduled task** to run the script regularly (every few hours)
 
     ### 📁 Expected Files:
-    - `price_history.csv` - This will be created automatically when you first run the tracker
+    - `price_history.csv` (or `price_history.db` with the SQLite backend) - Created automatically when you first run the tracker
     - `main.py` - Your price tracking script
     - `config.py` - Configuration settings
 
@@ -617,7 +566,7 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.markdown("🤖 **Automated Price Tracker**")
 with col2:
-    st.markdown(f"🎯 **Target:** ₹{PRICE_THRESHOLD:,}")
+    st.markdown(f"🎯 **Target:** ₹{price_threshold:,}")
 with col3:
     refresh_status = "🟢 Active" if auto_refresh_enabled else "🔴 Inactive"
     st.markdown(f"🔄 **Auto-refresh:** {refresh_status}")
@@ -630,10 +579,10 @@ st.markdown("""
 ### ❓ Frequently Asked Questions
 
 **Q: What happens if I close this browser tab/window?**  
-**A:** If you close this Streamlit app, the auto-refresh will stop working. The app only runs while the browser is open. For continuous monitoring even when you're away, you should:
-- Use the standalone `main.py` script with a cron job (Linux/Mac) or Task Scheduler (Windows)
-- Keep this browser tab open if you want the web-based auto-refresh feature
+**A:** Auto-refresh runs inside the Streamlit server, not in your tab, so it keeps going while the server is running - and all open tabs share one refresh. If you stop the Streamlit server, auto-refresh stops too. For continuous monitoring without the dashboard running, you should:
+- Run `python main.py --daemon`, or use the standalone `main.py` script with a cron job (Linux/Mac) or Task Scheduler (Windows)
+- Keep the Streamlit server running if you want the web-based auto-refresh feature
 
 **Q: How do I set up continuous background monitoring?**  
-**A:** Set up a scheduled task to run `python main.py` every few hours using your operating system's task scheduler.
+**A:** Run `python main.py --daemon` in a terminal - it keeps checking every `CHECK_INTERVAL_HOURS` with warm browsers. Or set up a scheduled task to run `python main.py` every few hours using your operating system's task scheduler.
 """)
\ No newline at end of file
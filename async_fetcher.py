@@ -0,0 +1,121 @@
+# async_fetcher.py - Asynchronous HTTP backend for static product pages
+
+import asyncio
+import atexit
+import importlib.util
+import logging
+import threading
+
+import httpx
+
+from config import USER_AGENT, HTTPX_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional 'h2' package; without it httpx quietly sticks to HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+
+class AsyncFetcher:
+    """
+    Fetches pages with one shared httpx.AsyncClient running on a background event loop.
+    Think of it as a single courier who keeps the doors of every shop open between visits.
+
+    Connections are pooled and reused, HTTP/2 is used when available and responses are
+    transparently decompressed. fetch_async() can be awaited directly from async code, and
+    the blocking fetch() wrapper lets ordinary threads share the same client.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = {**HTTPX_SETTINGS, **(settings or {})}
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        """Starts the background event loop the first time it is needed."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='async-fetcher',
+                    daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def _build_timeout(self, timeout=None):
+        """Per-request timeout, falling back to the configured connect/read limits."""
+        read_timeout = timeout if timeout is not None else self.settings['read_timeout']
+        return httpx.Timeout(read_timeout, connect=self.settings['connect_timeout'])
+
+    def _get_client(self):
+        """Creates the shared client lazily, inside the event loop that will use it."""
+        if self._client is None:
+            use_http2 = self.settings['http2'] and HTTP2_AVAILABLE
+            self._client = httpx.AsyncClient(
+                http2=use_http2,
+                headers={'User-Agent': USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=self.settings['max_connections'],
+                    max_keepalive_connections=self.settings['max_keepalive_connections']
+                ),
+                timeout=self._build_timeout(),
+                follow_redirects=True
+            )
+            logger.info(f"Async HTTP client ready (HTTP/2: {'on' if use_http2 else 'off'})")
+        return self._client
+
+    async def fetch_async(self, url, headers=None, timeout=None, trace=None):
+        """
+        Downloads a single page and returns the httpx.Response with its body already read.
+        Must be awaited on this fetcher's event loop. trace is an optional httpx trace callback
+        (e.g. metrics.HttpPhaseTracer) that sees the connection events of this request.
+        """
+        client = self._get_client()
+        extensions = {'trace': trace} if trace else None
+        return await client.get(url, headers=headers, timeout=self._build_timeout(timeout), extensions=extensions)
+
+    def fetch(self, url, headers=None, timeout=None, trace=None):
+        """Blocking wrapper around fetch_async() that can be called from any thread."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self.fetch_async(url, headers=headers, timeout=timeout, trace=trace), loop
+        )
+        return future.result()
+
+    def close(self):
+        """Closes the pooled connections and stops the background event loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+
+        if loop is None or loop.is_closed():
+            return
+
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=10)
+            self._client = None
+
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=10)
+        loop.close()
+        logger.info("Async HTTP client closed")
+
+
+_shared_fetcher = None
+_shared_fetcher_lock = threading.Lock()
+
+
+def get_shared_fetcher():
+    """
+    Returns the process-wide fetcher so every PriceTracker reuses the same connection pool.
+    The dashboard creates a new tracker per refresh, so sharing here is what keeps connections warm.
+    """
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = AsyncFetcher()
+            atexit.register(_shared_fetcher.close)
+        return _shared_fetcher
@@ -0,0 +1,94 @@
+# bench_parsers.py - Compares parse + select time of the HTML parser backends
+#
+# Usage (from the project folder):
+#   python -m benchmarks.bench_parsers                 # synthetic pages for every static site
+#   python -m benchmarks.bench_parsers --fixtures DIR  # saved pages named after the site, e.g. amazon-india.html(.gz)
+#   python -m benchmarks.bench_parsers --fixtures benchmarks/fixtures  # the shipped snapshots
+
+import argparse
+import os
+import statistics
+import time
+
+from config import WATCH_SITES
+from html_parsers import available_backends, parse_html, supports_partial_parse
+from benchmarks.fixture_pages import build_product_page, load_fixture, slugify
+
+
+def load_pages(fixtures_dir, size_kb):
+    """Returns {site_name: html bytes} from a folder of saved pages, or synthetic ones."""
+    pages = {}
+
+    for site_name, site_config in WATCH_SITES.items():
+        if site_config['method'] != 'static':
+            continue
+
+        if fixtures_dir:
+            path = os.path.join(fixtures_dir, f'{slugify(site_name)}.html')
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    pages[site_name] = file.read()
+            else:
+                html = load_fixture(site_name, fixtures_dir)
+                if html is not None:
+                    pages[site_name] = html
+            continue
+
+        pages[site_name] = build_product_page(site_name, site_config, size_kb=size_kb).encode('utf-8')
+
+    return pages
+
+
+def time_parse_and_select(html, backend, selectors, partial, repeat):
+    """Median milliseconds to parse a page and run select_one for each selector."""
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = parse_html(html, backend=backend, selectors=selectors, partial=partial)
+        for selector in selectors:
+            page.select_one_text(selector)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on product pages")
+    parser.add_argument('--fixtures', help="Folder with saved product pages (<site-slug>.html)")
+    parser.add_argument('--size-kb', type=int, default=300, help="Size of synthetic pages")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixtures, args.size_kb)
+    if not pages:
+        print("❌ No pages to benchmark")
+        return
+
+    variants = []
+    for backend in available_backends():
+        variants.append((backend, False))
+        if supports_partial_parse(backend):
+            variants.append((backend, True))
+
+    print(f"📏 Parse + select_one, median of {args.repeat} runs (ms)")
+    header = f"{'Site':<20}{'KB':>6}" + ''.join(
+        f"{backend + (' partial' if partial else ''):>22}" for backend, partial in variants
+    )
+    print(header)
+    print('-' * len(header))
+
+    for site_name, html in pages.items():
+        site_config = WATCH_SITES[site_name]
+        selectors = [site_config['price_selector']]
+        if site_config.get('backup_selector', selectors[0]) != selectors[0]:
+            selectors.append(site_config['backup_selector'])
+
+        row = f"{site_name:<20}{len(html) / 1024:>6.0f}"
+        for backend, partial in variants:
+            row += f"{time_parse_and_select(html, backend, selectors, partial, args.repeat):>22.2f}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
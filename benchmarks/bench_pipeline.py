@@ -0,0 +1,275 @@
+# bench_pipeline.py - Times every stage of a price check offline, so each performance change gets a number
+#
+# Usage (from the project folder):
+#   python -m benchmarks.bench_pipeline                                # all stages, histories of 1k/100k/10M rows
+#   python -m benchmarks.bench_pipeline --sizes 1k,100k --backend both # quicker, CSV and SQLite
+#   python -m benchmarks.bench_pipeline --baseline baseline.json       # exit code 1 if a stage got slower
+#
+# Scrape stages (fetch, parse, select_one, extract_price_from_text) run against the snapshots in
+# benchmarks/fixtures, served by a local HTTP server. History stages (save_price_data,
+# get_historical_data, the dashboard's load_price_data query) run in a fresh process per history size,
+# inside a temporary folder, so nothing touches your real price history.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from config import WATCH_SITES, HTML_PARSER, PARTIAL_PARSE, DEFAULT_PRODUCT
+from benchmarks.fixture_pages import FIXTURE_PRICE, FIXTURES_DIR, slugify
+from benchmarks.fixture_server import serve_fixtures
+from benchmarks.synthetic_history import parse_size, size_label, write_history_csv, fill_history_store
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = '1k,100k,10M'
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+
+def time_calls(function, repeat):
+    """Calls function `repeat` times and returns (milliseconds per call, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def summarize(timings):
+    """Milliseconds per call -> the numbers stored in the results file."""
+    return {
+        'median_ms': round(statistics.median(timings), 4),
+        'min_ms': round(min(timings), 4),
+        'max_ms': round(max(timings), 4),
+        'runs': len(timings)
+    }
+
+
+def quiet_logging():
+    """Benchmarks call the pipeline thousands of times - keep INFO lines out of the timings and the console."""
+    logging.getLogger().setLevel(logging.WARNING)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+
+
+# --- scrape stages ---------------------------------------------------------------------------
+
+def bench_scrape(repeat, latency_ms=0, fixtures_dir=FIXTURES_DIR):
+    """Times fetch, parse, select_one and extract_price_from_text for every site's snapshot."""
+    from main import PriceTracker
+    from html_parsers import parse_html, supports_partial_parse
+
+    quiet_logging()
+    tracker = PriceTracker()
+    per_stage = {stage: {} for stage in ('fetch', 'parse', 'select_one', 'extract_price_from_text')}
+    checks = {}
+
+    with serve_fixtures(fixtures_dir, latency=latency_ms / 1000) as base_url:
+        for site_name, site_config in WATCH_SITES.items():
+            url = f'{base_url}/{slugify(site_name)}'
+            selector = site_config['price_selector']
+            backend = site_config.get('parser', HTML_PARSER)
+            partial = site_config.get('partial_parse', PARTIAL_PARSE) and supports_partial_parse(backend)
+
+            # The download path static scrapes take (rate limiter, retries, HTTP cache), minus the politeness pause
+            fetch_config = {**site_config, 'url': url, 'wait_time': 0}
+            timings, (response, _) = time_calls(
+                lambda: tracker.fetch_page_cached(site_name, url, site_config=fetch_config), repeat
+            )
+            html = response.content
+            per_stage['fetch'][site_name] = timings
+
+            timings, page = time_calls(lambda: parse_html(html, backend=backend, selectors=[selector],
+                                                          partial=partial), repeat)
+            per_stage['parse'][site_name] = timings
+
+            timings, text = time_calls(lambda: page.select_one_text(selector), repeat)
+            per_stage['select_one'][site_name] = timings
+
+            timings, price = time_calls(lambda: tracker.extract_price_from_text(text, site_config), repeat)
+            per_stage['extract_price_from_text'][site_name] = timings
+
+            checks[site_name] = price == FIXTURE_PRICE
+            if not checks[site_name]:
+                print(f"⚠️ {site_name}: extracted {price!r} from its fixture page, expected {FIXTURE_PRICE}")
+
+    tracker.cleanup()
+
+    results = {}
+    for stage, sites in per_stage.items():
+        results[stage] = summarize([timing for timings in sites.values() for timing in timings])
+        results[stage]['per_site'] = {site_name: summarize(timings)['median_ms'] for site_name, timings in sites.items()}
+    return results, checks
+
+
+# --- history stages --------------------------------------------------------------------------
+
+def bench_history_here(rows, backend, repeat):
+    """
+    Runs in a child process whose working folder is an empty temporary folder: builds a synthetic
+    history of `rows` rows there, then times the history stages against it.
+    """
+    import config
+    config.HISTORY_BACKEND = backend  # Before the storage modules read it
+
+    from main import PriceTracker
+    from storage import get_history_store
+    from history_archive import query_history_frame
+
+    quiet_logging()
+    results = {}
+
+    start = time.perf_counter()
+    if backend == 'csv':
+        write_history_csv(config.HISTORY_FILE, rows)
+    else:
+        fill_history_store(get_history_store(backend), rows)
+    generate_seconds = time.perf_counter() - start
+
+    tracker = PriceTracker()
+    store = get_history_store(backend)
+
+    # The first call builds the running aggregates (CSV index) - worth knowing separately
+    timings, _ = time_calls(lambda: tracker.get_historical_data(product_id=DEFAULT_PRODUCT), 1)
+    results['get_historical_data_cold'] = summarize(timings)
+    timings, _ = time_calls(lambda: tracker.get_historical_data(product_id=DEFAULT_PRODUCT), repeat)
+    results['get_historical_data'] = summarize(timings)
+
+    wave = {site_name: FIXTURE_PRICE for site_name in WATCH_SITES}
+    timings, _ = time_calls(lambda: tracker.save_price_data(wave, DEFAULT_PRODUCT), repeat)
+    results['save_price_data'] = summarize(timings)
+
+    # The dashboard's load_price_data without Streamlit's cache: all of one product's history
+    timings, frame = time_calls(lambda: query_history_frame(store, product=DEFAULT_PRODUCT), repeat)
+    results['load_price_data'] = summarize(timings)
+    results['load_price_data']['rows'] = len(frame)
+
+    return {'generate_seconds': round(generate_seconds, 2), 'stages': results}
+
+
+def bench_history(rows, backend, repeat):
+    """Runs bench_history_here in a fresh process and temporary folder, so every size starts clean."""
+    work_dir = tempfile.mkdtemp(prefix=f'price-bench-{backend}-{size_label(rows)}-')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get('PYTHONPATH')])))
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_pipeline', '--history-child', str(rows),
+             '--backend', backend, '--repeat', str(repeat)],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"History benchmark ({backend}, {size_label(rows)} rows) failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# --- results ---------------------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(results, baseline, max_regression=0.25, min_delta_ms=0.5):
+    """
+    Stages whose median got more than max_regression (0.25 = 25%) slower than in the baseline -
+    and by at least min_delta_ms, so sub-millisecond noise doesn't fail a run.
+    Returns [(stage, baseline_ms, current_ms)].
+    """
+    regressions = []
+    for stage, current in results['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before:
+            continue
+        limit = before['median_ms'] * (1 + max_regression)
+        if current['median_ms'] > limit and current['median_ms'] - before['median_ms'] >= min_delta_ms:
+            regressions.append((stage, before['median_ms'], current['median_ms']))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n📏 Median milliseconds per call ({results['commit'] or 'uncommitted'}, {results['timestamp']})")
+    for stage, numbers in results['stages'].items():
+        print(f"  {stage:<45}{numbers['median_ms']:>12.3f} ms   (min {numbers['min_ms']:.3f}, {numbers['runs']} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of every price check stage")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="History sizes, e.g. 1k,100k,10M")
+    parser.add_argument('--backend', choices=['csv', 'sqlite', 'both'], default='csv', help="History backend(s)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay the fixture server adds to every response")
+    parser.add_argument('--skip-scrape', action='store_true', help="Only run the history stages")
+    parser.add_argument('--skip-history', action='store_true', help="Only run the scrape stages")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument('--baseline', help="Earlier results file to compare with (exit code 1 on regressions)")
+    parser.add_argument('--max-regression', type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    parser.add_argument('--history-child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.history_child is not None:
+        print(json.dumps(bench_history_here(args.history_child, args.backend, args.repeat)))
+        return
+
+    results = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'stages': {},
+        'history_generate_seconds': {}
+    }
+
+    if not args.skip_scrape:
+        print(f"🌐 Timing scrape stages on {len(WATCH_SITES)} fixture pages...")
+        scrape_results, checks = bench_scrape(args.repeat, args.latency_ms)
+        results['stages'].update(scrape_results)
+        results['fixture_prices_ok'] = checks
+
+    if not args.skip_history:
+        backends = ['csv', 'sqlite'] if args.backend == 'both' else [args.backend]
+        for backend in backends:
+            for size in args.sizes.split(','):
+                rows = parse_size(size)
+                label = size_label(rows)
+                print(f"💾 Timing history stages: {backend}, {label} rows...")
+                history = bench_history(rows, backend, args.repeat)
+                results['history_generate_seconds'][f'{backend}/{label}'] = history['generate_seconds']
+                for stage, numbers in history['stages'].items():
+                    results['stages'][f'history/{backend}/{label}/{stage}'] = numbers
+
+    print_results(results)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"\n📝 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_results(results, baseline, args.max_regression, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than the baseline by more than {args.max_regression:.0%}:")
+            for stage, before, now in regressions:
+                print(f"  {stage}: {before:.3f} ms -> {now:.3f} ms ({now / before - 1:+.0%})")
+            sys.exit(1)
+        print(f"\n✅ No stage slower than the baseline by more than {args.max_regression:.0%}")
+
+
+if __name__ == '__main__':
+    main()
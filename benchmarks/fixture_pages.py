@@ -0,0 +1,156 @@
+# fixture_pages.py - Offline product pages for benchmarking the scraper without hitting real shops
+#
+# Regenerate the snapshots in benchmarks/fixtures (from the project folder):
+#   python -m benchmarks.fixture_pages
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+
+from config import WATCH_SITES
+
+
+def slugify(site_name):
+    """'Swiss Time House' -> 'swiss-time-house', used for fixture file names and URL paths."""
+    return re.sub(r'[^a-z0-9]+', '-', site_name.lower()).strip('-')
+
+
+def _compound_to_tag(compound, inner):
+    """Turns one simple selector (e.g. 'div.price#main') into an element wrapped around inner."""
+    tag_match = re.match(r'^[a-zA-Z][\w-]*', compound)
+    tag = tag_match.group(0) if tag_match else 'div'
+
+    element_id = re.findall(r'#([\w-]+)', compound)
+    classes = re.findall(r'\.([\w-]+)', compound)
+    attributes = re.findall(r'\[([\w-]+)(?:=["\']?([^\]"\']*)["\']?)?\]', compound)
+
+    parts = [tag]
+    if element_id:
+        parts.append(f'id="{element_id[0]}"')
+    if classes:
+        parts.append(f'class="{" ".join(classes)}"')
+    for name, value in attributes:
+        parts.append(f'{name}="{value}"')
+
+    return f'<{" ".join(parts)}>{inner}</{tag}>'
+
+
+def element_for_selector(selector, text):
+    """Builds the smallest markup a CSS selector like '.pdp-price strong' would match."""
+    compounds = [part for part in re.split(r'\s*>\s*|\s+', selector.strip()) if part]
+    markup = text
+    for compound in reversed(compounds):
+        markup = _compound_to_tag(compound, markup)
+    return markup
+
+
+def _filler(rng, target_bytes):
+    """Navigation, product grids and script noise - the bulk of a real retail page."""
+    chunks = []
+    size = 0
+    card = 0
+
+    while size < target_bytes:
+        card += 1
+        other_price = rng.randint(299, 49999)
+        chunk = (
+            f'<div class="product-card card-{card % 17}" data-id="{rng.randint(10 ** 6, 10 ** 7)}">'
+            f'<a href="/p/{rng.randint(10 ** 5, 10 ** 6)}"><img src="/img/{card}.jpg" alt="Item {card}"></a>'
+            f'<div class="card-title">Recommended product {card}</div>'
+            f'<div class="card-price"><span class="amount">₹{other_price:,}</span>'
+            f'<del class="mrp">₹{other_price + rng.randint(100, 5000):,}</del></div>'
+            f'<ul class="badges">{"".join(f"<li>tag {n}</li>" for n in range(rng.randint(1, 4)))}</ul>'
+            f'</div>\n'
+        )
+        chunks.append(chunk)
+        size += len(chunk)
+
+    return ''.join(chunks)
+
+
+def build_product_page(site_name, site_config=None, price=9195.0, size_kb=300,
+                       structured=False, seed=None, price_markup=None):
+    """
+    Builds a synthetic product page for a configured site.
+    The page contains the site's primary selector around the price (or the given price_markup),
+    plenty of distracting markup around it and, if structured=True, an ld+json Product block.
+    """
+    site_config = site_config or WATCH_SITES[site_name]
+    rng = random.Random(seed if seed is not None else slugify(site_name))
+
+    if price_markup is None:
+        price_markup = element_for_selector(site_config['price_selector'], f'₹{price:,.0f}')
+
+    ld_json = ''
+    if structured:
+        ld_json = (
+            '<script type="application/ld+json">'
+            + json.dumps({
+                '@context': 'https://schema.org',
+                '@type': 'Product',
+                'name': 'Casio G-Shock GA-2100-1A1',
+                'offers': {'@type': 'Offer', 'price': f'{price:.2f}', 'priceCurrency': 'INR'}
+            })
+            + '</script>'
+        )
+
+    half = size_kb * 512
+    return (
+        '<!DOCTYPE html><html><head>'
+        f'<title>{site_name} - Casio G-Shock GA-2100-1A1</title>{ld_json}'
+        '</head><body>'
+        f'<header><nav>{_filler(rng, 4096)}</nav></header>'
+        f'<main><section class="recommendations">{_filler(rng, half)}</section>'
+        f'<section class="product-detail"><h1>Casio G-Shock GA-2100-1A1</h1>{price_markup}</section>'
+        f'<section class="similar">{_filler(rng, half)}</section></main>'
+        '<footer>Fixture page for offline benchmarks</footer>'
+        '</body></html>'
+    )
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_PRICE = 9195.0  # The price every fixture page shows, so benchmarks can check what they extracted
+
+
+def fixture_path(site_name, fixtures_dir=FIXTURES_DIR):
+    """Where a site's gzipped snapshot lives, e.g. fixtures/amazon-india.html.gz."""
+    return os.path.join(fixtures_dir, f'{slugify(site_name)}.html.gz')
+
+
+def load_fixture(site_name, fixtures_dir=FIXTURES_DIR):
+    """A site's snapshot as raw (decompressed) bytes, or None if there is none."""
+    path = fixture_path(site_name, fixtures_dir)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rb') as file:
+        return file.read()
+
+
+def write_fixtures(fixtures_dir=FIXTURES_DIR, size_kb=200, price=FIXTURE_PRICE):
+    """
+    Writes one snapshot per WATCH_SITES entry. They're stored gzipped - the fixture server sends
+    them compressed just like a real shop would, and the repository stays small.
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for site_name, site_config in WATCH_SITES.items():
+        html = build_product_page(site_name, site_config, price=price, size_kb=size_kb,
+                                  structured=site_config.get('structured_data', True))
+        # mtime=0 keeps the files byte-identical between runs, so regenerating doesn't show up in git
+        with open(fixture_path(site_name, fixtures_dir), 'wb') as file:
+            file.write(gzip.compress(html.encode('utf-8'), mtime=0))
+    print(f"✅ Wrote {len(WATCH_SITES)} fixture pages to {fixtures_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write offline product page snapshots for every WATCH_SITES entry")
+    parser.add_argument('--dir', default=FIXTURES_DIR, help="Folder to write the snapshots to")
+    parser.add_argument('--size-kb', type=int, default=200, help="Approximate size of each page")
+    args = parser.parse_args()
+    write_fixtures(args.dir, args.size_kb)
+
+
+if __name__ == '__main__':
+    main()
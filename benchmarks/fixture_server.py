@@ -0,0 +1,99 @@
+# fixture_server.py - Serves the saved product pages over local HTTP, so fetches can be timed offline
+#
+# Browse the snapshots by hand (from the project folder):
+#   python -m benchmarks.fixture_server --port 8765     # then open http://127.0.0.1:8765/amazon-india
+
+import argparse
+import contextlib
+import gzip
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixture_pages import FIXTURES_DIR
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Answers GET /<site-slug> with that site's snapshot - gzipped if the client accepts it, like a real shop."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so pooled clients reuse their connections as they would live
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes - don't let them wait for an ACK
+
+    def do_GET(self):
+        slug = self.path.split('?', 1)[0].strip('/')
+        compressed = self.server.pages.get(slug)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if compressed is None:
+            self.send_error(404, f"No fixture page for '{slug}'")
+            return
+
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = compressed
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            body = gzip.decompress(compressed)
+            self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Thousands of requests per benchmark - keep the console for results
+
+
+def load_compressed_pages(fixtures_dir=FIXTURES_DIR):
+    """{site-slug: gzipped page bytes} for every snapshot in the folder."""
+    pages = {}
+    for name in os.listdir(fixtures_dir):
+        if name.endswith('.html.gz'):
+            with open(os.path.join(fixtures_dir, name), 'rb') as file:
+                pages[name[:-len('.html.gz')]] = file.read()
+    return pages
+
+
+def start_fixture_server(fixtures_dir=FIXTURES_DIR, host='127.0.0.1', port=0, latency=0.0):
+    """Starts the server in a background thread and returns it; port=0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    server.pages = load_compressed_pages(fixtures_dir)
+    server.latency = latency  # Seconds added to every response, to mimic a distant server
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    return server
+
+
+@contextlib.contextmanager
+def serve_fixtures(fixtures_dir=FIXTURES_DIR, latency=0.0):
+    """Runs the fixture server for the duration of a with-block and yields its base URL."""
+    server = start_fixture_server(fixtures_dir, latency=latency)
+    try:
+        host, port = server.server_address[:2]
+        yield f'http://{host}:{port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the offline product page snapshots")
+    parser.add_argument('--dir', default=FIXTURES_DIR, help="Folder with <site-slug>.html.gz snapshots")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    server = start_fixture_server(args.dir, port=args.port, latency=args.latency_ms / 1000)
+    print(f"🌐 Serving {len(server.pages)} fixture pages on http://127.0.0.1:{args.port}/<site-slug> (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
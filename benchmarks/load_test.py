@@ -0,0 +1,161 @@
+# load_test.py - Points PriceTracker at a mock retailer farm and measures how it copes at scale
+#
+# Usage (from the project folder):
+#   python -m benchmarks.load_test --retailers 50 --products 10 --waves 5
+#   python -m benchmarks.load_test --retailers 100 --rate-limit 2 --drift-rate 0.05 --break-rate 0.01
+#   python -m benchmarks.load_test --js-fraction 0.1     # needs Chrome, like the dynamic sites do
+#
+# The tracker runs unchanged - the same waves, per-domain queues, caches and browser pool as a real
+# check - inside a temporary folder, so its history, cache and schedule files never mix with yours.
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.mock_farm import add_farm_arguments, farm_from_arguments
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if len(values) else None
+
+
+def server_totals(farm):
+    """Request outcomes over all retailers, plus the server-side latencies."""
+    totals = {'requests': 0, 'ok': 0, 'not_modified': 0, 'throttled': 0, 'drifted': 0, 'broken': 0, 'not_found': 0}
+    latencies = []
+    for stats in farm.stats().values():
+        for key in totals:
+            totals[key] += stats[key]
+        latencies.extend(stats['latencies_ms'])
+    return totals, latencies
+
+
+def run_load_test(farm, product_count, waves, pause_seconds=0.0, concurrency=None, verbose=False):
+    """
+    Runs `waves` full scrape waves over every listing of the farm and returns the report:
+    wave latencies (p50/p99), throughput, error rates and what the servers saw.
+    """
+    import main
+    from catalog import Catalog
+
+    if concurrency:
+        main.MAX_CONCURRENT_SCRAPES = concurrency
+    if not verbose:
+        # Hundreds of listings per wave - keep the per-site lines out of the console and the timings
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    tracker = main.PriceTracker()
+    tracker.catalog = Catalog(farm.products(product_count), watch_sites=farm.watch_sites())
+    listings = tracker.catalog.listings
+    js_sites = {retailer.name for retailer in farm.retailers if retailer.js_rendered}
+
+    wave_seconds = []
+    failures = {'static': 0, 'js': 0}
+    found_total = 0
+
+    try:
+        for wave in range(waves):
+            if wave and pause_seconds:
+                time.sleep(pause_seconds)
+
+            quiet = contextlib.redirect_stdout(io.StringIO()) if not verbose else contextlib.nullcontext()
+            started = time.perf_counter()
+            with quiet:
+                prices = tracker.get_catalog_prices(listings)
+            elapsed = time.perf_counter() - started
+
+            wave_seconds.append(elapsed)
+            found_total += len(prices)
+            for listing in listings:
+                if listing.key not in prices:
+                    failures['js' if listing.site in js_sites else 'static'] += 1
+
+            print(f"  wave {wave + 1}/{waves}: {len(prices)}/{len(listings)} prices in {elapsed:.2f} s")
+    finally:
+        tracker.cleanup()
+        if main.USE_DRIVER_POOL and js_sites:
+            main.get_shared_pool().shutdown()
+
+    attempted = len(listings) * waves
+    totals, latencies = server_totals(farm)
+    js_listings = sum(1 for listing in listings if listing.site in js_sites) * waves
+
+    return {
+        'retailers': len(farm.retailers),
+        'js_retailers': len(js_sites),
+        'products': product_count,
+        'listings': len(listings),
+        'waves': waves,
+        'wave_seconds': [round(seconds, 3) for seconds in wave_seconds],
+        'wave_p50_s': percentile(wave_seconds, 50),
+        'wave_p99_s': percentile(wave_seconds, 99),
+        'throughput_listings_per_s': round(attempted / sum(wave_seconds), 2),
+        'throughput_prices_per_s': round(found_total / sum(wave_seconds), 2),
+        'error_rate': round(1 - found_total / attempted, 4),
+        'error_rate_static': round(failures['static'] / (attempted - js_listings), 4) if attempted > js_listings else None,
+        'error_rate_js': round(failures['js'] / js_listings, 4) if js_listings else None,
+        'server': {
+            **totals,
+            'throttled_rate': round(totals['throttled'] / totals['requests'], 4) if totals['requests'] else 0,
+            'latency_p50_ms': percentile(latencies, 50),
+            'latency_p99_ms': percentile(latencies, 99)
+        }
+    }
+
+
+def print_report(report):
+    server = report['server']
+    print(f"\n📊 {report['listings']} listings ({report['products']} products x {report['retailers']} retailers, "
+          f"{report['js_retailers']} JS-rendered), {report['waves']} waves")
+    print(f"  ⏱️  Wave latency: p50 {report['wave_p50_s']:.2f} s, p99 {report['wave_p99_s']:.2f} s")
+    print(f"  🚀 Throughput: {report['throughput_listings_per_s']:.1f} listings/s "
+          f"({report['throughput_prices_per_s']:.1f} prices/s)")
+    print(f"  ❌ Error rate: {report['error_rate']:.1%}"
+          + (f" (static {report['error_rate_static']:.1%})" if report['error_rate_static'] is not None else '')
+          + (f" (JS {report['error_rate_js']:.1%})" if report['error_rate_js'] is not None else ''))
+    print(f"  🏬 Servers: {server['requests']} requests - {server['ok']} ok, {server['not_modified']} not modified, "
+          f"{server['throttled']} throttled (429), {server['drifted']} drifted, {server['broken']} broken layouts")
+    if server['latency_p50_ms'] is not None:
+        print(f"  🐢 Server latency: p50 {server['latency_p50_ms']:.0f} ms, p99 {server['latency_p99_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the price tracker against a local mock retailer farm")
+    add_farm_arguments(parser)
+    parser.add_argument('--waves', type=int, default=3, help="Full scrape waves to run")
+    parser.add_argument('--pause', type=float, default=0, help="Seconds between waves")
+    parser.add_argument('--concurrency', type=int, help="Override MAX_CONCURRENT_SCRAPES")
+    parser.add_argument('--output', help="Write the report as JSON")
+    parser.add_argument('--verbose', action='store_true', help="Show the tracker's own output and logs")
+    args = parser.parse_args()
+
+    project_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='price-load-test-')
+
+    with farm_from_arguments(args) as farm:
+        print(f"🏬 {args.retailers} mock retailers up, {args.retailers * args.products} listings")
+        # The tracker's files (log, HTTP cache, schedule) are relative paths - keep them out of the project
+        os.chdir(work_dir)
+        try:
+            report = run_load_test(farm, args.products, args.waves, args.pause, args.concurrency, args.verbose)
+        finally:
+            os.chdir(project_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"\n📝 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
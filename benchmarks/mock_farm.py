@@ -0,0 +1,341 @@
+# mock_farm.py - A local farm of fake retailers, for load-testing the scraper with hundreds of listings
+#
+# Run a farm by hand and point the tracker at it through a catalog file (from the project folder):
+#   python -m benchmarks.mock_farm --retailers 50 --products 10 --catalog mock_catalog.json
+#   # then set CATALOG_FILE = 'mock_catalog.json' in config.py, or use: python -m benchmarks.load_test
+#
+# Every retailer is its own HTTP server on its own port, so the tracker sees a separate domain per
+# retailer - exactly like live shops - and the per-domain politeness rules apply as they would.
+
+import argparse
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixture_pages import build_product_page, slugify
+
+PRICE_PLACEHOLDER = '<!--PRICE-->'
+PRICE_BOUNDS = (100, 1_000_000)  # Mock prices are sane by construction - don't let PRICE_BOUNDS reject them
+
+
+class MockRetailer:
+    """
+    One fake shop and how it misbehaves. Like a flight simulator's weather settings: the same
+    tracker flies through calm skies or through slow servers, throttling and redesigned pages.
+
+    latency_ms / latency_sigma - log-normal response time: the median, and how heavy the slow tail is
+    rate_limit / burst         - requests per second (token bucket) before answering 429 with Retry-After
+    js_rendered                - the price is only written into the page by JavaScript, after render_delay_ms
+    drift_rate                 - share of pages whose price element lost its usual class (backup selector still works)
+    break_rate                 - share of pages where neither selector matches any more
+    """
+
+    def __init__(self, name, latency_ms=150, latency_sigma=0.6, rate_limit=None, burst=5, retry_after=2,
+                 js_rendered=False, render_delay_ms=300, drift_rate=0.0, break_rate=0.0,
+                 price_period=3600, size_kb=100, seed=0):
+        self.name = name
+        self.slug = slugify(name)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.retry_after = retry_after
+        self.js_rendered = js_rendered
+        self.render_delay_ms = render_delay_ms
+        self.drift_rate = drift_rate
+        self.break_rate = break_rate
+        self.price_period = price_period  # Prices move every this many seconds
+        self.size_kb = size_kb
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._template = None
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'throttled': 0, 'drifted': 0, 'broken': 0,
+                      'not_found': 0, 'latencies_ms': []}
+
+    # --- what the tracker needs to know ----------------------------------------------------
+
+    @property
+    def price_selector(self):
+        return f'span.{self.slug}-price'
+
+    @property
+    def backup_selector(self):
+        return '[data-price]'
+
+    def site_config(self, base_url):
+        """This retailer as a WATCH_SITES entry."""
+        return {
+            'url': base_url,
+            'price_selector': self.price_selector,
+            'backup_selector': self.backup_selector,
+            'method': 'dynamic' if self.js_rendered else 'static',
+            'structured_data': False,  # Make the JS retailers really need the browser
+            'price_bounds': PRICE_BOUNDS,
+            'wait_time': 0
+        }
+
+    def price_for(self, product_id, now=None):
+        """The product's price right now: a per-product base that drifts slowly, changing every price_period."""
+        now = time.time() if now is None else now
+        base = random.Random(f'{product_id}').uniform(2000, 20000)
+        period = int(now // self.price_period)
+        wobble = random.Random(f'{self.slug}|{product_id}|{period}').uniform(-0.08, 0.08)
+        return float(round(base * (1 + wobble)))
+
+    # --- misbehaviour ----------------------------------------------------------------------
+
+    def latency(self):
+        with self._lock:
+            return self.latency_ms * math.exp(self.latency_sigma * self._rng.gauss(0, 1)) / 1000
+
+    def take_token(self):
+        """Token bucket: True if the request may be served, False if it should be throttled."""
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def layout(self):
+        """'normal', 'drifted' or 'broken' for the next page."""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.break_rate:
+            return 'broken'
+        if roll < self.break_rate + self.drift_rate:
+            return 'drifted'
+        return 'normal'
+
+    def record(self, outcome, latency_ms=None):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[outcome] += 1
+            if latency_ms is not None:
+                self.stats['latencies_ms'].append(latency_ms)
+
+    # --- pages -----------------------------------------------------------------------------
+
+    def price_markup(self, price, layout):
+        text = f'₹{price:,.0f}'
+        if layout == 'broken':
+            return f'<div class="final-amount">{text}</div>'
+        css_class = f'{self.slug}-price-v2' if layout == 'drifted' else f'{self.slug}-price'
+        return f'<span class="{css_class}" data-price="{price:.0f}">{text}</span>'
+
+    def page(self, price, layout):
+        """The product page; the heavy filler around the price is built once and reused."""
+        if self._template is None:
+            self._template = build_product_page(self.name, {'price_selector': 'span'}, size_kb=self.size_kb,
+                                                seed=self.slug, price_markup=PRICE_PLACEHOLDER)
+        template = self._template
+
+        markup = self.price_markup(price, layout)
+        if self.js_rendered:
+            # Nothing to find in the HTML - the price appears once the script has run
+            markup = (
+                '<div id="price-root"></div><script>setTimeout(function () {'
+                f"document.getElementById('price-root').innerHTML = '{markup}';"
+                f'}}, {self.render_delay_ms});</script>'
+            )
+        return template.replace(PRICE_PLACEHOLDER, markup)
+
+
+class MockRetailerHandler(BaseHTTPRequestHandler):
+    """GET /p/<product_id> - the product page, after the retailer's latency, throttling and layout dice."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        retailer = self.server.retailer
+        started = time.perf_counter()
+        time.sleep(retailer.latency())
+
+        if not retailer.take_token():
+            self.send_response(429)
+            self.send_header('Retry-After', str(retailer.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            retailer.record('throttled', (time.perf_counter() - started) * 1000)
+            return
+
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'p':
+            self.send_error(404)
+            retailer.record('not_found')
+            return
+
+        product_id = parts[1]
+        price = retailer.price_for(product_id)
+        layout = retailer.layout()
+        etag = f'"{retailer.slug}-{product_id}-{price:.0f}-{layout}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            retailer.record('not_modified', (time.perf_counter() - started) * 1000)
+            return
+
+        body = retailer.page(price, layout).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        outcome = {'drifted': 'drifted', 'broken': 'broken'}.get(layout, 'ok')
+        retailer.record(outcome, (time.perf_counter() - started) * 1000)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockFarm:
+    """Starts one local server per retailer and builds the matching WATCH_SITES and PRODUCTS entries."""
+
+    def __init__(self, retailers, host='127.0.0.1'):
+        self.retailers = retailers
+        self.host = host
+        self.servers = {}
+
+    def start(self):
+        for retailer in self.retailers:
+            server = ThreadingHTTPServer((self.host, 0), MockRetailerHandler)
+            server.daemon_threads = True
+            server.retailer = retailer
+            threading.Thread(target=server.serve_forever, name=f'mock-{retailer.slug}', daemon=True).start()
+            self.servers[retailer.name] = server
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+        self.servers = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def base_url(self, retailer):
+        host, port = self.servers[retailer.name].server_address[:2]
+        return f'http://{host}:{port}'
+
+    def watch_sites(self):
+        """The farm's retailers as WATCH_SITES entries (their urls point at the server root)."""
+        return {retailer.name: retailer.site_config(self.base_url(retailer)) for retailer in self.retailers}
+
+    def products(self, count):
+        """
+        `count` products, each listed at every retailer - a PRODUCTS dict that can also be saved
+        as a CATALOG_FILE, because every listing carries its full retailer settings.
+        """
+        products = {}
+        for index in range(count):
+            product_id = f'MOCK-{index:04d}'
+            products[product_id] = {
+                'name': f'Mock Watch {index:04d}',
+                'price_threshold': 0,  # Load tests measure scraping, not email
+                'listings': {
+                    retailer.name: {**retailer.site_config(self.base_url(retailer)),
+                                    'url': f'{self.base_url(retailer)}/p/{product_id}'}
+                    for retailer in self.retailers
+                }
+            }
+        return products
+
+    def stats(self):
+        """Per-retailer request counts and server-side latencies."""
+        return {retailer.name: retailer.stats for retailer in self.retailers}
+
+
+def build_retailers(count, latency_ms=150, latency_sigma=0.6, slow_fraction=0.1, rate_limit=None, burst=5,
+                    retry_after=2, js_fraction=0.0, render_delay_ms=300, drift_rate=0.0, break_rate=0.0,
+                    size_kb=100, seed=0):
+    """
+    A mixed population of retailers: medians vary from shop to shop, slow_fraction of them are
+    five times slower, and js_fraction of them render their prices with JavaScript.
+    """
+    rng = random.Random(seed)
+    retailers = []
+    for index in range(count):
+        median = latency_ms * math.exp(rng.gauss(0, 0.3)) * (5 if rng.random() < slow_fraction else 1)
+        retailers.append(MockRetailer(
+            f'Mock Shop {index:03d}', latency_ms=median, latency_sigma=latency_sigma,
+            rate_limit=rate_limit, burst=burst, retry_after=retry_after,
+            js_rendered=rng.random() < js_fraction, render_delay_ms=render_delay_ms,
+            drift_rate=drift_rate, break_rate=break_rate, size_kb=size_kb, seed=seed * 1000 + index
+        ))
+    return retailers
+
+
+def add_farm_arguments(parser):
+    """The retailer-population options, shared by this module's CLI and the load test driver."""
+    parser.add_argument('--retailers', type=int, default=20, help="How many fake retailers (one server each)")
+    parser.add_argument('--products', type=int, default=10, help="Products, each listed at every retailer")
+    parser.add_argument('--latency-ms', type=float, default=150, help="Median response time")
+    parser.add_argument('--latency-sigma', type=float, default=0.6, help="Log-normal spread - bigger means a longer slow tail")
+    parser.add_argument('--slow-fraction', type=float, default=0.1, help="Share of retailers five times slower")
+    parser.add_argument('--rate-limit', type=float, help="Requests per second per retailer before 429s (default: none)")
+    parser.add_argument('--burst', type=int, default=5, help="Requests allowed at once before the rate limit applies")
+    parser.add_argument('--retry-after', type=int, default=2, help="Seconds sent in Retry-After with every 429")
+    parser.add_argument('--js-fraction', type=float, default=0.0, help="Share of retailers that render prices with JavaScript")
+    parser.add_argument('--render-delay-ms', type=float, default=300, help="How long the JavaScript takes to show the price")
+    parser.add_argument('--drift-rate', type=float, default=0.0, help="Share of pages with a renamed price element")
+    parser.add_argument('--break-rate', type=float, default=0.0, help="Share of pages where no selector matches")
+    parser.add_argument('--size-kb', type=int, default=100, help="Approximate page size")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def farm_from_arguments(args):
+    return MockFarm(build_retailers(
+        args.retailers, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+        slow_fraction=args.slow_fraction, rate_limit=args.rate_limit, burst=args.burst,
+        retry_after=args.retry_after, js_fraction=args.js_fraction, render_delay_ms=args.render_delay_ms,
+        drift_rate=args.drift_rate, break_rate=args.break_rate, size_kb=args.size_kb, seed=args.seed
+    ))
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="Run a local farm of fake retailers")
+    add_farm_arguments(parser)
+    parser.add_argument('--catalog', help="Write a catalog file (JSON) for CATALOG_FILE pointing at the farm")
+    args = parser.parse_args()
+
+    with farm_from_arguments(args) as farm:
+        if args.catalog:
+            with open(args.catalog, 'w', encoding='utf-8') as file:
+                json.dump(farm.products(args.products), file, indent=2)
+            print(f"📝 Catalog with {args.products} products x {args.retailers} retailers written to {args.catalog}")
+
+        print(f"🏬 {args.retailers} mock retailers running (Ctrl+C to stop):")
+        for retailer in farm.retailers:
+            kind = 'JS' if retailer.js_rendered else 'static'
+            print(f"  {retailer.name}: {farm.base_url(retailer)}/p/<product_id>  ({kind}, ~{retailer.latency_ms:.0f} ms)")
+
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# synthetic_history.py - Price histories of any length, for benchmarking storage without waiting years
+
+import numpy as np
+import pandas as pd
+
+from config import WATCH_SITES, DEFAULT_PRODUCT, PRICE_THRESHOLD
+
+CHUNK_ROWS = 500_000  # Rows generated and written at a time, so 10M rows never sit in memory at once
+
+
+def parse_size(text):
+    """'1k' -> 1000, '100k' -> 100000, '10M' -> 10000000."""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def size_label(rows):
+    """10000000 -> '10M', the inverse of parse_size for round sizes."""
+    for suffix, size in (('M', 1_000_000), ('k', 1_000)):
+        if rows >= size and rows % size == 0:
+            return f'{rows // size}{suffix}'
+    return str(rows)
+
+
+def history_chunks(rows, sites=None, product=DEFAULT_PRODUCT, days=365, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Yields DataFrames with the history file's columns, oldest first: one wave over every site at a
+    time, spread evenly over the last `days` days, with prices wandering around ₹9,000.
+    """
+    sites = list(sites or WATCH_SITES)
+    rng = np.random.default_rng(seed)
+    waves = -(-rows // len(sites))
+    end = pd.Timestamp.now().floor('s')
+    step = pd.Timedelta(days=days) / max(waves, 1)
+    lowest = np.inf
+
+    for start in range(0, rows, chunk_rows):
+        index = np.arange(start, min(start + chunk_rows, rows))
+        wave = index // len(sites)
+        timestamps = end - (waves - 1 - wave) * step
+        prices = np.round(9000 + 1500 * np.sin(wave / 500) + rng.normal(0, 300, len(index)), 2)
+
+        running_low = np.minimum.accumulate(np.concatenate([[lowest], prices]))
+        lowest = running_low[-1]
+
+        yield pd.DataFrame({
+            'timestamp': pd.DatetimeIndex(timestamps).strftime('%Y-%m-%d %H:%M:%S'),
+            'site': np.array(sites, dtype=object)[index % len(sites)],
+            'price': prices,
+            'is_new_low': prices < running_low[:-1],
+            'below_threshold': prices <= PRICE_THRESHOLD,
+            'product': product
+        })
+
+
+def write_history_csv(path, rows, **options):
+    """Writes a synthetic history CSV in the same format the CSV store writes."""
+    header = True
+    for chunk in history_chunks(rows, **options):
+        chunk.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def fill_history_store(store, rows, **options):
+    """Appends a synthetic history to a history store (e.g. SQLite) chunk by chunk."""
+    for chunk in history_chunks(rows, **options):
+        store.append_rows(chunk.to_dict('records'))
@@ -0,0 +1,204 @@
+# catalog.py - The products being tracked, the retailer pages they're sold on, and how to visit them
+#
+# Besides PRODUCTS in config.py, a catalog file (CATALOG_FILE) can add thousands of products.
+#
+# JSON - the same shape as PRODUCTS:
+#   {"GA-B2100-1A1": {"name": "G-Shock GA-B2100", "price_threshold": 9500, "price_bounds": [6000, 20000],
+#                     "listings": {"Amazon India": {"url": "https://www.amazon.in/..."}}}}
+#
+# CSV - one row per listing (empty cells are ignored, extra columns override retailer settings):
+#   product_id,name,site,url,price_threshold,min_price,max_price,price_selector,backup_selector,method,wait_time
+
+import csv
+import json
+import logging
+import threading
+from urllib.parse import urlparse
+
+from config import PRODUCTS, WATCH_SITES, CATALOG_FILE, DEFAULT_PRODUCT, PRICE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# CSV columns that describe the product rather than the listing
+PRODUCT_COLUMNS = ('product_id', 'name', 'site', 'price_threshold', 'min_price', 'max_price')
+NUMERIC_SETTINGS = ('wait_time',)
+
+
+def get_site_domain(url):
+    """
+    Returns the host part of a product URL, e.g. 'www.amazon.in'.
+    Politeness delays are applied per domain, so this decides which listings share a queue.
+    """
+    return urlparse(url).netloc.lower()
+
+
+class Product:
+    """One thing we want to buy: its name, the price we'd happily pay, and what counts as a sane price."""
+
+    __slots__ = ('product_id', 'name', 'price_threshold', 'price_bounds')
+
+    def __init__(self, product_id, name=None, price_threshold=PRICE_THRESHOLD, price_bounds=None):
+        self.product_id = product_id
+        self.name = name or product_id
+        self.price_threshold = price_threshold
+        # None means "use the retailer's 'price_bounds' or the global PRICE_BOUNDS"
+        self.price_bounds = tuple(price_bounds) if price_bounds else None
+
+    def __repr__(self):
+        return f"Product({self.product_id!r}, name={self.name!r})"
+
+
+class Listing:
+    """
+    One product on one retailer's site. `config` is the retailer's WATCH_SITES entry with the
+    product's price bounds and the listing's own overrides (at least its url) applied on top,
+    so every scraping method can use it exactly like a WATCH_SITES entry.
+    """
+
+    __slots__ = ('product_id', 'site', 'config', 'label')
+
+    def __init__(self, product_id, site, config, label=None):
+        self.product_id = product_id
+        self.site = site
+        self.config = config
+        self.label = label or site
+
+    @property
+    def url(self):
+        return self.config['url']
+
+    @property
+    def key(self):
+        return (self.product_id, self.site)
+
+    def __repr__(self):
+        return f"Listing({self.product_id!r}, {self.site!r})"
+
+
+def build_listing_config(site, product, overrides, watch_sites=WATCH_SITES):
+    """Retailer defaults + product price bounds + listing overrides. Raises ValueError if it can't be scraped."""
+    config = dict(watch_sites.get(site, {}))
+    if product.price_bounds:
+        config['price_bounds'] = product.price_bounds
+    config.update(overrides)
+
+    missing = [key for key in ('url', 'price_selector', 'method') if not config.get(key)]
+    if missing:
+        raise ValueError(f"Listing {product.product_id} @ {site} is missing {missing} "
+                         f"(add the retailer to WATCH_SITES or set them on the listing)")
+    return config
+
+
+class Catalog:
+    """All products and listings, with quick lookups by product and by (product, site)."""
+
+    def __init__(self, products, watch_sites=WATCH_SITES):
+        self.products = {}
+        self.listings = []
+        self._by_key = {}
+        self._by_product = {}
+
+        multiple_products = len(products) > 1
+
+        for product_id, product_config in products.items():
+            product = Product(
+                product_id,
+                name=product_config.get('name'),
+                price_threshold=product_config.get('price_threshold', PRICE_THRESHOLD),
+                price_bounds=product_config.get('price_bounds')
+            )
+            self.products[product_id] = product
+
+            for site, overrides in product_config.get('listings', {}).items():
+                config = build_listing_config(site, product, overrides, watch_sites)
+                label = f"{product_id} @ {site}" if multiple_products else site
+                listing = Listing(product_id, site, config, label)
+
+                self.listings.append(listing)
+                self._by_key[listing.key] = listing
+                self._by_product.setdefault(product_id, []).append(listing)
+
+    def product(self, product_id=None):
+        """The product with this id (DEFAULT_PRODUCT if None) - unknown ids get default settings."""
+        product_id = product_id or DEFAULT_PRODUCT
+        return self.products.get(product_id) or Product(product_id)
+
+    def listings_for(self, product_id=None):
+        return list(self._by_product.get(product_id or DEFAULT_PRODUCT, []))
+
+    def listing(self, product_id, site):
+        return self._by_key.get((product_id or DEFAULT_PRODUCT, site))
+
+    @classmethod
+    def from_config(cls, catalog_file=CATALOG_FILE):
+        """PRODUCTS from config.py, plus (and overridden by) the products in catalog_file."""
+        products = dict(PRODUCTS)
+        if catalog_file:
+            products.update(load_catalog_file(catalog_file))
+        return cls(products)
+
+
+def _number(value):
+    return float(value) if '.' in value else int(value)
+
+
+def load_catalog_file(path):
+    """Reads a JSON or CSV catalog file into the PRODUCTS shape."""
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    products = {}
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            row = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+            product = products.setdefault(row['product_id'], {'listings': {}})
+
+            if 'name' in row:
+                product['name'] = row['name']
+            if 'price_threshold' in row:
+                product['price_threshold'] = _number(row['price_threshold'])
+            if 'min_price' in row and 'max_price' in row:
+                product['price_bounds'] = (_number(row['min_price']), _number(row['max_price']))
+
+            overrides = {key: value for key, value in row.items() if key not in PRODUCT_COLUMNS}
+            for key in NUMERIC_SETTINGS:
+                if key in overrides:
+                    overrides[key] = _number(overrides[key])
+            product['listings'][row['site']] = overrides
+
+    logger.info(f"Loaded {len(products)} products from {path}")
+    return products
+
+
+def plan_by_domain(listings):
+    """
+    The scrape plan for a wave: listings grouped by domain, in catalog order within each domain.
+    Listings on the same domain are checked one after another (politely, over warm connections
+    and browsers); different domains run in parallel.
+    """
+    groups = {}
+    for listing in listings:
+        groups.setdefault(get_site_domain(listing.url), []).append(listing)
+    return groups
+
+
+def prices_by_product(prices):
+    """{(product_id, site): price} -> {product_id: {site: price}}, keeping the order they came in."""
+    grouped = {}
+    for (product_id, site), price in prices.items():
+        grouped.setdefault(product_id, {})[site] = price
+    return grouped
+
+
+_shared_catalog = None
+_shared_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the process-wide catalog, loaded once from config.py and CATALOG_FILE."""
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            _shared_catalog = Catalog.from_config()
+        return _shared_catalog
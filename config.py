@@ -2,32 +2,131 @@
 
 # Personal Settings - Adjust these to your preferences
 PRICE_THRESHOLD = 7500  # The price point where you want to be alerted
-CHECK_INTERVAL_HOURS = 6  # How often to check prices
+PRICE_BOUNDS = (5000, 15000)  # Sanity range - G-Shock watches typically cost between ₹5,000 and ₹15,000
+CHECK_INTERVAL_HOURS = 6  # How often to check prices (used by: python main.py --daemon)
+SCHEDULER_JITTER = 0.1  # Shift each interval randomly by up to 10% so checks don't always hit sites at the same minute
+
+# Adaptive Scheduling - give every listing its own check interval in --daemon mode
+ADAPTIVE_SCHEDULING = True  # False checks every listing every CHECK_INTERVAL_HOURS
+ADAPTIVE_MIN_INTERVAL_HOURS = 1  # Moving prices and prices close to the target are checked this often
+ADAPTIVE_MAX_INTERVAL_HOURS = CHECK_INTERVAL_HOURS  # Flat prices back off to at most this (never past CHECK_INTERVAL_HOURS)
+ADAPTIVE_BACKOFF = 1.5  # Each unchanged check stretches a listing's interval by this factor
+ADAPTIVE_THRESHOLD_MARGIN = 0.05  # Prices within 5% of the target (plus their usual swing) count as close
+ADAPTIVE_HISTORY_DAYS = 14  # Days of history used to estimate each listing's change rate at start-up
+ADAPTIVE_STATE_FILE = 'check_schedule.json'  # Each listing's interval, last price and volatility
 
 # Email Configuration for Alerts
 EMAIL_CONFIG = {
     'smtp_server': 'smtp.gmail.com',
     'smtp_port': 587,
     'email': 'sahilyhalbe@gmail.com',  # Replace with your actual email
-    'password': 'kbbk hepn wljv xqfc'  # Use Gmail app password, not regular password
+    'password': 'kbbk hepn wljv xqfc',  # Use Gmail app password, not regular password
+    'use_tls': True  # STARTTLS after connecting - set False for a local test mail server
 }
+NOTIFIER_DIGEST = True  # Send all alerts of one price check as a single email instead of one email per deal
+NOTIFIER_IDLE_TIMEOUT = 300  # Seconds an unused SMTP connection is kept open before logging out
 
 # File Settings
+HISTORY_BACKEND = 'csv'  # 'csv' keeps the plain history file, 'sqlite' stores history in HISTORY_DB
 HISTORY_FILE = 'price_history.csv'
-LOG_FILE = 'price_tracker.log'
+HISTORY_DB = 'price_history.db'  # Import an existing CSV once with: python storage.py import-csv
+HISTORY_ARCHIVE_DIR = 'history_archive'  # Parquet archive of old history: python history_archive.py compact --rotate
+HISTORY_ARCHIVE_PARTITION = 'month'  # Archive folders per 'month' (best for date ranges) or per 'site'
+HISTORY_ROLLUP_DB = 'price_rollups.db'  # Hourly/daily chart summaries for the CSV backend (SQLite keeps them in HISTORY_DB)
+LOG_FILE = 'price_tracker.log'  # JSON lines - one object per log record, with site/stage/duration when known
+HTTP_CACHE_FILE = 'http_cache.json'  # ETag / Last-Modified validators and the last price per URL
+HTTP_CACHE_ENABLED = True  # Ask servers "has this page changed?" instead of downloading it every time
+
+# Scraping Performance Settings
+SCRAPE_MODE = 'concurrent'  # 'concurrent' checks sites in parallel, 'sequential' checks them one by one
+MAX_CONCURRENT_SCRAPES = 4  # Upper limit on how many sites are fetched at the same time
+STRUCTURED_DATA_FIRST = True  # Read prices from ld+json / meta tags / page state before using selectors or Chrome
+HTML_PARSER = 'lxml'  # Default parser: 'selectolax', 'lxml' or 'html.parser' (both C parsers are in requirements.txt)
+PARTIAL_PARSE = True  # Only build the parts of a page the price selectors can match
+STATIC_FETCH_BACKEND = 'httpx'  # 'httpx' (async, pooled connections) or 'requests' (classic session)
+
+# Settings for the httpx backend - one shared client keeps connections open between checks
+HTTPX_SETTINGS = {
+    'http2': True,  # Only takes effect when the optional 'h2' package is installed
+    'max_connections': 20,  # Total open connections across all sites
+    'max_keepalive_connections': 10,  # Idle connections kept around for the next request
+    'connect_timeout': 5,  # Seconds allowed to establish a connection
+    'read_timeout': 15  # Seconds allowed for the page to arrive
+}
+
+# Browser Pool Settings - warm headless Chrome instances shared by every dynamic scrape
+USE_DRIVER_POOL = True  # Set to False to start one private browser per tracker instead
+DRIVER_POOL_SIZE = 2  # How many browsers may load pages at the same time
+DRIVER_MAX_PAGES = 50  # Restart a browser after it has loaded this many pages
+DRIVER_MAX_MEMORY_MB = 1024  # ...or as soon as it uses more memory than this
+DRIVER_ACQUIRE_TIMEOUT = 120  # Seconds a scrape waits for a free browser before giving up
+
+# Fast Render Settings - how much of a dynamic page the browser actually loads
+RENDER_MODE = 'fast'  # 'fast' skips heavy resources and stops once the price appears, 'full' loads everything (a site's own 'render_mode' wins)
+FULL_RENDER_LOAD_TIMEOUT = 30  # Seconds a 'full' site's page may take to finish loading in a browser started for fast mode
+FAST_RENDER_SETTINGS = {
+    'page_load_strategy': 'eager',  # 'eager' waits for the HTML only, 'none' doesn't wait at all
+    'blocked_groups': ['image', 'font', 'media', 'stylesheet', 'tracker']  # See fast_render.py for the patterns
+}
+
+# Rate Limiting - each retailer's request budget: one request per its 'wait_time' seconds, per domain
+RATE_LIMIT_BURST = 1  # Requests a domain may get back-to-back before the pacing starts (a site's own 'burst' wins)
+RESPECT_CRAWL_DELAY = True  # Read each domain's robots.txt once and never go faster than its Crawl-delay
+RETRY_AFTER_MAX_SECONDS = 120  # Longest Retry-After (on 429/503) a domain is paused for
+
+# Resilience - retry a site's hiccups, but stop visiting a site that keeps failing for a while
+RESILIENCE_POLICY = {
+    'attempts': 3,  # Tries per page download for transient errors (connection drops, 429, 5xx); 1 = no retries
+    'backoff_seconds': 1,  # Wait before the first retry, doubled for each further one, plus random jitter
+    'max_backoff_seconds': 10,  # Never wait longer than this between two tries
+    'failure_threshold': 3,  # Failed checks in a row before a site's circuit opens and it is skipped
+    'cooloff_minutes': 30,  # How long an open circuit skips the site before one trial check
+    'max_cooloff_minutes': 360  # Every failed trial doubles the cool-off, up to this
+}
+CIRCUIT_STATE_FILE = 'circuit_breakers.json'  # Each site's failure count and cool-off, kept across runs
+
+# Metrics - where each price check's time goes
+METRICS_ENABLED = True  # Time every stage (HTTP phases, browser, parse/select/extract, saving, alerts) per site
+METRICS_FILE = 'metrics.jsonl'  # One JSON line per check with the timings (None to turn off)
+METRICS_PORT = None  # e.g. 9108 serves Prometheus metrics at http://localhost:9108/metrics while --daemon runs
+
+# Logging - written by a background thread, so scraping never waits for the disk or the console
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Start a new LOG_FILE once it reaches this size...
+LOG_ROTATE_HOURS = 24  # ...or this age, whichever comes first; the old one is gzipped
+LOG_BACKUP_COUNT = 7  # Compressed old logs to keep (price_tracker.log.<date-time>.gz)
+LOG_DEBUG_SAMPLING = {}  # Share of DEBUG lines kept per site, e.g. {'Amazon India': 1.0, 'default': 0.05}; empty = no DEBUG
+
+# Dashboard Settings
+DASHBOARD_POLL_SECONDS = 5  # How often each open tab checks (cheaply) whether new prices have landed
+
+# Dashboard Chart Settings - keep the price history chart fast no matter how much history there is
+CHART_POINT_BUDGET = 2000  # Most points drawn in the chart, shared between all sites
+CHART_RAW_MAX_DAYS = 14  # Ranges up to this many days are drawn from individual checks
+CHART_HOURLY_MAX_DAYS = 90  # ...up to this many from hourly summaries, longer ranges from daily ones
+CHART_DOWNSAMPLING = 'lttb'  # 'lttb' keeps the visual shape, 'minmax' keeps every peak and dip
+CHART_WEBGL_THRESHOLD = 1000  # Draw with WebGL once the chart still has more points than this
 
 # Browser Settings
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 # Website Configuration
 # Each site has: URL, CSS selector, and scraping method (static or dynamic)
+# Optional: 'structured_data': False skips the structured-data shortcut for a site,
+# 'structured_paths' lists dotted paths to the product (or its price) in the site's page state,
+# 'structured_keys' lists the keys that hold the price in that product node,
+# 'sku' names the product when its ld+json url doesn't match the listing's,
+# 'parser' / 'partial_parse' override HTML_PARSER / PARTIAL_PARSE for static sites,
+# 'price_bounds' overrides PRICE_BOUNDS for one site,
+# 'resilience' overrides any key of RESILIENCE_POLICY for one site,
+# 'burst' overrides RATE_LIMIT_BURST for one site
 WATCH_SITES = {
     'Amazon India': {
         'url': 'https://www.amazon.in/Casio-Analog-Digital-Black-Watch-GA-2100-1A1DR-G987/dp/B07YCTCMFK/',
         'price_selector': '.a-price-whole',  # Simplified selector - more stable than your long one
         'backup_selector': '#corePriceDisplay_desktop_feature_div .a-price-whole',  # Fallback option
         'method': 'static',  # Amazon usually loads prices immediately
-        'wait_time': 3  # Seconds to wait between requests to be respectful
+        'parser': 'selectolax',  # Amazon pages are huge - the C parser pays off the most here
+        'wait_time': 3  # Seconds between requests to this domain, to be respectful (its rate limit)
     },
 
     'Flipkart': {
@@ -35,7 +134,11 @@ WATCH_SITES = {
         'price_selector': '._30jeq3',  # Shorter, more stable selector
         'backup_selector': '.UOCQB1 div',  # Alternative if main fails
         'method': 'dynamic',  # Flipkart often needs JavaScript to load prices
-        'wait_time': 4
+        'structured_paths': ['pageDataV4.page.pageData.pageContext.pricing'],  # Best guess at the product node
+        'structured_keys': ['finalPrice', 'sellingPrice'],
+        'wait_time': 4,
+        'render_block': ['*rukminim*.flixcart.com*'],  # Product image CDN - never needed for the price
+        'render_allow': []  # Resource groups or URL patterns that must still load in fast mode
     },
 
     'Myntra': {
@@ -43,7 +146,11 @@ WATCH_SITES = {
         'price_selector': '.pdp-price strong',  # Simplified from your complex selector
         'backup_selector': '.pdp-discount-container strong',
         'method': 'dynamic',  # Myntra loads content dynamically
-        'wait_time': 3
+        'structured_paths': ['pdpData.price'],
+        'structured_keys': ['discounted', 'sellingPrice'],
+        'wait_time': 3,
+        'render_block': ['*assets.myntassets.com*'],
+        'render_allow': []
     },
 
     'Casio Official': {
@@ -75,7 +182,9 @@ WATCH_SITES = {
         'price_selector': '.pdp-module__flxRgtIconColLft div',  # Simplified
         'backup_selector': '[data-testid="price"]',  # Common pattern for luxury sites
         'method': 'dynamic',  # Luxury sites often load prices dynamically
-        'wait_time': 4
+        'wait_time': 4,
+        'render_block': ['*img.tatacliq.com*'],
+        'render_allow': []
     },
 
     'Ajio': {
@@ -83,7 +192,11 @@ WATCH_SITES = {
         'price_selector': '.prod-price-section div',  # From your selector
         'backup_selector': '.price',
         'method': 'dynamic',  # Ajio typically needs JavaScript
-        'wait_time': 3
+        'structured_paths': ['product.productDetails.price'],
+        'structured_keys': ['offerPrice', 'sellingPrice'],
+        'wait_time': 3,
+        'render_block': ['*assets.ajio.com/medias*'],
+        'render_allow': []
     },
 
     'Helios': {
@@ -95,6 +208,31 @@ WATCH_SITES = {
     }
 }
 
+# Product Catalog - what to track, and where
+# WATCH_SITES above holds each retailer's settings (selectors, method, wait_time, ...);
+# every product lists its retailer pages ('listings') and may override any retailer setting per page.
+# Each product has: name, price_threshold (alert target) and optionally price_bounds (sanity range,
+# otherwise the retailer's 'price_bounds' or PRICE_BOUNDS)
+DEFAULT_PRODUCT = 'GA-2100-1A1'  # History recorded before products existed belongs to this one
+PRODUCTS = {
+    DEFAULT_PRODUCT: {
+        'name': 'G-Shock GA-2100-1A1',
+        'price_threshold': PRICE_THRESHOLD,
+        'listings': {site_name: {'url': site['url']} for site_name, site in WATCH_SITES.items()}
+    }
+}
+CATALOG_FILE = None  # Optional JSON or CSV file with more products - see catalog.py for the format
+
+# Deal Rules - when a price is worth an alert; every rule that matches adds its reason to the email
+DEAL_RULES = [
+    {'rule': 'threshold'},  # At or below the product's price_threshold
+    {'rule': 'new_low'},  # Below every price this retailer has ever had for the product
+    {'rule': 'median_drop', 'days': 7, 'percent': 10},  # 10% under the retailer's median daily price of the last 7 days
+    # The cheapest retailer, and 10% cheaper than the next cheapest one; retailers missing from the wave
+    # only count with a last price at most max_age_hours old (3 check intervals if not given)
+    {'rule': 'spread', 'percent': 10, 'max_age_hours': 3 * CHECK_INTERVAL_HOURS}
+]
+
 # Debugging Settings - Turn these on when testing
 DEBUG_MODE = True  # Set to False when running automatically
 VERBOSE_LOGGING = True  # Detailed output for troubleshooting
@@ -0,0 +1,214 @@
+# deal_rules.py - Decides which freshly scraped prices are worth an alert, for every listing at once
+#
+# Rules are declared in DEAL_RULES (config.py); each one that matches adds its reason to the alert:
+#   {'rule': 'threshold'}                               at/below the product's price_threshold
+#   {'rule': 'new_low'}                                 below every price this retailer has had for the product
+#   {'rule': 'median_drop', 'days': 7, 'percent': 10}   10% under the retailer's median daily close of 7 days
+#   {'rule': 'spread', 'percent': 10}                   the cheapest retailer, 10% under the next cheapest one
+#                                                       (other retailers' last prices count for max_age_hours)
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import DEAL_RULES, CHECK_INTERVAL_HOURS
+
+logger = logging.getLogger(__name__)
+
+RULE_DEFAULTS = {
+    'threshold': {},
+    'new_low': {},
+    'median_drop': {'days': 7, 'percent': 10},
+    'spread': {'percent': 10, 'max_age_hours': 3 * CHECK_INTERVAL_HOURS},
+}
+
+
+def median_column(days):
+    return f'median_{days}d'
+
+
+class DealRules:
+    """
+    Evaluates the deal rules over a whole wave as column operations, instead of an if-chain per site.
+    Like a spreadsheet with one row per listing and one formula per rule: filling the formulas down
+    costs about the same for ten listings as for ten thousand.
+
+    Prices are judged against the history *before* the wave is saved - otherwise a new low
+    would be compared with itself and never count as one.
+    """
+
+    def __init__(self, rules=DEAL_RULES):
+        self.rules = []
+        for rule in rules:
+            if rule.get('rule') not in RULE_DEFAULTS:
+                raise ValueError(f"Unknown deal rule {rule!r} (known rules: {', '.join(RULE_DEFAULTS)})")
+            self.rules.append({**RULE_DEFAULTS[rule['rule']], **rule})
+
+    @property
+    def median_days(self):
+        return sorted({rule['days'] for rule in self.rules if rule['rule'] == 'median_drop'})
+
+    def latest_state(self, catalog, product_ids, aggregates=None, rollups=None, now=None):
+        """
+        The compact table the rules run on: one row per listing of the given products, indexed by
+        (product, site), with the product's threshold, the listing's lowest and last known price
+        (and when that was seen), the product's lowest price, and the median daily close for every
+        median_drop window.
+        """
+        if aggregates is None:
+            from storage import get_history_store
+            aggregates = get_history_store().get_all_aggregates()
+
+        rows = []
+        for product_id in product_ids:
+            product = catalog.product(product_id)
+            product_aggregates = aggregates.get(product_id) or {'global': {}, 'sites': {}}
+            sites = dict.fromkeys(
+                [listing.site for listing in catalog.listings_for(product_id)] + list(product_aggregates['sites'])
+            )
+            for site in sites:
+                stats = product_aggregates['sites'].get(site, {})
+                rows.append((product_id, site, product.price_threshold, stats.get('min'),
+                             stats.get('last_price'), product_aggregates['global'].get('min'),
+                             stats.get('last_timestamp')))
+
+        state = pd.DataFrame.from_records(
+            rows, columns=['product', 'site', 'threshold', 'site_low', 'last_price', 'product_low', 'last_seen']
+        ).set_index(['product', 'site'])
+        last_seen = pd.to_datetime(state.pop('last_seen'))
+        state = state.astype(float)
+        state['last_seen'] = last_seen
+
+        if self.median_days and not state.empty:
+            now = now or datetime.now()
+            try:
+                if rollups is None:
+                    from history_rollups import get_rollup_store
+                    rollups = get_rollup_store()
+                since = (now - timedelta(days=max(self.median_days))).strftime('%Y-%m-%d %H:%M:%S')
+                history = rollups.read_frame('day', since=since)
+                history = history[history['product'].isin(set(product_ids))]
+            except Exception as e:
+                logger.warning(f"Could not read rollups for the median deal rule: {e}")
+                history = None
+
+            for days in self.median_days:
+                medians = None
+                if history is not None and not history.empty:
+                    window = history[history['timestamp'] >= pd.Timestamp(now - timedelta(days=days)).floor('D')]
+                    medians = window.groupby(['product', 'site'])['close'].median()
+                state[median_column(days)] = medians.reindex(state.index) if medians is not None else np.nan
+
+        return state
+
+    def evaluate(self, prices, state, now=None):
+        """
+        Runs every rule over the wave's prices ({(product_id, site): price}) and returns
+        {(product_id, site): [reason, ...]} for the listings that matched at least one rule.
+        """
+        if not prices:
+            return {}
+        now = now or datetime.now()
+
+        checked = pd.Series(prices, dtype=float)
+        checked.index = pd.MultiIndex.from_tuples(checked.index, names=['product', 'site'])
+        frame = state.reindex(state.index.union(checked.index))
+        frame['price'] = checked.reindex(frame.index)
+        frame['checked'] = frame['price'].notna()
+        # Retailers not checked this wave still count for the spread with their last known price
+        frame['price'] = frame['price'].fillna(frame['last_price'])
+
+        price = frame['price'].to_numpy()
+        checked_mask = frame['checked'].to_numpy()
+        keys = frame.index.to_list()
+        reasons = {}
+
+        def add(mask, describe):
+            # Only the (few) matching rows get a Python-level step: their reason text
+            for position in np.flatnonzero(np.asarray(mask, dtype=bool) & checked_mask):
+                reasons.setdefault(keys[position], []).append(describe(position))
+
+        for rule in self.rules:
+            kind = rule['rule']
+
+            if kind == 'threshold':
+                threshold = frame['threshold'].to_numpy()
+                add(price <= threshold, lambda i: f"At/below your target of ₹{threshold[i]:,.2f}")
+
+            elif kind == 'new_low':
+                site_low = frame['site_low'].to_numpy()
+                add(price < site_low, lambda i: f"New historical low at this store (was ₹{site_low[i]:,.2f})")
+
+            elif kind == 'median_drop':
+                median = frame[median_column(rule['days'])].to_numpy()
+                factor = 1 - rule['percent'] / 100
+                add(price <= median * factor,
+                    lambda i: f"{1 - price[i] / median[i]:.0%} below its {rule['days']}-day median of ₹{median[i]:,.2f}")
+
+            elif kind == 'spread':
+                # A retailer last seen days ago may well have changed its price - leave it out
+                fresh = frame['checked'] | (frame['last_seen'] >= now - timedelta(hours=rule['max_age_hours']))
+                ranked = frame[fresh].dropna(subset=['price']).reset_index().sort_values(['product', 'price'])
+                by_product = ranked.groupby('product', sort=False)
+                ranked['next_price'] = by_product['price'].shift(-1)
+                ranked['next_site'] = by_product['site'].shift(-1)
+                cheapest = by_product.cumcount() == 0
+                factor = 1 - rule['percent'] / 100
+                matched = ranked[cheapest & (ranked['price'] <= ranked['next_price'] * factor)]
+
+                positions = frame.index.get_indexer(pd.MultiIndex.from_frame(matched[['product', 'site']]))
+                mask = np.zeros(len(frame), dtype=bool)
+                mask[positions] = True
+                next_by_position = dict(zip(positions, zip(matched['next_site'], matched['next_price'])))
+                add(mask, lambda i: (f"{1 - price[i] / next_by_position[i][1]:.0%} cheaper than the next "
+                                     f"retailer ({next_by_position[i][0]} at ₹{next_by_position[i][1]:,.2f})"))
+
+        return reasons
+
+    def find_deals(self, prices, catalog, aggregates=None, rollups=None):
+        """
+        The alerts for one wave's prices ({(product_id, site): price}), ready for the notifier -
+        in the order the prices came in.
+        """
+        if not prices:
+            return []
+
+        product_ids = list(dict.fromkeys(product_id for product_id, _ in prices))
+        state = self.latest_state(catalog, product_ids, aggregates=aggregates, rollups=rollups)
+        reasons = self.evaluate(prices, state)
+        product_lows = state['product_low'].to_dict()
+
+        alerts = []
+        for key, price in prices.items():
+            if key not in reasons:
+                continue
+            product_id, site = key
+            product = catalog.product(product_id)
+            listing = catalog.listing(product_id, site)
+            product_low = product_lows.get(key, np.nan)
+            alerts.append({
+                'product_name': product.name,
+                'site': site,
+                'price': price,
+                'threshold': product.price_threshold,
+                'historical_low': float(product_low) if pd.notna(product_low) else float('inf'),
+                'reason': ' | '.join(reasons[key]),
+                'url': listing.url if listing else 'N/A'
+            })
+        return alerts
+
+
+_shared_rules = None
+_shared_rules_lock = threading.Lock()
+
+
+def get_deal_rules():
+    """Returns the process-wide rules engine built from DEAL_RULES."""
+    global _shared_rules
+    with _shared_rules_lock:
+        if _shared_rules is None:
+            _shared_rules = DealRules()
+        return _shared_rules
@@ -0,0 +1,97 @@
+# downsampling.py - Shrinks long price series to a point budget without losing their shape
+
+import numpy as np
+import pandas as pd
+
+from config import CHART_DOWNSAMPLING, CHART_HOURLY_MAX_DAYS, CHART_POINT_BUDGET, CHART_RAW_MAX_DAYS
+
+
+def choose_resolution(days_back):
+    """Which data a chart range is drawn from: 'raw' checks, 'hour' or 'day' rollups (days_back 0 = all time)."""
+    if 0 < days_back <= CHART_RAW_MAX_DAYS:
+        return 'raw'
+    if 0 < days_back <= CHART_HOURLY_MAX_DAYS:
+        return 'hour'
+    return 'day'
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: picks `threshold` points that keep a line looking the same.
+    Each bucket keeps the point forming the largest triangle with its neighbours, so spikes survive.
+    x and y are numeric numpy arrays; returns the indices of the points to keep.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = length - 1
+
+    # The first and last point are always kept; everything between is split into buckets
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        next_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas)) if len(areas) else start
+        kept[bucket + 1] = previous
+
+    return kept
+
+
+def minmax_indices(y, threshold):
+    """Keeps the lowest and highest point of every bucket - no price drop or spike is ever hidden."""
+    length = len(y)
+    if threshold >= length or threshold < 4:
+        return np.arange(length)
+
+    edges = np.linspace(0, length, threshold // 2 + 1).astype(np.int64)
+    kept = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        window = y[start:end]
+        kept.extend(sorted({start + int(np.argmin(window)), start + int(np.argmax(window))}))
+    return np.asarray(kept, dtype=np.int64)
+
+
+def downsample_frame(df, budget=CHART_POINT_BUDGET, method=CHART_DOWNSAMPLING,
+                     x_column='timestamp', y_column='price', group_column='site'):
+    """
+    Reduces a chart frame to about `budget` points in total, shared evenly between sites.
+    Sites with fewer points than their share are left untouched.
+    """
+    if df.empty or len(df) <= budget:
+        return df
+
+    groups = list(df.groupby(group_column, observed=True, sort=False))
+    per_group = max(budget // max(len(groups), 1), 4)
+
+    parts = []
+    for _, group in groups:
+        if len(group) <= per_group:
+            parts.append(group)
+            continue
+
+        group = group.sort_values(x_column, kind='stable')
+        y = group[y_column].to_numpy(dtype=float)
+        if method == 'minmax':
+            indices = minmax_indices(y, per_group)
+        else:
+            x = group[x_column].to_numpy().astype('datetime64[ns]').astype(np.int64).astype(float)
+            indices = lttb_indices(x, y, per_group)
+        parts.append(group.iloc[indices])
+
+    return pd.concat(parts, ignore_index=True)
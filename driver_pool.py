@@ -0,0 +1,291 @@
+# driver_pool.py - A pool of warm headless Chrome drivers shared by dynamic scrapes
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from fast_render import get_page_load_strategy
+from config import (USER_AGENT, DRIVER_POOL_SIZE, DRIVER_MAX_PAGES,
+                    DRIVER_MAX_MEMORY_MB, DRIVER_ACQUIRE_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+def build_chrome_options():
+    """
+    Builds the Chrome options used for every headless scraping browser.
+    Kept in one place so pooled and stand-alone drivers behave exactly the same.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+    chrome_options.add_argument('--headless')  # Run without showing browser window
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.page_load_strategy = get_page_load_strategy()
+    return chrome_options
+
+
+def create_chrome_driver():
+    """Starts a new headless Chrome instance."""
+    return webdriver.Chrome(options=build_chrome_options())
+
+
+def _process_tree_rss_mb(root_pid):
+    """
+    Adds up the resident memory of a process and all of its children (Linux only).
+    chromedriver spawns the browser, renderer and GPU processes, so the tree is what matters.
+    Returns None where /proc is not available.
+    """
+    if not os.path.isdir('/proc'):
+        return None
+
+    total_kb = 0
+    pending = [root_pid]
+
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f'/proc/{pid}/status') as status_file:
+                for line in status_file:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+
+            for task in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{task}/children') as children_file:
+                    pending.extend(int(child) for child in children_file.read().split())
+        except (OSError, ValueError):
+            continue
+
+    return total_kb / 1024
+
+
+def get_driver_memory_mb(driver):
+    """
+    Estimates how much memory a driver's browser is using, in megabytes.
+    Falls back to the page's JavaScript heap when the process tree can't be inspected.
+    """
+    try:
+        service_process = getattr(driver.service, 'process', None)
+        if service_process is not None:
+            rss_mb = _process_tree_rss_mb(service_process.pid)
+            if rss_mb:
+                return rss_mb
+    except Exception:
+        pass
+
+    try:
+        heap_bytes = driver.execute_script(
+            'return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;'
+        )
+        if heap_bytes:
+            return heap_bytes / (1024 * 1024)
+    except Exception:
+        pass
+
+    return None
+
+
+class PooledDriver:
+    """A driver plus the bookkeeping the pool needs to decide when to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_loaded = 0
+        self.created_at = time.time()
+        self.healthy = True
+
+
+class DriverPool:
+    """
+    Keeps a fixed number of headless Chrome drivers warm and lends them out one at a time.
+    Think of it as a taxi rank: scrapes take the next free car instead of building a new one.
+
+    A driver is retired and replaced after DRIVER_MAX_PAGES pages, once its memory use passes
+    DRIVER_MAX_MEMORY_MB, or when it stops responding. The pool lives for the whole process,
+    so repeated refreshes in the dashboard or daemon never pay Chrome's start-up cost again.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES,
+                 max_memory_mb=DRIVER_MAX_MEMORY_MB, acquire_timeout=DRIVER_ACQUIRE_TIMEOUT,
+                 driver_factory=create_chrome_driver):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.acquire_timeout = acquire_timeout
+        self.driver_factory = driver_factory
+
+        self._idle = queue.LifoQueue()  # Most recently used driver first - its caches are warmest
+        self._lock = threading.Lock()
+        self._total = 0  # Drivers that exist right now, idle or leased
+        self._closed = False
+
+    def _create(self):
+        """Starts a driver for the pool; the caller must already have reserved a slot."""
+        try:
+            pooled = PooledDriver(self.driver_factory())
+            logger.info("Browser driver initialized successfully")
+            return pooled
+        except Exception as e:
+            with self._lock:
+                self._total -= 1
+            logger.error(f"Failed to initialize browser driver: {e}")
+            raise
+
+    def _reserve_slot(self):
+        """Claims room for one more driver if the pool is not full yet."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Driver pool has been shut down")
+            if self._total < self.size:
+                self._total += 1
+                return True
+        return False
+
+    def warm_up(self, count=None):
+        """Starts drivers ahead of time so the first scrapes don't wait for Chrome."""
+        count = self.size if count is None else min(count, self.size)
+        started = 0
+
+        while started < count and self._reserve_slot():
+            self._idle.put(self._create())
+            started += 1
+
+        return started
+
+    def _acquire(self):
+        """Gets an idle driver, starts a new one if there is room, or waits for one to be returned."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        if self._reserve_slot():
+            return self._create()
+
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No browser became free within {self.acquire_timeout} seconds")
+
+    def _needs_recycling(self, pooled):
+        """Decides whether a returned driver should be retired instead of reused."""
+        if not pooled.healthy:
+            return "it stopped responding"
+
+        if self.max_pages and pooled.pages_loaded >= self.max_pages:
+            return f"it loaded {pooled.pages_loaded} pages"
+
+        if self.max_memory_mb:
+            memory_mb = get_driver_memory_mb(pooled.driver)
+            if memory_mb and memory_mb > self.max_memory_mb:
+                return f"it uses {memory_mb:.0f} MB of memory"
+
+        return None
+
+    def _retire(self, pooled, reason):
+        """Quits a worn-out driver and starts its replacement in the background."""
+        logger.info(f"Recycling browser driver because {reason}")
+
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while closing browser driver: {e}")
+
+        with self._lock:
+            self._total -= 1
+
+        if self._closed:
+            return
+
+        def replace():
+            try:
+                if self._reserve_slot():
+                    self._idle.put(self._create())
+            except Exception:
+                pass  # Already logged; the next lease() will try again
+
+        threading.Thread(target=replace, name='driver-pool-refill', daemon=True).start()
+
+    def _release(self, pooled):
+        """Takes a driver back after a scrape, recycling it if needed."""
+        reason = self._needs_recycling(pooled)
+
+        if reason or self._closed:
+            self._retire(pooled, reason or "the pool is shutting down")
+        else:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def lease(self):
+        """
+        Lends out a driver for one page load:
+
+            with pool.lease() as driver:
+                driver.get(url)
+
+        The driver goes back to the pool afterwards, even if the scrape fails.
+        """
+        pooled = self._acquire()
+        try:
+            yield pooled.driver
+        except Exception:
+            # Only a driver that can no longer answer a basic command is considered broken
+            try:
+                pooled.driver.current_url
+            except Exception:
+                pooled.healthy = False
+            raise
+        finally:
+            pooled.pages_loaded += 1
+            self._release(pooled)
+
+    def shutdown(self):
+        """Quits every idle driver. Leased drivers are quit as soon as they are returned."""
+        with self._lock:
+            self._closed = True
+
+        closed = 0
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                pooled.driver.quit()
+            except Exception as e:
+                logger.warning(f"Error while closing browser driver: {e}")
+
+            with self._lock:
+                self._total -= 1
+            closed += 1
+
+        if closed:
+            logger.info(f"Browser pool shut down ({closed} driver(s) closed)")
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    """
+    Returns the process-wide driver pool, creating it on first use.
+    Every PriceTracker leases from this pool, so warm browsers survive across refresh cycles.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool._closed:
+            _shared_pool = DriverPool()
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
@@ -0,0 +1,128 @@
+# fast_render.py - Lightweight page loading for dynamic sites
+
+import logging
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import RENDER_MODE, FAST_RENDER_SETTINGS, FULL_RENDER_LOAD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# URL patterns Chrome should never download in fast render mode, grouped so a site can opt back in.
+# Patterns use the wildcard syntax of the DevTools Network.setBlockedURLs command, which matches the
+# whole URL - build_blocked_url_patterns() adds a '*.ext?*' twin for each extension pattern, since
+# CDNs mostly serve images and fonts with a query string (photo.jpg?w=400).
+BLOCKED_RESOURCE_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.m3u8', '*.mp3'],
+    'stylesheet': ['*.css'],
+    'tracker': [
+        '*google-analytics.com*',
+        '*googletagmanager.com*',
+        '*doubleclick.net*',
+        '*googlesyndication.com*',
+        '*facebook.net*',
+        '*connect.facebook.com*',
+        '*hotjar.com*',
+        '*clarity.ms*',
+        '*criteo.com*',
+        '*taboola.com*',
+        '*moengage.com*',
+        '*webengage.com*',
+        '*branch.io*',
+        '*newrelic.com*',
+        '*nr-data.net*',
+    ],
+}
+
+
+def get_render_mode(site_config):
+    """Returns 'fast' or 'full' for a site; a site's own 'render_mode' beats the global RENDER_MODE."""
+    return site_config.get('render_mode', RENDER_MODE)
+
+
+def get_page_load_strategy():
+    """
+    Page-load strategy for new browsers: 'eager' returns from driver.get() once the HTML is parsed,
+    'none' returns immediately. Full render mode keeps Selenium's default of waiting for everything.
+    Browsers are shared by every site, so this follows the global RENDER_MODE - sites set to 'full'
+    on a fast browser catch up with wait_for_full_load().
+    """
+    if RENDER_MODE == 'fast':
+        return FAST_RENDER_SETTINGS['page_load_strategy']
+    return 'normal'
+
+
+def build_blocked_url_patterns(site_config):
+    """
+    Combines the default block list with a site's own 'render_block' and 'render_allow' entries.
+    'render_allow' may name whole groups from BLOCKED_RESOURCE_PATTERNS (e.g. 'stylesheet')
+    or individual patterns; 'render_block' adds extra patterns such as a retailer's image CDN.
+    """
+    allowed = set(site_config.get('render_allow', []))
+    patterns = []
+
+    for group in FAST_RENDER_SETTINGS['blocked_groups']:
+        if group in allowed:
+            continue
+        patterns.extend(
+            variant for pattern in BLOCKED_RESOURCE_PATTERNS.get(group, [])
+            if pattern not in allowed
+            for variant in _with_query_variant(pattern)
+        )
+
+    patterns.extend(
+        variant for pattern in site_config.get('render_block', [])
+        for variant in _with_query_variant(pattern)
+        if variant not in patterns
+    )
+    return patterns
+
+
+def _with_query_variant(pattern):
+    """'*.jpg' -> ['*.jpg', '*.jpg?*'], so the file is blocked with or without a query string."""
+    if pattern.startswith('*.') and '*' not in pattern[1:] and '?' not in pattern:
+        return [pattern, f'{pattern}?*']
+    return [pattern]
+
+
+def prepare_driver_for_site(driver, site_config):
+    """
+    Tells the browser which requests to drop before it navigates to a site.
+    Pooled drivers are shared between sites, so the block list is reset on every page.
+    """
+    patterns = build_blocked_url_patterns(site_config) if get_render_mode(site_config) == 'fast' else []
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        # Not every driver speaks the DevTools protocol - the page simply loads in full
+        logger.debug(f"Could not configure request blocking: {e}")
+
+
+def wait_for_full_load(driver, site_config, timeout=FULL_RENDER_LOAD_TIMEOUT):
+    """
+    Waits until a 'full' site's page has finished loading (document.readyState 'complete'), which is
+    what the 'normal' strategy would have waited for inside driver.get(). Nothing to do for fast
+    sites, or when the browsers already load pages in full.
+    """
+    if get_render_mode(site_config) != 'full' or get_page_load_strategy() == 'normal':
+        return
+
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda browser: browser.execute_script('return document.readyState') == 'complete'
+        )
+    except TimeoutException:
+        logger.warning(f"Page did not finish loading within {timeout} s - reading it as it is")
+
+
+def stop_page_load(driver):
+    """Stops any remaining downloads once the price is on the page - nothing else is needed."""
+    try:
+        driver.execute_script('window.stop();')
+    except Exception as e:
+        logger.debug(f"Could not stop page load: {e}")
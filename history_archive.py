@@ -0,0 +1,377 @@
+# history_archive.py - Columnar (Parquet) archive of old price history
+#
+# Maintenance commands (from the project folder):
+#   python history_archive.py compact            # copy new history rows into the archive
+#   python history_archive.py compact --rotate   # ...and empty the live CSV afterwards
+#   python history_archive.py export-ipc history.arrow --days 90
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+
+from config import HISTORY_ARCHIVE_DIR, HISTORY_ARCHIVE_PARTITION, DEFAULT_PRODUCT
+from history_index import empty_aggregates, fold_row
+from storage import file_lock
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+
+# Timestamps are int64 seconds since 1970 in the same wall-clock time the CSV uses, and site
+# and product names are dictionary-encoded so each name is stored once per file. Files archived
+# before products existed have no product column - their rows belong to DEFAULT_PRODUCT.
+ARCHIVE_SCHEMA = pa.schema([
+    ('timestamp', pa.int64()),
+    ('site', pa.dictionary(pa.int32(), pa.string())),
+    ('price', pa.float64()),
+    ('is_new_low', pa.bool_()),
+    ('below_threshold', pa.bool_()),
+    ('product', pa.dictionary(pa.int32(), pa.string())),
+])
+
+
+def to_epoch(timestamp):
+    """'2025-06-06 12:32:52' (or a datetime) -> seconds since 1970."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return int((timestamp - EPOCH).total_seconds())
+
+
+def from_epoch(seconds):
+    """Seconds since 1970 -> '2025-06-06 12:32:52'."""
+    return (EPOCH + timedelta(seconds=int(seconds))).strftime(TIMESTAMP_FORMAT)
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+class HistoryArchive:
+    """
+    Price history stored as Parquet files, partitioned by month ('month=2025-06') or by site.
+    Think of it as the filing cabinet: the live history file is the in-tray, and compaction
+    moves finished pages into labelled folders so a question about last week never opens last year.
+
+    Reads push date and site filters into the scan, so only matching partitions, row groups
+    and columns are touched. A small state file remembers the newest archived timestamp
+    (the watermark), running aggregates of everything archived, and how far into each live
+    store compaction has read (its offset, see HistoryStore.read_appended).
+    """
+
+    def __init__(self, root=HISTORY_ARCHIVE_DIR, partition_by=HISTORY_ARCHIVE_PARTITION):
+        if partition_by not in ('month', 'site'):
+            raise ValueError(f"Archive partitioning must be 'month' or 'site', not {partition_by!r}")
+
+        self.root = root
+        self.partition_by = partition_by
+        self.state_file = os.path.join(root, '_archive_state.json')
+        self._lock = threading.Lock()
+
+    # --- state -----------------------------------------------------------------------------
+
+    def _read_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return {'watermark': None, 'rows': 0, 'products': {}, 'offsets': {}}
+
+        if 'products' not in state:
+            # Written before products existed - everything archived so far belongs to DEFAULT_PRODUCT
+            state['products'] = {DEFAULT_PRODUCT: {'global': state.pop('global'), 'sites': state.pop('sites')}}
+        state.setdefault('offsets', {})
+        return state
+
+    def _write_state(self, state):
+        os.makedirs(self.root, exist_ok=True)
+        temp_path = f'{self.state_file}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=2)
+        os.replace(temp_path, self.state_file)
+
+    def get_watermark(self):
+        """Timestamp of the newest archived row ('YYYY-MM-DD HH:MM:SS'), or None if the archive is empty."""
+        return self._read_state()['watermark']
+
+    def get_all_aggregates(self):
+        """Running aggregates of the archived rows per product, in the same shape as the history index."""
+        return self._read_state()['products']
+
+    def get_aggregates(self, product=None):
+        """Running aggregates of one product's archived rows (DEFAULT_PRODUCT if None)."""
+        return self.get_all_aggregates().get(product or DEFAULT_PRODUCT) or empty_aggregates()
+
+    def exists(self):
+        return self.get_watermark() is not None
+
+    @staticmethod
+    def _offset(state, store):
+        """How far into the store compaction has read. Archives from before offsets start at their watermark."""
+        if store.path in state['offsets']:
+            return state['offsets'][store.path]
+        return store.offset_through(state['watermark']) if state['watermark'] else 0
+
+    def archived_offset(self, store):
+        """The offset (see HistoryStore.read_appended) up to which the store's rows are already archived."""
+        return self._offset(self._read_state(), store)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """One compaction or append at a time - across threads and processes alike."""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, file_lock(self.state_file):
+            yield
+
+    # --- writing ---------------------------------------------------------------------------
+
+    def _partitioning(self):
+        field = pa.field('month', pa.string()) if self.partition_by == 'month' else pa.field('site', pa.string())
+        return ds.partitioning(pa.schema([field]), flavor='hive')
+
+    def _dataset_schema(self):
+        """
+        The full schema of the dataset, given up front so files without a product column still
+        read (as nulls) whichever file happens to be scanned first.
+        """
+        if self.partition_by == 'month':
+            return ARCHIVE_SCHEMA.append(pa.field('month', pa.string()))
+        return ARCHIVE_SCHEMA.set(ARCHIVE_SCHEMA.get_field_index('site'), pa.field('site', pa.string()))
+
+    def append_rows(self, rows):
+        """Writes rows ({'timestamp', 'site', 'price', 'product', ...}, oldest first) as new Parquet files."""
+        if not rows:
+            return 0
+
+        with self._locked():
+            state = self._read_state()
+            self._append_locked(rows, state)
+            self._write_state(state)
+            return len(rows)
+
+    def _append_locked(self, rows, state):
+        """Writes the rows as new Parquet files and folds them into state, which the caller then saves."""
+        sites = pa.array([row['site'] for row in rows], pa.string())
+        columns = {
+            'timestamp': pa.array([to_epoch(row['timestamp']) for row in rows], pa.int64()),
+            # When partitioning by site, the folder name carries it and it must stay a plain string
+            'site': sites if self.partition_by == 'site' else sites.dictionary_encode(),
+            'price': pa.array([float(row['price']) for row in rows], pa.float64()),
+            'is_new_low': pa.array([_as_bool(row.get('is_new_low')) for row in rows], pa.bool_()),
+            'below_threshold': pa.array([_as_bool(row.get('below_threshold')) for row in rows], pa.bool_()),
+            'product': pa.array([row.get('product') or DEFAULT_PRODUCT for row in rows],
+                                pa.string()).dictionary_encode(),
+        }
+        if self.partition_by == 'month':
+            columns['month'] = pa.array([row['timestamp'][:7] for row in rows], pa.string())
+
+        table = pa.table(columns)
+
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=self._partitioning(),
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+
+        for row in rows:
+            fold_row(state['products'], row)
+
+        state['rows'] += len(rows)
+        state['watermark'] = max(filter(None, [state['watermark'], max(row['timestamp'] for row in rows)]))
+        logger.info(f"Archived {len(rows)} history rows (watermark {state['watermark']})")
+
+    def compact(self, store, rotate=False):
+        """
+        Copies every row the live history store gained since the last compaction into the archive.
+        With rotate=True a CSV store drops the archived rows afterwards, so the live file stays small.
+
+        Progress is kept as an offset into the store rather than a timestamp, so rows written in the
+        same second as the last archived one are still picked up next time. The archive stays locked
+        throughout, and the store locks its file while reading and rotating, so rows another process
+        appends meanwhile wait for the next compaction instead of being lost.
+        """
+        with self._locked():
+            state = self._read_state()
+            rows, next_offset = store.read_appended(self._offset(state, store))
+
+            valid_rows = []
+            for row in rows:
+                try:
+                    float(row['price'])
+                    valid_rows.append(row)
+                except (ValueError, TypeError):
+                    logger.warning(f"Skipping row with invalid price: {row.get('price')}")
+
+            if valid_rows:
+                self._append_locked(valid_rows, state)
+            state['offsets'][store.path] = next_offset
+            self._write_state(state)
+
+            # Only the CSV is rotated - SQLite answers date-range queries from its index anyway
+            if rotate and next_offset and hasattr(store, 'rotate_into_archive'):
+                state['offsets'][store.path] = next_offset - store.rotate_into_archive(next_offset)
+                self._write_state(state)
+
+            return len(valid_rows)
+
+    # --- reading ---------------------------------------------------------------------------
+
+    def _dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=self._partitioning(),
+                          schema=self._dataset_schema(), exclude_invalid_files=True)
+
+    def _filter(self, since=None, until=None, sites=None, product=None):
+        """Builds a filter with partition-level conditions, so whole folders are skipped."""
+        expression = None
+
+        def both(left, right):
+            return right if left is None else left & right
+
+        if since is not None:
+            expression = both(expression, ds.field('timestamp') >= to_epoch(since))
+            if self.partition_by == 'month':
+                expression = both(expression, ds.field('month') >= since[:7])
+        if until is not None:
+            expression = both(expression, ds.field('timestamp') < to_epoch(until))
+            if self.partition_by == 'month':
+                expression = both(expression, ds.field('month') <= until[:7])
+        if sites is not None:
+            expression = both(expression, ds.field('site').isin(list(sites)))
+        if product is not None:
+            matches = ds.field('product') == product
+            if product == DEFAULT_PRODUCT:
+                matches = matches | ds.field('product').is_null()
+            expression = both(expression, matches)
+
+        return expression
+
+    def read_table(self, since=None, until=None, sites=None, columns=None, product=None):
+        """Reads matching rows as an Arrow table, touching only the needed partitions and columns."""
+        if not self.exists():
+            return ARCHIVE_SCHEMA.empty_table()
+
+        columns = columns or ['timestamp', 'site', 'price', 'is_new_low', 'below_threshold', 'product']
+        return self._dataset().to_table(columns=columns, filter=self._filter(since, until, sites, product))
+
+    def read_frame(self, since=None, until=None, sites=None, columns=None, product=None):
+        """
+        Reads matching rows as a pandas DataFrame: datetime timestamps and categorical site and
+        product names, ready to be combined with the live history.
+        """
+        import pandas as pd
+
+        table = self.read_table(since, until, sites, columns, product)
+        df = table.to_pandas()
+
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+        if 'site' in df.columns:
+            df['site'] = df['site'].astype('category')
+        if 'product' in df.columns:
+            df['product'] = df['product'].astype(object).fillna(DEFAULT_PRODUCT).astype('category')
+
+        return df.sort_values('timestamp', kind='stable').reset_index(drop=True) if 'timestamp' in df.columns else df
+
+    def export_ipc(self, path, since=None, until=None, sites=None, product=None):
+        """Writes matching rows to an uncompressed Arrow IPC file that can be memory-mapped."""
+        table = self.read_table(since, until, sites, product=product)
+        with pa.OSFile(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return table.num_rows
+
+
+def query_history_frame(store, since=None, until=None, sites=None, archive=None, product=None):
+    """
+    One DataFrame of history from the archive and the live store together.
+    Rows compaction has archived come from Parquet, the rest from the store, so nothing is counted twice.
+    The split uses the store offset compaction reached, not the watermark's timestamp, so a row written
+    in the same second as the last archived one is still included. product=None means every product.
+    """
+    import pandas as pd
+
+    archive = archive or get_history_archive()
+    watermark = archive.get_watermark()
+    if watermark is None:
+        return store.query_frame(since=since, until=until, sites=sites, product=product)
+
+    frames = [frame for frame in (
+        archive.read_frame(since=since, until=until, sites=sites, product=product),
+        store.query_frame(since=since, until=until, sites=sites, product=product,
+                          after_offset=archive.archived_offset(store))
+    ) if not frame.empty]
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    df['site'] = df['site'].astype('category')
+    df['product'] = df['product'].astype('category')
+    return df
+
+
+def open_ipc(path):
+    """
+    Memory-maps an Arrow IPC export and returns it as a table without copying it into RAM.
+    Ideal for notebooks and analysis scripts working with years of history.
+    """
+    source = pa.memory_map(path, 'r')
+    return ipc.open_file(source).read_all()
+
+
+_shared_archive = None
+_shared_archive_lock = threading.Lock()
+
+
+def get_history_archive():
+    """Returns the process-wide archive for HISTORY_ARCHIVE_DIR."""
+    global _shared_archive
+    with _shared_archive_lock:
+        if _shared_archive is None:
+            _shared_archive = HistoryArchive()
+        return _shared_archive
+
+
+def main():
+    from storage import get_history_store
+
+    parser = argparse.ArgumentParser(description="Price history archive tools")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    compact_parser = subcommands.add_parser('compact', help="Move new history rows into the Parquet archive")
+    compact_parser.add_argument('--rotate', action='store_true', help="Empty the live CSV after archiving")
+
+    export_parser = subcommands.add_parser('export-ipc', help="Write the archive to an Arrow IPC file")
+    export_parser.add_argument('path', help="Output file, e.g. history.arrow")
+    export_parser.add_argument('--days', type=int, default=0, help="Only the last N days (0 = everything)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    archive = get_history_archive()
+
+    if args.command == 'compact':
+        archived = archive.compact(get_history_store(), rotate=args.rotate)
+        print(f"✅ Archived {archived} rows (watermark: {archive.get_watermark()})")
+
+    elif args.command == 'export-ipc':
+        since = (datetime.now() - timedelta(days=args.days)).strftime(TIMESTAMP_FORMAT) if args.days else None
+        exported = archive.export_ipc(args.path, since=since)
+        print(f"✅ Exported {exported} rows to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+# history_index.py - Running min/max/count/sum aggregates kept next to the price history file
+
+import copy
+import csv
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from config import DEFAULT_PRODUCT
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 3
+
+
+def index_path_for(history_file):
+    """'price_history.csv' -> 'price_history.index.json' in the same folder."""
+    base, _ = os.path.splitext(history_file)
+    return f'{base}.index.json'
+
+
+def empty_stats():
+    """Aggregates for a site (or everything) before any price has been seen."""
+    return {
+        'min': None,
+        'max': None,
+        'count': 0,
+        'sum': 0.0,
+        'last_price': None,
+        'first_timestamp': None,
+        'last_timestamp': None
+    }
+
+
+def empty_aggregates():
+    """Aggregates of one product before any price has been seen."""
+    return {'global': empty_stats(), 'sites': {}}
+
+
+def update_stats(stats, price, timestamp):
+    """Folds one price into a stats dict - the heart of keeping lookups O(1)."""
+    stats['min'] = price if stats['min'] is None else min(stats['min'], price)
+    stats['max'] = price if stats['max'] is None else max(stats['max'], price)
+    stats['count'] += 1
+    stats['sum'] += price
+    stats['last_price'] = price
+    if stats.get('first_timestamp') is None or timestamp < stats['first_timestamp']:
+        stats['first_timestamp'] = timestamp
+    stats['last_timestamp'] = timestamp
+
+
+def fold_row(products, row):
+    """
+    Folds one history row into per-product aggregates: {product: {'global': stats, 'sites': {site: stats}}}.
+    Rows from before products existed belong to DEFAULT_PRODUCT.
+    """
+    price = float(row['price'])
+    aggregates = products.setdefault(row.get('product') or DEFAULT_PRODUCT, empty_aggregates())
+    update_stats(aggregates['global'], price, row['timestamp'])
+    update_stats(aggregates['sites'].setdefault(row['site'], empty_stats()), price, row['timestamp'])
+
+
+class HistoryIndex:
+    """
+    Per-product, per-site aggregates of the price history, stored as a small JSON file.
+    Think of it as the running totals at the bottom of a ledger - you never re-add the whole column.
+
+    The index remembers how many bytes of the history file it has accounted for. If the file
+    was changed behind its back (edited, replaced, appended by an older version), the sizes
+    no longer match and the index is rebuilt from the CSV once.
+
+    If a baseline_loader is given, rebuilds start from the aggregates it returns (with the number of
+    leading CSV rows they already count) and only add the rows after those - that's how rows moved
+    into the archive keep counting.
+    """
+
+    def __init__(self, history_file, index_file=None, baseline_loader=None):
+        self.history_file = history_file
+        self.index_file = index_file or index_path_for(history_file)
+        self.baseline_loader = baseline_loader
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _history_size(self):
+        try:
+            return os.path.getsize(self.history_file)
+        except OSError:
+            return 0
+
+    def _read_index_file(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') == INDEX_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _write_index_file(self, data):
+        """Writes the index atomically so readers never see half of it."""
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False,
+                                             suffix='.tmp', encoding='utf-8') as temp_file:
+                json.dump(data, temp_file, indent=2)
+            os.replace(temp_file.name, self.index_file)
+        except OSError as e:
+            logger.error(f"Could not save history index: {e}")
+
+    def _fresh_data(self):
+        return {'version': INDEX_VERSION, 'source_size': 0, 'products': {}}
+
+    def rebuild(self):
+        """Recomputes every aggregate from the history CSV. Only needed when the index is missing or stale."""
+        with self._lock:
+            return self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        data = self._fresh_data()
+
+        # Rows already in the archive may no longer be in the CSV - start from their totals
+        covered_rows = 0
+        if self.baseline_loader:
+            baseline, covered_rows = self.baseline_loader()
+            data['products'] = copy.deepcopy(baseline)
+
+        if os.path.exists(self.history_file):
+            with open(self.history_file, 'r', newline='', encoding='utf-8') as file:
+                for row in itertools.islice(csv.DictReader(file), covered_rows, None):
+                    try:
+                        fold_row(data['products'], row)
+                    except (KeyError, ValueError, TypeError):
+                        logger.warning(f"Invalid price value found: {row.get('price')}")
+
+        data['source_size'] = self._history_size()
+        self._write_index_file(data)
+        self._data = data
+
+        records = sum(product['global']['count'] for product in data['products'].values())
+        logger.info(f"Rebuilt history index from {self.history_file} ({records} records)")
+        return data
+
+    def _current_locked(self):
+        """Returns up-to-date aggregates, rebuilding only if the history file changed unexpectedly."""
+        history_size = self._history_size()
+
+        if self._data is None or self._data['source_size'] != history_size:
+            # Another process (e.g. the dashboard) may have appended and updated the index file already
+            self._data = self._read_index_file()
+
+        if self._data is None or self._data['source_size'] != history_size:
+            return self._rebuild_locked()
+
+        return self._data
+
+    def get(self):
+        """All aggregates: {product: {'global': stats, 'sites': {site: stats}}}."""
+        with self._lock:
+            return self._current_locked()['products']
+
+    def get_product(self, product):
+        """One product's aggregates ({'global': stats, 'sites': {site: stats}}), or None if it has no history."""
+        with self._lock:
+            return self._current_locked()['products'].get(product)
+
+    def record(self, rows, size_before):
+        """
+        Folds freshly appended rows into the aggregates. size_before is the history file's size
+        just before the rows were written; if the index wasn't in sync with that, it is rebuilt instead.
+        """
+        with self._lock:
+            data = self._data
+            if data is None or data['source_size'] != size_before:
+                data = self._read_index_file()
+
+            if data is None or data['source_size'] != size_before:
+                return self._rebuild_locked()
+
+            for row in rows:
+                fold_row(data['products'], row)
+
+            data['source_size'] = self._history_size()
+            self._write_index_file(data)
+            self._data = data
+            return data
+
+    def mark_rewritten(self, size_before):
+        """
+        Called after rows that are already counted elsewhere (e.g. archived) were removed from the CSV.
+        The totals stay as they are and only the file size is brought back in step.
+        """
+        with self._lock:
+            data = self._data
+            if data is None or data['source_size'] != size_before:
+                data = self._read_index_file()
+
+            if data is None or data['source_size'] != size_before:
+                self._rebuild_locked()
+                return
+
+            data['source_size'] = self._history_size()
+            self._write_index_file(data)
+            self._data = data
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_history_index(history_file, baseline_loader=None):
+    """Returns the shared index for a history file, so all trackers in a process use one copy."""
+    with _indexes_lock:
+        if history_file not in _indexes:
+            _indexes[history_file] = HistoryIndex(history_file, baseline_loader=baseline_loader)
+        return _indexes[history_file]
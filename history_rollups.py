@@ -0,0 +1,264 @@
+# history_rollups.py - Hourly and daily OHLC summaries of the price history, kept up to date on every write
+#
+# History saved before the rollups existed is rolled up automatically the first time they are read.
+# To recompute everything by hand (from the project folder):
+#   python history_rollups.py rebuild
+
+import argparse
+import logging
+import sqlite3
+import threading
+
+from config import HISTORY_BACKEND, HISTORY_DB, HISTORY_ROLLUP_DB, DEFAULT_PRODUCT
+
+logger = logging.getLogger(__name__)
+
+# Resolution name -> how many characters of 'YYYY-MM-DD HH:MM:SS' identify the bucket, and the padding
+RESOLUTIONS = {
+    'hour': (13, ':00:00'),
+    'day': (10, ' 00:00:00'),
+}
+
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS price_rollups (
+        resolution TEXT NOT NULL,
+        product TEXT NOT NULL,
+        site TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        count INTEGER NOT NULL,
+        sum_price REAL NOT NULL,
+        first_timestamp TEXT NOT NULL,
+        last_timestamp TEXT NOT NULL,
+        PRIMARY KEY (resolution, product, site, bucket)
+    );
+    CREATE INDEX IF NOT EXISTS idx_price_rollups_bucket ON price_rollups (resolution, bucket);
+"""
+
+# One price folded into its bucket: open/close follow the earliest/latest timestamp, high/low the extremes
+UPSERT_ROLLUP = """
+    INSERT INTO price_rollups (resolution, product, site, bucket, open, high, low, close, count, sum_price,
+                               first_timestamp, last_timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+    ON CONFLICT (resolution, product, site, bucket) DO UPDATE SET
+        open = CASE WHEN excluded.first_timestamp < first_timestamp THEN excluded.open ELSE open END,
+        high = MAX(high, excluded.high),
+        low = MIN(low, excluded.low),
+        close = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.close ELSE close END,
+        count = count + 1,
+        sum_price = sum_price + excluded.sum_price,
+        first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+        last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+"""
+
+
+def bucket_for(timestamp, resolution):
+    """'2025-06-06 12:32:52' -> '2025-06-06 12:00:00' (hour) or '2025-06-06 00:00:00' (day)."""
+    length, padding = RESOLUTIONS[resolution]
+    return timestamp[:length] + padding
+
+
+def rollup_values(rows):
+    """Parameter tuples for UPSERT_ROLLUP - one per row and resolution."""
+    values = []
+    for row in rows:
+        price = float(row['price'])
+        timestamp = row['timestamp']
+        product = row.get('product') or DEFAULT_PRODUCT
+        for resolution in RESOLUTIONS:
+            values.append((resolution, product, row['site'], bucket_for(timestamp, resolution),
+                           price, price, price, price, price, timestamp, timestamp))
+    return values
+
+
+def history_rows(store):
+    """Every row of the history - archive and live store - in the shape rollup_values() takes."""
+    from history_archive import query_history_frame
+
+    df = query_history_frame(store)
+    if df.empty:
+        return []
+    return [
+        {'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'), 'site': str(site), 'price': price,
+         'product': str(product)}
+        for timestamp, site, price, product in zip(df['timestamp'], df['site'], df['price'], df['product'])
+    ]
+
+
+def ensure_rollup_schema(connection):
+    """
+    Creates the rollup table, first upgrading one from before products existed:
+    its buckets are copied over as DEFAULT_PRODUCT's, so nothing has to be rebuilt.
+    """
+    columns = [row[1] for row in connection.execute('PRAGMA table_info(price_rollups)')]
+    if columns and 'product' not in columns:
+        connection.execute('DROP INDEX IF EXISTS idx_price_rollups_bucket')
+        connection.execute('ALTER TABLE price_rollups RENAME TO price_rollups_before_products')
+        connection.executescript(ROLLUP_SCHEMA)
+        connection.execute(
+            f"INSERT INTO price_rollups SELECT resolution, '{DEFAULT_PRODUCT}', site, bucket, open, high, low, "
+            'close, count, sum_price, first_timestamp, last_timestamp FROM price_rollups_before_products'
+        )
+        connection.execute('DROP TABLE price_rollups_before_products')
+        connection.commit()
+        logger.info(f"Moved existing price rollups to product {DEFAULT_PRODUCT}")
+    else:
+        connection.executescript(ROLLUP_SCHEMA)
+
+
+class RollupStore:
+    """
+    Per-product, per-site hourly and daily open/high/low/close prices in a small SQLite table.
+    Like the "weekly summary" page of a ledger: long date ranges are answered from a few
+    hundred summary rows instead of every single price ever recorded.
+
+    Rollups are filled as prices are saved. History from before that (an upgrade, an imported CSV)
+    is rolled up the first time the rollups are read, see ensure_backfilled().
+    """
+
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.backend = backend
+        self._local = threading.local()  # sqlite3 connections can't be shared between threads
+        self._backfill_lock = threading.Lock()
+        self._backfill_checked = False
+        with self._connection() as connection:
+            ensure_rollup_schema(connection)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA busy_timeout=30000')
+            self._local.connection = connection
+        return connection
+
+    def record(self, rows):
+        """Folds freshly saved rows into their hourly and daily buckets, in one transaction."""
+        if not rows:
+            return
+        with self._connection() as connection:
+            connection.executemany(UPSERT_ROLLUP, rollup_values(rows))
+
+    def is_empty(self):
+        return self._connection().execute('SELECT 1 FROM price_rollups LIMIT 1').fetchone() is None
+
+    def rebuild(self, store):
+        """Replaces every rollup with ones computed from the store's full history. Returns the rows rolled up."""
+        connection = self._connection()
+        with connection:
+            # Hold the write lock while reading, so prices saved meanwhile are rolled up after this, not lost
+            connection.execute('BEGIN IMMEDIATE')
+            rows = history_rows(store)
+            connection.execute('DELETE FROM price_rollups')
+            connection.executemany(UPSERT_ROLLUP, rollup_values(rows))
+        logger.info(f"Rebuilt price rollups from {len(rows)} history rows")
+        return len(rows)
+
+    def covers(self, first_timestamps):
+        """Whether every product's rollups reach back to its first recorded price ({product: first timestamp})."""
+        earliest = {
+            row[0]: row[1] for row in self._connection().execute(
+                "SELECT product, MIN(first_timestamp) FROM price_rollups WHERE resolution = 'day' GROUP BY product"
+            )
+        }
+        return all(earliest.get(product) is not None and earliest[product] <= first
+                   for product, first in first_timestamps.items() if first)
+
+    def ensure_backfilled(self):
+        """
+        Rebuilds the rollups once per process if the history reaches back further than they do - the
+        first read after upgrading, when only prices saved since had been rolled up. Without it the
+        longer chart ranges and the median rules would quietly start at the upgrade.
+        """
+        with self._backfill_lock:
+            if self._backfill_checked:
+                return
+            self._backfill_checked = True
+
+            from storage import get_history_store  # storage imports this module
+            store = get_history_store(self.backend)
+            first_timestamps = {product: aggregates['global']['first_timestamp']
+                                for product, aggregates in store.get_all_aggregates().items()}
+            if self.covers(first_timestamps):
+                return
+
+            logger.info("Price rollups don't cover the whole history yet - rolling it up once")
+            self.rebuild(store)
+
+    def read_frame(self, resolution, since=None, until=None, sites=None, product=None):
+        """
+        Rollups as a DataFrame: timestamp (bucket start), product, site, open, high, low, close, count, average.
+        'price' is the close, so the frame can be charted like raw history. product=None means every product.
+        """
+        import pandas as pd
+
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown rollup resolution: {resolution}")
+        self.ensure_backfilled()
+
+        clauses, params = ['resolution = ?'], [resolution]
+        if product is not None:
+            clauses.append('product = ?')
+            params.append(product)
+        if since is not None:
+            clauses.append('bucket >= ?')
+            params.append(bucket_for(since, resolution))
+        if until is not None:
+            clauses.append('bucket < ?')
+            params.append(until)
+        if sites is not None:
+            sites = list(sites)
+            clauses.append(f"site IN ({', '.join('?' * len(sites))})")
+            params.extend(sites)
+
+        df = pd.read_sql_query(
+            'SELECT bucket AS timestamp, product, site, open, high, low, close, count, sum_price / count AS average '
+            f"FROM price_rollups WHERE {' AND '.join(clauses)} ORDER BY bucket, product, site",
+            self._connection(),
+            params=params
+        )
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['price'] = df['close']
+        return df
+
+
+_rollup_stores = {}
+_rollup_stores_lock = threading.Lock()
+
+
+def get_rollup_store(backend=None):
+    """
+    Returns the shared rollup store. With the SQLite backend the rollups live in HISTORY_DB itself
+    (and are written in the same transaction as the rows); with CSV they get their own HISTORY_ROLLUP_DB.
+    """
+    backend = backend or HISTORY_BACKEND
+    path = HISTORY_DB if backend == 'sqlite' else HISTORY_ROLLUP_DB
+    with _rollup_stores_lock:
+        if path not in _rollup_stores:
+            _rollup_stores[path] = RollupStore(path, backend)
+        return _rollup_stores[path]
+
+
+def main():
+    from storage import get_history_store
+
+    parser = argparse.ArgumentParser(description="Price history rollup tools")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('rebuild', help="Recompute hourly and daily rollups from the full history")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'rebuild':
+        rolled_up = get_rollup_store().rebuild(get_history_store())
+        print(f"✅ Rebuilt rollups from {rolled_up} history rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# html_parsers.py - Interchangeable HTML parser backends for static scraping
+
+import importlib.util
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference when the requested one isn't installed
+LXML_AVAILABLE = importlib.util.find_spec('lxml') is not None
+SELECTOLAX_AVAILABLE = importlib.util.find_spec('selectolax') is not None
+
+PARSER_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+# One simple selector like div#main.price.big[data-price] - the part before the first combinator
+COMPOUND_PATTERN = re.compile(
+    r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:[#.][\w-]+|\[[\w-]+(?:[~|^$*]?=["\']?[^\]"\']*["\']?)?\])*)$'
+)
+PART_PATTERN = re.compile(r'#([\w-]+)|\.([\w-]+)|\[([\w-]+)')
+
+# Tags and class fragments that mean "shown with strike-through" - usually the MRP, not the selling price
+STRUCK_TAGS = {'del', 's', 'strike'}
+STRUCK_CLASS_HINTS = ('strike', 'line-through', 'mrp', 'old-price', 'was-price')
+
+_warned_backends = set()
+
+
+def _looks_struck(tag_name, class_value):
+    """Whether one element is styled as a crossed-out price."""
+    if tag_name in STRUCK_TAGS:
+        return True
+    class_value = ' '.join(class_value) if isinstance(class_value, list) else (class_value or '')
+    class_value = class_value.lower()
+    return any(hint in class_value for hint in STRUCK_CLASS_HINTS)
+
+
+def available_backends():
+    """Lists the parser backends that can actually be used in this environment."""
+    backends = []
+    if SELECTOLAX_AVAILABLE:
+        backends.append('selectolax')
+    if LXML_AVAILABLE:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def resolve_backend(backend):
+    """
+    Returns the requested backend if it is installed, otherwise the best one that is.
+    selectolax falls back to lxml, and lxml falls back to Python's built-in html.parser.
+    """
+    available = available_backends()
+    if backend in available:
+        return backend
+
+    fallback = next(
+        (name for name in PARSER_BACKENDS[PARSER_BACKENDS.index(backend) + 1:] if name in available),
+        'html.parser'
+    ) if backend in PARSER_BACKENDS else 'html.parser'
+
+    if backend not in _warned_backends:
+        _warned_backends.add(backend)
+        logger.warning(f"HTML parser '{backend}' is not available, using '{fallback}' instead")
+    return fallback
+
+
+def supports_partial_parse(backend):
+    """Partial parsing is a BeautifulSoup feature; selectolax always parses the whole page (quickly)."""
+    return resolve_backend(backend) != 'selectolax'
+
+
+def _parse_compound(compound):
+    """Turns one simple selector into (tag, ids, classes, attribute names), or None if unsupported."""
+    match = COMPOUND_PATTERN.match(compound)
+    if not match or not compound:
+        return None
+
+    ids, classes, attributes = [], [], []
+    for element_id, class_name, attribute in PART_PATTERN.findall(match.group('rest')):
+        if element_id:
+            ids.append(element_id)
+        elif class_name:
+            classes.append(class_name)
+        else:
+            attributes.append(attribute)
+
+    return (match.group('tag') or '').lower(), ids, classes, attributes
+
+
+class SelectorStrainer(ElementFilter):
+    """
+    A SoupStrainer-style filter that only builds the parts of a page the selectors can match.
+    Tags matching the first step of any selector are kept together with everything inside them;
+    the rest of the document is skipped, so navigation, footers and product grids never become objects.
+    Crossed-out tags (<del>, <s>, class="mrp" and friends) are kept too, so a price inside one
+    still has the ancestor that marks it as struck.
+    """
+
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+
+    @classmethod
+    def from_selectors(cls, selectors):
+        """
+        Builds a strainer from CSS selectors, or returns None if any of them can't be narrowed safely.
+        Only descendant (' ') and child ('>') combinators are supported - sibling combinators,
+        selector lists and pseudo-classes need the surrounding document, so they get a full parse.
+        """
+        rules = []
+        for selector in selectors:
+            selector = selector.strip()
+            if not selector or any(token in selector for token in (',', '+', '~', ':')):
+                return None
+
+            leading = re.split(r'\s*>\s*|\s+', selector)[0]
+            rule = _parse_compound(leading)
+            if rule is None or rule == ('', [], [], []):
+                return None
+            rules.append(rule)
+
+        return cls(rules) if rules else None
+
+    @property
+    def includes_everything(self):
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        attrs = attrs or {}
+        if _looks_struck(name, attrs.get('class')):
+            return True
+
+        raw_classes = attrs.get('class', '')
+        tag_classes = set(raw_classes.split() if isinstance(raw_classes, str) else raw_classes)
+
+        for tag, ids, classes, attributes in self.rules:
+            if tag and tag != name:
+                continue
+            if ids and attrs.get('id') not in ids:
+                continue
+            if classes and not set(classes) <= tag_classes:
+                continue
+            if attributes and not all(attribute in attrs for attribute in attributes):
+                continue
+            return True
+
+        return False
+
+    def allow_string_creation(self, string):
+        # Text outside the kept subtrees is never needed
+        return False
+
+
+class SoupPage:
+    """A page parsed with BeautifulSoup (html.parser or lxml), optionally only partially."""
+
+    def __init__(self, html, features, strainer=None):
+        self.soup = BeautifulSoup(html, features, parse_only=strainer)
+
+    def select_one_text(self, selector):
+        element = self.soup.select_one(selector)
+        return element.get_text(strip=True) if element else None
+
+    def select_all_texts(self, selector):
+        return [element.get_text(strip=True) for element in self.soup.select(selector)]
+
+    def select_all_candidates(self, selector):
+        """Every match as {'text': ..., 'struck': ...}, where struck means it or a parent is crossed out."""
+        candidates = []
+        for element in self.soup.select(selector):
+            struck = any(
+                _looks_struck(node.name, node.get('class'))
+                for node in [element, *element.parents] if node.name
+            )
+            candidates.append({'text': element.get_text(strip=True), 'struck': struck})
+        return candidates
+
+
+class LexborPage:
+    """A page parsed with selectolax's lexbor engine - a C parser with its own CSS matcher."""
+
+    def __init__(self, html):
+        from selectolax.lexbor import LexborHTMLParser
+        self.tree = LexborHTMLParser(html)
+
+    def select_one_text(self, selector):
+        node = self.tree.css_first(selector)
+        return node.text(strip=True) if node else None
+
+    def select_all_texts(self, selector):
+        return [node.text(strip=True) for node in self.tree.css(selector)]
+
+    def select_all_candidates(self, selector):
+        """Every match as {'text': ..., 'struck': ...}, where struck means it or a parent is crossed out."""
+        candidates = []
+        for node in self.tree.css(selector):
+            struck = False
+            current = node
+            while current is not None and current.tag not in ('html', '-undef'):
+                if _looks_struck(current.tag, current.attributes.get('class')):
+                    struck = True
+                    break
+                current = current.parent
+            candidates.append({'text': node.text(strip=True), 'struck': struck})
+        return candidates
+
+
+def parse_html(html, backend='html.parser', selectors=None, partial=False):
+    """
+    Parses a page with the chosen backend and returns an object with
+    select_one_text(selector), select_all_texts(selector) and select_all_candidates(selector).
+
+    With partial=True and BeautifulSoup-based backends, only the subtrees the given
+    selectors can match are built. Callers should retry with partial=False if nothing
+    is found, because a partial tree can't answer every selector.
+    """
+    backend = resolve_backend(backend)
+
+    if backend == 'selectolax':
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', errors='replace')
+        return LexborPage(html)
+
+    strainer = SelectorStrainer.from_selectors(selectors or []) if partial else None
+    return SoupPage(html, backend, strainer)
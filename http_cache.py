@@ -0,0 +1,141 @@
+# http_cache.py - Remembers ETag / Last-Modified validators so unchanged pages aren't downloaded again
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from config import HTTP_CACHE_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class HttpValidatorCache:
+    """
+    An on-disk cache of HTTP validators and the price last extracted from each URL.
+    This is like asking the shopkeeper "has anything changed since my last visit?"
+    instead of reading the whole catalogue again.
+
+    A request carries If-None-Match / If-Modified-Since; when the server answers
+    304 Not Modified the stored price is reused without downloading or parsing the page.
+    Hits and misses are counted per site so the benefit can be measured.
+    """
+
+    def __init__(self, path=HTTP_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = {}
+        self.stats = {}
+        self._load()
+
+    def _load(self):
+        """Reads the cache file; a missing or damaged file just means an empty cache."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.entries = data.get('entries', {})
+            self.stats = data.get('stats', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable HTTP cache file {self.path}: {e}")
+
+    def conditional_headers(self, url):
+        """Validator headers for a URL, or an empty dict if there's no usable cached price."""
+        with self._lock:
+            entry = self.entries.get(url)
+
+        if not entry or entry.get('price') is None:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_cached_price(self, url):
+        """The price extracted the last time this URL was downloaded in full."""
+        with self._lock:
+            entry = self.entries.get(url)
+        return entry.get('price') if entry else None
+
+    def store(self, url, response_headers, price):
+        """Saves the validators from a fresh response together with the price found in it."""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+
+        with self._lock:
+            if not etag and not last_modified:
+                # Without validators the server can never answer 304, so there is nothing to keep
+                if self.entries.pop(url, None) is not None:
+                    self._dirty = True
+                return
+
+            self.entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'price': price,
+                'stored_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self._dirty = True
+
+    def invalidate(self, url):
+        """Forgets a URL, e.g. when a 304 arrives but no price was ever stored for it."""
+        with self._lock:
+            if self.entries.pop(url, None) is not None:
+                self._dirty = True
+
+    def record(self, site_name, hit):
+        """Counts a cache hit (304 reused) or miss (full download) for a site."""
+        with self._lock:
+            site_stats = self.stats.setdefault(site_name, {'hits': 0, 'misses': 0})
+            site_stats['hits' if hit else 'misses'] += 1
+            self._dirty = True
+
+    def get_hit_rates(self):
+        """Returns {site: {'hits': n, 'misses': n, 'hit_rate': 0.0-1.0}}."""
+        with self._lock:
+            rates = {}
+            for site_name, site_stats in self.stats.items():
+                total = site_stats['hits'] + site_stats['misses']
+                rates[site_name] = {
+                    **site_stats,
+                    'hit_rate': site_stats['hits'] / total if total else 0.0
+                }
+            return rates
+
+    def save(self):
+        """Writes the cache to disk atomically, so a crash never leaves half a file behind."""
+        with self._lock:
+            if not self._dirty:
+                return
+            serialized = json.dumps({'entries': self.entries, 'stats': self.stats}, indent=2)
+            self._dirty = False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False,
+                                             suffix='.tmp', encoding='utf-8') as temp_file:
+                temp_file.write(serialized)
+            os.replace(temp_file.name, self.path)
+        except OSError as e:
+            logger.error(f"Could not save HTTP cache: {e}")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Returns the process-wide validator cache so every tracker reads and writes the same file."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = HttpValidatorCache()
+        return _shared_cache
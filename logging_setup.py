@@ -0,0 +1,227 @@
+# logging_setup.py - One logging pipeline for the tracker and the dashboard: queued, JSON lines, rotated
+#
+# Every logger.info(...) only puts the record on a queue; a background thread formats it and writes
+# it to the console and to LOG_FILE. LOG_FILE gets one JSON object per line:
+#   {"time": "...", "level": "INFO", "logger": "main", "message": "...", "site": "Amazon India",
+#    "stage": "http.request", "duration": 0.412}
+# site is filled in from the site the thread is scraping (see metrics.Metrics.site); stage and
+# duration come from logger.debug(..., extra={'stage': ..., 'duration': ...}).
+#
+# Read it with e.g.:  jq -c 'select(.site == "Flipkart")' price_tracker.log
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from config import (LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_HOURS, LOG_BACKUP_COUNT, LOG_DEBUG_SAMPLING,
+                    VERBOSE_LOGGING)
+from metrics import get_metrics
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Record attributes copied into the JSON line when a record has them
+EXTRA_FIELDS = ('site', 'stage', 'duration')
+
+# Libraries whose DEBUG output would drown ours - they stay at INFO even when DEBUG sampling is on
+NOISY_LIBRARIES = ('httpx', 'httpcore', 'hpack', 'urllib3', 'selenium', 'asyncio', 'PIL', 'matplotlib')
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object on one line - easy to grep, jq or load into pandas."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = round(value, 6) if isinstance(value, float) else value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SiteContextFilter(logging.Filter):
+    """
+    Tags records with the site the logging thread is working on, then thins out DEBUG records:
+    each site keeps its share from LOG_DEBUG_SAMPLING ('default' for the rest). Runs in the
+    thread that logs, before the queue, so dropped records cost next to nothing.
+    """
+
+    def __init__(self, sampling=None):
+        super().__init__()
+        self.sampling = dict(LOG_DEBUG_SAMPLING if sampling is None else sampling)
+        self.default_rate = self.sampling.get('default', 0.0)
+
+    def filter(self, record):
+        if getattr(record, 'site', None) is None:
+            record.site = get_metrics().current_site()
+
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.sampling.get(record.site, self.default_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    A log file that starts over when it gets too big or too old, whichever comes first - like
+    RotatingFileHandler and TimedRotatingFileHandler in one. Old files are gzipped to
+    <name>.<date-time>.gz and only the newest backup_count are kept.
+
+    A file's age counts from its first record, read back from the first line - so short runs
+    from cron, each appending a little, still rotate once the file is old enough. A file that
+    isn't JSON lines (the plain-text log from before) is rotated aside as soon as it's opened.
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, max_age_seconds=LOG_ROTATE_HOURS * 3600,
+                 backup_count=LOG_BACKUP_COUNT, encoding='utf-8'):
+        super().__init__(filename, 'a', encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.backup_count = backup_count
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+        started = self._first_record_time()
+        if started is None:
+            # Not our format - rotate the old log aside rather than mixing formats in one file
+            self.doRollover()
+        else:
+            self.rollover_at = started + max_age_seconds if max_age_seconds else None
+
+    def _first_record_time(self):
+        """
+        When the current file was started: the time of its first JSON record, or now for a
+        missing or empty file. None if the file holds something else (e.g. the old text log).
+        """
+        try:
+            with open(self.baseFilename, 'r', encoding='utf-8') as file:
+                first_line = file.readline()
+        except FileNotFoundError:
+            return time.time()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        if not first_line.strip():
+            return time.time()
+        try:
+            return datetime.fromisoformat(json.loads(first_line)['time']).timestamp()
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def shouldRollover(self, record):
+        if not os.path.exists(self.baseFilename):
+            return False
+        if self.rollover_at and time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        destination = self.rotation_filename(f"{self.baseFilename}.{datetime.now():%Y%m%d-%H%M%S}")
+        if os.path.exists(destination):
+            destination = self.rotation_filename(f"{self.baseFilename}.{datetime.now():%Y%m%d-%H%M%S-%f}")
+        self.rotate(self.baseFilename, destination)
+
+        backups = sorted(glob.glob(glob.escape(self.baseFilename) + '.*.gz'), key=os.path.getmtime)
+        for old_backup in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(old_backup)
+
+        self.stream = self._open()
+        self.rollover_at = time.time() + self.max_age_seconds if self.max_age_seconds else None
+
+    @staticmethod
+    def _compress(source, destination):
+        with open(source, 'rb') as plain, gzip.open(destination, 'wb') as compressed:
+            shutil.copyfileobj(plain, compressed)
+        os.remove(source)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _apply_level(root, site_filter, verbose):
+    if site_filter.sampling:
+        root.setLevel(logging.DEBUG)
+        for library in NOISY_LIBRARIES:
+            logging.getLogger(library).setLevel(logging.INFO)
+    else:
+        root.setLevel(logging.INFO if verbose else logging.WARNING)
+
+
+def setup_logging(verbose=None, log_file=LOG_FILE, console=True, sampling=None):
+    """
+    Routes all logging through one queue and one background writer thread.
+    Think of it as a mail slot: threads drop their records in and go straight back to work.
+
+    Safe to call again (Streamlit re-runs app.py on every interaction, and importing main has
+    usually set things up already): later calls keep the queue and handlers, and only apply
+    verbose if it is given. verbose=None means VERBOSE_LOGGING on the first call.
+    """
+    global _listener
+    with _listener_lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            if verbose is not None:
+                _apply_level(root, _listener.site_filter, verbose)
+            return _listener
+
+        site_filter = SiteContextFilter(sampling)
+        handlers = []
+        if log_file:
+            file_handler = SizeAndTimeRotatingFileHandler(log_file)
+            file_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler()  # This also prints to console
+            console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(site_filter)
+
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        _apply_level(root, site_filter, VERBOSE_LOGGING if verbose is None else verbose)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.site_filter = site_filter
+        _listener.start()
+        # Write out whatever is still queued before the interpreter exits
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Writes out every queued record, then stops the writer thread and closes the log file."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -1,32 +1,41 @@
 # main.py - The heart of your price tracking system
 
+import argparse
 import requests
-from bs4 import BeautifulSoup
+import httpx
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import csv
 import time
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import signal
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import re
 import logging
 from config import *
-
-# Set up logging to track what your script is doing
-logging.basicConfig(
-    level=logging.INFO if VERBOSE_LOGGING else logging.WARNING,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()  # This also prints to console
-    ]
-)
+from async_fetcher import get_shared_fetcher
+from http_cache import get_shared_cache
+from driver_pool import build_chrome_options, get_shared_pool
+from structured_data import find_structured_price
+from html_parsers import parse_html, supports_partial_parse
+from storage import get_history_store
+from price_parser import parse_candidates, get_price_bounds, is_within_bounds
+from fast_render import get_render_mode, prepare_driver_for_site, stop_page_load, wait_for_full_load
+from scheduler import WaveScheduler
+from catalog import get_catalog, plan_by_domain, prices_by_product
+from adaptive_schedule import get_check_planner
+from notifier import get_notifier
+from deal_rules import get_deal_rules
+from metrics import get_metrics, HttpPhaseTracer
+from logging_setup import setup_logging
+from resilience import (RETRY_STATUSES, PriceElementMissing, call_with_retries, get_resilience_policy,
+                        get_circuit_breakers, is_site_failure)
+from rate_limit import get_rate_limiter
+
+# Set up logging to track what your script is doing - written by a background thread, see logging_setup.py
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +50,11 @@ class PriceTracker:
         self.driver = None
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': USER_AGENT})
+        self.catalog = get_catalog()
+        # Without the driver pool a single Chrome driver loads one page at a time, so scrapes take turns
+        self._browser_lock = threading.Lock()
+        # The error that ended each thread's current scrape, for the circuit breakers
+        self._scrape_state = threading.local()
 
     def setup_browser(self):
         """
@@ -48,13 +62,7 @@ class PriceTracker:
         This is like hiring a robot to operate a web browser for you.
         """
         if self.driver is None:
-            chrome_options = Options()
-            chrome_options.add_argument(f'--user-agent={USER_AGENT}')
-            chrome_options.add_argument('--headless')  # Run without showing browser window
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
+            chrome_options = build_chrome_options()
 
             try:
                 self.driver = webdriver.Chrome(options=chrome_options)
@@ -65,81 +73,257 @@ class PriceTracker:
 
         return self.driver
 
-    def extract_price_from_text(self, price_text):
+    def extract_price_from_text(self, price_text, site_config=None):
         """
-        Converts messy price text like "₹8,999.00" into clean numbers like 8999.0
-        This handles Indian currency formatting with commas and various symbols.
+        Converts messy price text like "₹8,999.00" or "Rs. 1,23,456" into clean numbers like 8999.0
+        The shared price_parser handles Indian digit grouping, currency markers and MRP labels.
         """
         if not price_text:
             return None
 
-        # Remove common currency symbols and clean the text
-        cleaned_text = price_text.replace('₹', '').replace(',', '').replace('Rs', '').replace('INR', '')
+        return self.extract_best_price(price_text, [price_text], site_config)
+
+    def extract_best_price(self, label, candidates, site_config=None):
+        """
+        Parses every candidate price text at once and returns the most convincing price.
+        Candidates are plain strings or {'text': ..., 'struck': ...} dicts, best source first.
+        """
+        bounds = get_price_bounds(site_config)
+        with get_metrics().span('extract'):
+            best = parse_candidates(candidates, bounds=bounds)
 
-        # Find all number patterns in the text
-        number_patterns = re.findall(r'\d+\.?\d*', cleaned_text)
+        if best is None:
+            logger.warning(f"No valid price found in text: '{label}'")
+            return None
 
-        if number_patterns:
-            try:
-                # Take the first number found (usually the price)
-                price = float(number_patterns[0])
+        if not best.in_bounds:
+            # Return anyway, but log the concern
+            logger.warning(f"Price {best.price} seems outside expected range "
+                           f"₹{bounds[0]:,}-₹{bounds[1]:,} (confidence {best.confidence:.2f})")
+
+        return best.price
+
+    def is_plausible_price(self, price, site_config=None):
+        """Sanity check for prices that come without context, e.g. from structured data."""
+        return is_within_bounds(price, get_price_bounds(site_config))
+
+    def uses_structured_data(self, site_config):
+        """Whether the structured-data shortcut should be tried for a site."""
+        return site_config.get('structured_data', STRUCTURED_DATA_FIRST)
+
+    def extract_structured_price(self, site_name, site_config, html):
+        """
+        Reads the price from ld+json, price meta tags or hydration state embedded in the page.
+        This is much cheaper than CSS selectors and doesn't need a browser at all.
+        """
+        with get_metrics().span('structured'):
+            price, source = find_structured_price(
+                html,
+                is_plausible=lambda price: self.is_plausible_price(price, site_config),
+                price_keys=site_config.get('structured_keys'),
+                page_url=site_config.get('url'),
+                sku=site_config.get('sku'),
+                paths=site_config.get('structured_paths')
+            )
+
+        if price:
+            logger.info(f"Successfully extracted price from {site_name} structured data ({source}): ₹{price}")
+        return price
+
+    def fetch_response(self, url, timeout=15, headers=None, site_name=None, site_config=None):
+        """
+        Downloads a page with the backend chosen in STATIC_FETCH_BACKEND.
+        Returns the response object (requests or httpx - both expose status_code, headers and content).
 
-                # Sanity check: G-Shock watches typically cost between ₹5,000 and ₹15,000
-                if 5000 <= price <= 15000:
-                    return price
-                else:
-                    logger.warning(f"Price {price} seems outside expected range for G-Shock")
-                    return price  # Return anyway, but log the concern
+        With the site's config, every try waits for the domain's rate limit (and tells the limiter
+        about 429/503 answers), and connection hiccups and 429/5xx answers are retried with backoff
+        as the site's resilience policy allows; once the tries run out the last error is raised.
 
-            except ValueError:
-                logger.error(f"Could not convert '{number_patterns[0]}' to float")
-                return None
+        The download is timed as 'http.request', and split into its phases as far as the backend
+        can tell: httpx reports connect (DNS + TCP), TLS, time to first byte and download;
+        requests only knows when the headers arrived.
+        """
+        if site_config is not None:
+            limiter = get_rate_limiter()
+
+            def attempt():
+                limiter.acquire(url, site_config)
+                response = self.fetch_response(url, timeout=timeout, headers=headers)
+                limiter.feedback(url, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+                return response
+
+            return call_with_retries(attempt, site_name or url, get_resilience_policy(site_config))
+
+        metrics = get_metrics()
+
+        if STATIC_FETCH_BACKEND == 'httpx':
+            tracer = HttpPhaseTracer() if metrics.enabled else None
+            with metrics.span('http.request'):
+                response = get_shared_fetcher().fetch(url, headers=headers, timeout=timeout, trace=tracer)
+            if tracer:
+                metrics.observe_http(tracer)
+            return response
+
+        started = time.perf_counter()
+        with metrics.span('http.request'):
+            response = self.session.get(url, headers=headers, timeout=timeout)
+        time_to_headers = response.elapsed.total_seconds()
+        metrics.observe('http.ttfb', time_to_headers)
+        metrics.observe('http.download', max(0.0, time.perf_counter() - started - time_to_headers))
+        return response
+
+    def fetch_page_cached(self, site_name, url, timeout=15, site_config=None):
+        """
+        Downloads a page unless the server says it hasn't changed since the last visit.
+        Returns (response, None) after a full download, or (None, cached_price) on 304 Not Modified.
+        """
+        if not HTTP_CACHE_ENABLED:
+            response = self.fetch_response(url, timeout=timeout, site_name=site_name, site_config=site_config)
+            response.raise_for_status()
+            return response, None
+
+        cache = get_shared_cache()
+        response = self.fetch_response(url, timeout=timeout, headers=cache.conditional_headers(url),
+                                       site_name=site_name, site_config=site_config)
+
+        if response.status_code == 304:
+            cached_price = cache.get_cached_price(url)
+            if cached_price is not None:
+                cache.record(site_name, hit=True)
+                logger.info(f"{site_name} page not modified, reusing cached price: ₹{cached_price}")
+                return None, cached_price
+
+            # We never asked for a 304 without a stored price, but don't trust it - fetch in full
+            cache.invalidate(url)
+            response = self.fetch_response(url, timeout=timeout, site_name=site_name, site_config=site_config)
+
+        response.raise_for_status()
+        cache.record(site_name, hit=False)
+        return response, None
+
+    def select_price_candidates(self, site_name, html, backend, primary_selector, backup_selector, partial):
+        """
+        Parses the page with the chosen backend and collects every element the selectors match.
+        Primary selector matches come first; backup matches are only used when the primary finds nothing.
+        """
+        metrics = get_metrics()
+        with metrics.span('parse'):
+            page = parse_html(html, backend=backend, selectors=[primary_selector, backup_selector], partial=partial)
+
+        # Try primary selector first
+        with metrics.span('select'):
+            candidates = page.select_all_candidates(primary_selector)
+
+        # If primary fails, try backup selector
+        if not candidates and backup_selector != primary_selector:
+            logger.info(f"Primary selector failed for {site_name}, trying backup")
+            with metrics.span('select'):
+                candidates = page.select_all_candidates(backup_selector)
+
+        return candidates
+
+    def extract_price_from_html(self, site_name, site_config, html):
+        """
+        Finds the price in a downloaded page using the site's primary and backup selectors.
+        This is the part of static scraping that doesn't care how the page was downloaded.
+        """
+        if self.uses_structured_data(site_config):
+            price = self.extract_structured_price(site_name, site_config, html)
+            if price:
+                return price
+
+        primary_selector = site_config['price_selector']
+        backup_selector = site_config.get('backup_selector', primary_selector)
+        backend = site_config.get('parser', HTML_PARSER)
+        partial = site_config.get('partial_parse', PARTIAL_PARSE) and supports_partial_parse(backend)
+
+        candidates = self.select_price_candidates(site_name, html, backend, primary_selector, backup_selector, partial)
+
+        # A partial parse can miss an element whose selector needs more of the page - retry in full
+        if not candidates and partial:
+            candidates = self.select_price_candidates(site_name, html, backend, primary_selector, backup_selector, False)
+
+        if candidates:
+            price_texts = [candidate['text'] for candidate in candidates]
+            logger.info(f"Found price text for {site_name}: {price_texts[:5]}")
+
+            price = self.extract_best_price(price_texts[0], candidates, site_config)
+            if price:
+                logger.info(f"Successfully extracted price from {site_name}: ₹{price}")
+                return price
+            else:
+                logger.warning(f"Could not extract valid price from text: {price_texts[:5]}")
+        else:
+            logger.warning(f"Price element not found on {site_name}")
+            self._scrape_state.error = PriceElementMissing(f"No price selector matched on {site_name}")
 
-        logger.warning(f"No valid price found in text: '{price_text}'")
         return None
 
+    def remember_price(self, url, response, price):
+        """Stores a freshly extracted price with the response's validators for the next conditional GET."""
+        if HTTP_CACHE_ENABLED and price:
+            get_shared_cache().store(url, response.headers, price)
+
     def scrape_price_static(self, site_name, site_config):
         """
         Scrapes prices from websites that load content immediately (no JavaScript needed).
         This is like reading a printed newspaper - all the information is already there.
         """
         url = site_config['url']
-        primary_selector = site_config['price_selector']
-        backup_selector = site_config.get('backup_selector', primary_selector)
 
         try:
             logger.info(f"Scraping {site_name} using static method")
 
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
+            response, cached_price = self.fetch_page_cached(site_name, url, timeout=15, site_config=site_config)
+            if cached_price is not None:
+                return cached_price
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            html = response.content
+            price = self.extract_price_from_html(site_name, site_config, html)
+            self.remember_price(url, response, price)
+            return price
 
-            # Try primary selector first
-            price_element = soup.select_one(primary_selector)
+        except (requests.RequestException, httpx.HTTPError) as e:
+            logger.error(f"Network error while scraping {site_name}: {e}")
+            self._scrape_state.error = e
+        except Exception as e:
+            logger.error(f"Unexpected error while scraping {site_name}: {e}")
+            self._scrape_state.error = e
 
-            # If primary fails, try backup selector
-            if not price_element and backup_selector != primary_selector:
-                logger.info(f"Primary selector failed for {site_name}, trying backup")
-                price_element = soup.select_one(backup_selector)
+        return None
 
-            if price_element:
-                price_text = price_element.get_text(strip=True)
-                logger.info(f"Found price text for {site_name}: '{price_text}'")
+    def scrape_price_structured(self, site_name, site_config):
+        """
+        Tries to get a dynamic site's price from its plain HTML response, skipping the browser.
+        Many shops ship the price as structured data even when the visible page is built by JavaScript.
+        Returns None (so the caller can fall back to Selenium) if that isn't the case.
+        """
+        url = site_config['url']
+
+        try:
+            logger.info(f"Trying structured data for {site_name} before opening a browser")
 
-                price = self.extract_price_from_text(price_text)
-                if price:
-                    logger.info(f"Successfully extracted price from {site_name}: ₹{price}")
-                    return price
-                else:
-                    logger.warning(f"Could not extract valid price from text: '{price_text}'")
+            response, cached_price = self.fetch_page_cached(site_name, url, timeout=15, site_config=site_config)
+            if cached_price is not None:
+                return cached_price
+
+            html = response.content
+            price = self.extract_structured_price(site_name, site_config, html)
+
+            if price:
+                self.remember_price(url, response, price)
             else:
-                logger.warning(f"Price element not found on {site_name}")
+                logger.info(f"No structured price found for {site_name}, falling back to browser")
+            return price
 
-        except requests.RequestException as e:
-            logger.error(f"Network error while scraping {site_name}: {e}")
+        except (requests.RequestException, httpx.HTTPError) as e:
+            logger.info(f"Plain request to {site_name} failed ({e}), falling back to browser")
+            self._scrape_state.error = e
         except Exception as e:
-            logger.error(f"Unexpected error while scraping {site_name}: {e}")
+            logger.warning(f"Unexpected error reading structured data for {site_name}: {e}")
+            self._scrape_state.error = e
 
         return None
 
@@ -147,23 +331,60 @@ class PriceTracker:
         """
         Scrapes prices from websites that load content with JavaScript after page loads.
         This is like waiting for someone to write information on a board after you arrive.
+
+        With USE_DRIVER_POOL the browser is borrowed from the shared pool of warm drivers,
+        so several dynamic sites can load in parallel; otherwise the tracker's own driver is used.
+        """
+        try:
+            logger.info(f"Scraping {site_name} using dynamic method")
+
+            # Waiting for a free browser is time too - often the biggest part of a busy wave
+            waiting_since = time.perf_counter()
+
+            if USE_DRIVER_POOL:
+                with get_shared_pool().lease() as driver:
+                    get_metrics().observe('browser.acquire', time.perf_counter() - waiting_since)
+                    return self._scrape_with_driver(driver, site_name, site_config)
+
+            with self._browser_lock:
+                driver = self.setup_browser()
+                get_metrics().observe('browser.acquire', time.perf_counter() - waiting_since)
+                return self._scrape_with_driver(driver, site_name, site_config)
+
+        except Exception as e:
+            logger.error(f"Error while scraping {site_name}: {e}")
+            self._scrape_state.error = e
+
+        return None
+
+    def _scrape_with_driver(self, driver, site_name, site_config):
+        """
+        Loads the product page in the given browser and reads the price from it.
+        In fast render mode heavy resources are blocked and loading stops as soon as the price exists;
+        in full render mode the whole page finishes loading first.
         """
         url = site_config['url']
         primary_selector = site_config['price_selector']
         backup_selector = site_config.get('backup_selector', primary_selector)
+        fast_render = get_render_mode(site_config) == 'fast'
+        metrics = get_metrics()
 
-        try:
-            logger.info(f"Scraping {site_name} using dynamic method")
+        # A page load is a request like any other - it waits its turn in the domain's budget
+        get_rate_limiter().acquire(url, site_config)
 
-            driver = self.setup_browser()
+        with metrics.span('browser.navigate'):
+            prepare_driver_for_site(driver, site_config)
             driver.get(url)
+            wait_for_full_load(driver, site_config)
 
-            # Wait for the page to load completely
-            wait = WebDriverWait(driver, 15)
+        # Poll for the price element - with an eager page load this starts before images and scripts finish
+        wait = WebDriverWait(driver, 15)
 
-            # Try to find the price element
-            price_element = None
+        # Try to find the price element
+        price_element = None
+        matched_selector = primary_selector
 
+        with metrics.span('browser.wait'):
             try:
                 # Try primary selector first
                 price_element = wait.until(
@@ -172,6 +393,7 @@ class PriceTracker:
             except TimeoutException:
                 if backup_selector != primary_selector:
                     logger.info(f"Primary selector timed out for {site_name}, trying backup")
+                    matched_selector = backup_selector
                     try:
                         price_element = wait.until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, backup_selector))
@@ -179,272 +401,297 @@ class PriceTracker:
                     except TimeoutException:
                         logger.warning(f"Both selectors timed out for {site_name}")
 
-            if price_element:
-                price_text = price_element.text.strip()
-                logger.info(f"Found price text for {site_name}: '{price_text}'")
-
-                price = self.extract_price_from_text(price_text)
-                if price:
-                    logger.info(f"Successfully extracted price from {site_name}: ₹{price}")
-                    return price
-                else:
-                    logger.warning(f"Could not extract valid price from text: '{price_text}'")
+        if price_element and fast_render:
+            # The price is on the page - there's no reason to keep downloading the rest
+            stop_page_load(driver)
+
+        if price_element:
+            # Every element the selector matches is a candidate, not just the first one
+            with metrics.span('browser.extract'):
+                candidates = [
+                    {'text': element.text.strip(), 'struck': element.tag_name in ('del', 's', 'strike')}
+                    for element in driver.find_elements(By.CSS_SELECTOR, matched_selector)
+                ] or [{'text': price_element.text.strip(), 'struck': False}]
+            price_text = candidates[0]['text']
+            logger.info(f"Found price text for {site_name}: '{price_text}'")
+
+            price = self.extract_best_price(price_text, candidates, site_config)
+            if price:
+                logger.info(f"Successfully extracted price from {site_name}: ₹{price}")
+                return price
             else:
-                logger.warning(f"Price element not found on {site_name}")
-
-        except Exception as e:
-            logger.error(f"Error while scraping {site_name}: {e}")
+                logger.warning(f"Could not extract valid price from text: '{price_text}'")
+        else:
+            logger.warning(f"Price element not found on {site_name}")
+            self._scrape_state.error = PriceElementMissing(f"No price selector appeared on {site_name} in time")
 
         return None
 
-    def get_all_current_prices(self):
+    def scrape_site(self, site_name, site_config):
         """
-        Coordinates the scraping of all websites and returns a dictionary of current prices.
-        This is like sending scouts to different markets to gather intelligence.
+        Scrapes a single site with the method configured for it and reports the outcome.
+        Returns the price, or None if it could not be retrieved - last_scrape_error() then tells why.
         """
-        current_prices = {}
-
-        logger.info("Starting comprehensive price check across all sites")
+        logger.info(f"Checking {site_name}...")
 
-        for site_name, site_config in WATCH_SITES.items():
-            logger.info(f"Checking {site_name}...")
+        metrics = get_metrics()
+        self._scrape_state.error = None
 
-            # Determine which scraping method to use
-            if site_config['method'] == 'static':
+        # Determine which scraping method to use
+        if site_config['method'] == 'static':
+            with metrics.span('scrape.static'):
                 price = self.scrape_price_static(site_name, site_config)
-            else:
-                price = self.scrape_price_dynamic(site_name, site_config)
-
-            if price:
-                current_prices[site_name] = price
-                print(f"✓ {site_name}: ₹{price:,.2f}")
-            else:
-                print(f"✗ {site_name}: Could not retrieve price")
+        else:
+            price = None
+            if self.uses_structured_data(site_config):
+                with metrics.span('scrape.structured'):
+                    price = self.scrape_price_structured(site_name, site_config)
+            if not price:
+                # Only the browser's outcome counts - the plain request is just a shortcut
+                self._scrape_state.error = None
+                with metrics.span('scrape.dynamic'):
+                    price = self.scrape_price_dynamic(site_name, site_config)
+
+        if price:
+            print(f"✓ {site_name}: ₹{price:,.2f}")
+        else:
+            print(f"✗ {site_name}: Could not retrieve price")
 
-            # Be respectful - wait between requests
-            wait_time = site_config.get('wait_time', 3)
-            time.sleep(wait_time)
+        return price
 
-        logger.info(f"Price check completed. Retrieved {len(current_prices)} prices.")
-        return current_prices
+    def last_scrape_error(self):
+        """The exception that ended this thread's last scrape_site call, or None (found, or unreadable price text)."""
+        return getattr(self._scrape_state, 'error', None)
 
-    def get_historical_data(self):
+    def scrape_domain_group(self, listings):
         """
-        Reads the price history file and returns useful statistics.
-        This is like looking through old receipts to understand price trends.
+        Scrapes listings that share a domain one after another. Every request waits for the domain's
+        rate limit (see rate_limit.py) rather than sleeping a fixed time, so time spent downloading
+        counts towards the pause, and a retailer that answers 429/503 is slowed down automatically.
+        Sites whose circuit breaker is open are skipped without a request. Only failures of the site
+        itself (network, error status, browser, a page without any price element) count towards its
+        breaker; a listing whose price element held no readable price shows the site is up.
+        Returns {(product_id, site): price} for the listings that could be read.
         """
-        try:
-            import os
-
-            # Check if file exists and has content
-            if not os.path.exists(HISTORY_FILE) or os.path.getsize(HISTORY_FILE) == 0:
-                logger.info("No price history file found or file is empty. This appears to be the first run.")
-                return {'lowest_ever': float('inf'), 'records': []}
-
-            with open(HISTORY_FILE, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-
-                # Check if the required columns exist
-                if reader.fieldnames is None:
-                    logger.warning("CSV file appears to be empty or malformed")
-                    return {'lowest_ever': float('inf'), 'records': []}
-
-                required_columns = ['timestamp', 'site', 'price']
-                missing_columns = [col for col in required_columns if col not in reader.fieldnames]
+        prices = {}
+        breakers = get_circuit_breakers()
+
+        for listing in listings:
+            if not breakers.allow(listing.site):
+                retry_at = datetime.fromtimestamp(breakers.open_until(listing.site))
+                logger.info(f"Skipping {listing.label} - circuit open until {retry_at:%Y-%m-%d %H:%M}")
+                print(f"⏸ {listing.label}: skipped until {retry_at:%H:%M} (kept failing)")
+                continue
+
+            # Timings inside are recorded per retailer, whichever product is being checked
+            with get_metrics().site(listing.site):
+                price = self.scrape_site(listing.label, listing.config)
+            site_failed = not price and is_site_failure(self.last_scrape_error())
+            breakers.record(listing.site, success=not site_failed, policy=get_resilience_policy(listing.config))
+            if price:
+                prices[listing.key] = price
 
-                if missing_columns:
-                    logger.error(f"Missing columns in CSV: {missing_columns}")
-                    logger.info("Consider deleting the CSV file to recreate it with proper headers")
-                    return {'lowest_ever': float('inf'), 'records': []}
+        return prices
 
-                records = list(reader)
+    def get_catalog_prices(self, listings=None):
+        """
+        Coordinates the scraping of every listing in the catalog (or just the given ones) and returns
+        {(product_id, site): price}. This is like sending scouts to different markets to gather intelligence.
 
-                if not records:
-                    return {'lowest_ever': float('inf'), 'records': []}
+        In 'concurrent' mode every domain gets its own scout (up to MAX_CONCURRENT_SCRAPES at once),
+        so a full check takes about as long as the busiest domain instead of the sum of all of them.
+        """
+        listings = self.catalog.listings if listings is None else listings
+        logger.info(f"Starting comprehensive price check across {len(listings)} listings")
 
-                # Find the lowest price ever recorded
-                prices = []
-                for record in records:
-                    try:
-                        if record.get('price'):
-                            prices.append(float(record['price']))
-                    except (ValueError, TypeError):
-                        logger.warning(f"Invalid price value found: {record.get('price')}")
-                        continue
-
-                lowest_ever = min(prices) if prices else float('inf')
-
-                return {
-                    'lowest_ever': lowest_ever,
-                    'records': records,
-                    'total_checks': len(records)
+        if SCRAPE_MODE == 'sequential':
+            # Every listing shares one queue, so the politeness delay applies between all of them
+            found_prices = self.scrape_domain_group(listings)
+        else:
+            domain_groups = plan_by_domain(listings)
+            found_prices = {}
+
+            max_workers = max(1, min(MAX_CONCURRENT_SCRAPES, len(domain_groups)))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scraper') as executor:
+                futures = {
+                    executor.submit(self.scrape_domain_group, domain_listings): domain
+                    for domain, domain_listings in domain_groups.items()
                 }
 
-        except FileNotFoundError:
-            logger.info("No price history file found. This appears to be the first run.")
-            return {'lowest_ever': float('inf'), 'records': []}
-        except Exception as e:
-            logger.error(f"Error reading price history: {e}")
-            return {'lowest_ever': float('inf'), 'records': []}
-
-    def save_price_data(self, current_prices):
-        """
-        Saves current price data to the history file.
-        This is like keeping a detailed diary of all prices you've encountered.
-        """
-        try:
-            import os
+                for future in as_completed(futures):
+                    try:
+                        found_prices.update(future.result())
+                    except Exception as e:
+                        logger.error(f"Unexpected error while checking {futures[future]}: {e}")
 
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            historical_data = self.get_historical_data()
+        # Keep the catalog order regardless of which scout finished first
+        current_prices = {
+            listing.key: found_prices[listing.key]
+            for listing in listings
+            if listing.key in found_prices
+        }
 
-            # Define fieldnames for the CSV
-            fieldnames = ['timestamp', 'site', 'price', 'is_new_low', 'below_threshold']
+        if HTTP_CACHE_ENABLED:
+            self.log_cache_hit_rates()
 
-            # Check if file exists and has content
-            file_exists = os.path.exists(HISTORY_FILE) and os.path.getsize(HISTORY_FILE) > 0
+        get_circuit_breakers().save()
 
-            with open(HISTORY_FILE, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
+        if ADAPTIVE_SCHEDULING:
+            # Every check, scheduled or not, teaches the planner how each listing's price behaves
+            get_check_planner().record_wave(listings, current_prices, self.catalog)
 
-                # Write headers only if file doesn't exist or is empty
-                if not file_exists:
-                    writer.writeheader()
-                    logger.info("Created new price history file with headers")
+        logger.info(f"Price check completed. Retrieved {len(current_prices)} prices.")
+        return current_prices
 
-                for site_name, price in current_prices.items():
-                    is_new_low = price < historical_data['lowest_ever']
-                    below_threshold = price <= PRICE_THRESHOLD
+    def get_all_current_prices(self, product_id=None):
+        """Current prices of one product (DEFAULT_PRODUCT if None) as {site: price}."""
+        prices = self.get_catalog_prices(self.catalog.listings_for(product_id))
+        return {site: price for (_, site), price in prices.items()}
 
-                    writer.writerow({
-                        'timestamp': current_time,
-                        'site': site_name,
-                        'price': price,
-                        'is_new_low': is_new_low,
-                        'below_threshold': below_threshold
-                    })
+    def log_cache_hit_rates(self):
+        """Saves the validator cache and logs how often each site answered 304 Not Modified."""
+        cache = get_shared_cache()
+        cache.save()
 
-                logger.info(f"Saved {len(current_prices)} price records to history")
+        for site_name, stats in cache.get_hit_rates().items():
+            logger.info(f"HTTP cache for {site_name}: {stats['hits']} hits, "
+                        f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
 
-        except Exception as e:
-            logger.error(f"Error saving price data: {e}")
-            # If there's an error, try to ensure headers exist
-            try:
-                if os.path.exists(HISTORY_FILE):
-                    with open(HISTORY_FILE, 'r', newline='', encoding='utf-8') as file:
-                        first_line = file.readline().strip()
-                        if not first_line or 'timestamp' not in first_line:
-                            # File exists but has no headers, recreate with headers
-                            with open(HISTORY_FILE, 'w', newline='', encoding='utf-8') as new_file:
-                                writer = csv.DictWriter(new_file, fieldnames=fieldnames)
-                                writer.writeheader()
-                                logger.warning("Recreated CSV file with proper headers")
-            except Exception as e2:
-                logger.error(f"Could not fix CSV headers: {e2}")
-
-    def send_email_alert(self, alert_info):
+    def get_historical_data(self, include_records=False, product_id=None):
         """
-        Sends email notifications when good deals are found.
-        This is like having a friend call you when they spot a great sale.
+        Returns useful statistics about the price history.
+        This is like looking through old receipts to understand price trends.
+
+        Statistics come from the history store's running aggregates, so this costs the same
+        no matter how long the history is.
+        The raw rows are only read when include_records=True.
+        Only the history of product_id (DEFAULT_PRODUCT if None) is looked at.
         """
-        if TEST_MODE:
-            logger.info(f"TEST MODE: Would send alert for {alert_info}")
-            return
+        empty_result = {'lowest_ever': float('inf'), 'records': [], 'total_checks': 0, 'sites': {}}
 
         try:
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_CONFIG['email']
-            msg['To'] = EMAIL_CONFIG['email']
-            msg['Subject'] = f"🎯 G-Shock Deal Alert: {alert_info['site']}"
-
-            # Create a detailed email body
-            body = f"""
-Great news! Your G-Shock GA-2100-1A1 watch has hit a great price!
-
-🏪 Store: {alert_info['site']}
-💰 Current Price: ₹{alert_info['price']:,.2f}
-🎯 Your Target: ₹{PRICE_THRESHOLD:,.2f}
-📈 Historical Low: ₹{alert_info['historical_low']:,.2f}
-
-🔥 Alert Reason: {alert_info['reason']}
+            store = get_history_store()
+            product_id = product_id or DEFAULT_PRODUCT
+            aggregates = store.get_aggregates(product_id)
+            overall = aggregates['global']
+
+            if overall['count'] == 0:
+                logger.info("No price history found. This appears to be the first run.")
+                return empty_result
+
+            result = {
+                'lowest_ever': overall['min'] if overall['min'] is not None else float('inf'),
+                'highest_ever': overall['max'] if overall['max'] is not None else float('-inf'),
+                'average': overall['sum'] / overall['count'] if overall['count'] else None,
+                'last_timestamp': overall['last_timestamp'],
+                'total_checks': overall['count'],
+                'sites': aggregates['sites'],
+                'records': []
+            }
+
+            if include_records:
+                result['records'] = store.read_records(product=product_id)
+
+            return result
 
-⏰ Detected at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🛒 Ready to buy? Here's the link:
-{alert_info['url']}
+        except Exception as e:
+            logger.error(f"Error reading price history: {e}")
+            return empty_result
 
-Happy shopping! 🎉
+    def save_price_data(self, current_prices, product_id=None):
+        """
+        Saves one product's current prices ({site: price}) to the history store.
+        This is like keeping a detailed diary of all prices you've encountered.
+        """
+        product_id = self.catalog.product(product_id).product_id
+        self.save_catalog_prices({(product_id, site_name): price for site_name, price in current_prices.items()})
 
----
-This alert was sent by your automated G-Shock price tracker.
-            """
+    def save_catalog_prices(self, catalog_prices):
+        """
+        Saves a whole wave ({(product_id, site): price}) to the history store in one append.
+        Each product's history is looked up once, and the store (with its index and rollups)
+        is written once per wave rather than once per product.
+        """
+        with get_metrics().span('save'):
+            try:
+                store = get_history_store()
+                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                rows = []
+                for product_id, current_prices in prices_by_product(catalog_prices).items():
+                    product = self.catalog.product(product_id)
+                    lowest_ever = store.get_aggregates(product.product_id)['global']['min']
+
+                    for site_name, price in current_prices.items():
+                        rows.append({
+                            'timestamp': current_time,
+                            'site': site_name,
+                            'price': price,
+                            'is_new_low': lowest_ever is None or price < lowest_ever,
+                            'below_threshold': price <= product.price_threshold,
+                            'product': product.product_id
+                        })
+
+                if rows:
+                    store.append_rows(rows)
+                logger.info(f"Saved {len(rows)} price records to history")
 
-            msg.attach(MIMEText(body, 'plain'))
+            except Exception as e:
+                logger.error(f"Error saving price data: {e}")
 
-            with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port']) as server:
-                server.starttls()
-                server.login(EMAIL_CONFIG['email'], EMAIL_CONFIG['password'])
-                server.send_message(msg)
+    def send_email_alerts(self, alerts):
+        """
+        Sends email notifications when good deals are found.
+        This is like having a friend call you when they spot a great sale.
 
-            logger.info(f"Email alert sent successfully for {alert_info['site']}")
-            print(f"📧 Alert sent: {alert_info['site']} - ₹{alert_info['price']:,.2f}")
+        The alerts are handed to the shared notifier and sent in the background over one
+        reused SMTP connection - as a single digest email when NOTIFIER_DIGEST is on.
+        Returns how many alerts were queued (none in TEST_MODE, where they're only logged).
+        """
+        with get_metrics().span('email.queue'):
+            return get_notifier().send_alerts(alerts)
 
-        except Exception as e:
-            logger.error(f"Failed to send email alert: {e}")
-            print(f"❌ Failed to send email alert: {e}")
+    def send_email_alert(self, alert_info):
+        """Sends a single alert (see send_email_alerts)."""
+        return self.send_email_alerts([alert_info])
 
-    def check_for_deals(self, current_prices):
+    def find_deals(self, catalog_prices):
         """
-        Analyzes current prices and determines if any warrant an alert.
+        Analyzes a wave's prices ({(product_id, site): price}) and returns the ones that warrant an alert.
         This is your smart shopping assistant making decisions about what's worth your attention.
-        """
-        historical_data = self.get_historical_data()
-        alerts_sent = 0
-
-        for site_name, price in current_prices.items():
-            alert_reasons = []
-
-            # Check if price is at or below your threshold
-            if price <= PRICE_THRESHOLD:
-                alert_reasons.append(f"At/below your target of ₹{PRICE_THRESHOLD:,.2f}")
-
-            # Check if this is a new historical low
-            if price < historical_data['lowest_ever']:
-                alert_reasons.append("New historical low!")
-
-            # Check for significant drops (10% below historical average)
-            if historical_data['lowest_ever'] != float('inf'):
-                if price < historical_data['lowest_ever'] * 0.9:
-                    alert_reasons.append("Significant price drop detected")
-
-            # If we have reasons to alert, send the notification
-            if alert_reasons:
-                alert_info = {
-                    'site': site_name,
-                    'price': price,
-                    'historical_low': historical_data['lowest_ever'],
-                    'reason': ' | '.join(alert_reasons),
-                    'url': WATCH_SITES[site_name]['url']
-                }
 
-                self.send_email_alert(alert_info)
-                alerts_sent += 1
+        The DEAL_RULES run over every listing at once (see deal_rules.py). Call this before
+        save_catalog_prices, so the prices are judged against the history they're about to join.
+        """
+        try:
+            with get_metrics().span('deals'):
+                return get_deal_rules().find_deals(catalog_prices, self.catalog)
+        except Exception as e:
+            logger.error(f"Error checking for deals: {e}")
+            return []
 
-        return alerts_sent
+    def check_for_deals(self, current_prices, product_id=None):
+        """Finds one product's deals ({site: price}) and sends their alerts. Returns how many were sent."""
+        product_id = product_id or DEFAULT_PRODUCT
+        catalog_prices = {(product_id, site): price for site, price in current_prices.items()}
+        return self.send_email_alerts(self.find_deals(catalog_prices))
 
-    def generate_summary_report(self, current_prices):
+    def generate_summary_report(self, current_prices, product_id=None, sites=None):
         """
-        Creates a comprehensive summary of the current price check.
+        Creates a comprehensive summary of one product's price check.
         This is like getting a briefing from your shopping assistant about the market situation.
+        sites are the retailers the check visited (all of the product's by default) - their timings
+        are shown whether or not a price came back, since failures are often where the time went.
         """
         if not current_prices:
             print("❌ No prices were successfully retrieved.")
             return
 
-        historical_data = self.get_historical_data()
+        product = self.catalog.product(product_id)
+        historical_data = self.get_historical_data(product_id=product.product_id)
 
         print("\n" + "=" * 60)
-        print("🔍 G-SHOCK GA-2100-1A1 PRICE SUMMARY")
+        print(f"🔍 {product.name.upper()} PRICE SUMMARY")
         print("=" * 60)
 
         # Find the best current deal
@@ -452,7 +699,7 @@ This alert was sent by your automated G-Shock price tracker.
         best_site = min(current_prices, key=current_prices.get)
 
         print(f"🏆 Best current price: ₹{best_price:,.2f} at {best_site}")
-        print(f"🎯 Your target price: ₹{PRICE_THRESHOLD:,.2f}")
+        print(f"🎯 Your target price: ₹{product.price_threshold:,.2f}")
 
         if historical_data['lowest_ever'] != float('inf'):
             print(f"📊 Historical low: ₹{historical_data['lowest_ever']:,.2f}")
@@ -465,54 +712,168 @@ This alert was sent by your automated G-Shock price tracker.
         sorted_prices = sorted(current_prices.items(), key=lambda x: x[1])
 
         for site, price in sorted_prices:
-            status = "🔥" if price <= PRICE_THRESHOLD else "💰"
+            status = "🔥" if price <= product.price_threshold else "💰"
             print(f"  {status} {site}: ₹{price:,.2f}")
 
+        # Where this check's time went at the sites visited (plus saving, deal checks and email)
+        if sites is None:
+            sites = {listing.site for listing in self.catalog.listings_for(product.product_id)}
+        timings = get_metrics().wave_summary(sites=set(sites))
+        if timings:
+            print("\n⏱️ Time per stage (calls, total, slowest):")
+            for stage, entry in sorted(timings.items(), key=lambda item: -item[1]['sum_s']):
+                slowest = f" at {entry['slowest_site']}" if entry['slowest_site'] else ""
+                print(f"  {stage:<18}{entry['count']:>5}x {entry['sum_s']:>9.3f} s   {entry['max_s']:.3f} s{slowest}")
+
         print("=" * 60)
 
     def cleanup(self):
         """
         Properly closes browser and cleans up resources.
         This is like putting away your tools after finishing work.
+
+        Pooled browsers are left running for the next tracker; the pool closes them at exit.
         """
         if self.driver:
             self.driver.quit()
             logger.info("Browser driver closed")
 
 
-def main():
+def run_price_check(tracker, listings=None):
     """
-    The main function that orchestrates the entire price checking process.
-    This is the conductor of your price tracking orchestra.
+    One complete scrape wave: fetch every listing in the catalog (or just the given ones), then save,
+    alert and print a summary per product. Returns the prices that were found as {(product_id, site): price}.
+    """
+    listings = tracker.catalog.listings if listings is None else listings
+    product_ids = {listing.product_id for listing in listings}
+    logger.info("Starting price tracking session")
+    metrics = get_metrics()
+    metrics.start_wave()
+    if len(product_ids) == 1:
+        product = tracker.catalog.product(next(iter(product_ids)))
+        print(f"🚀 Starting {product.name} price check ({len(listings)} sites)...")
+    else:
+        print(f"🚀 Starting price check for {len(product_ids)} products ({len(listings)} listings)...")
+
+    # One wave over every listing - each domain is visited by one scout, whatever the product
+    catalog_prices = tracker.get_catalog_prices(listings)
+
+    if not catalog_prices:
+        print("❌ No prices could be retrieved. Check your internet connection and site configurations.")
+        metrics.finish_wave()
+        return {}
+
+    # Check if any prices warrant alerts - against the history as it was before this wave
+    alerts = tracker.find_deals(catalog_prices)
+
+    # Save the whole wave to our history file in one go
+    tracker.save_catalog_prices(catalog_prices)
+
+    for product_id, current_prices in prices_by_product(catalog_prices).items():
+        # Generate and display summary
+        sites = {listing.site for listing in listings if listing.product_id == product_id}
+        tracker.generate_summary_report(current_prices, product_id, sites=sites)
+
+    # The whole wave's alerts go out together, in the background - the next wave doesn't wait for email
+    alerts_sent = tracker.send_email_alerts(alerts)
+
+    if alerts_sent > 0:
+        print(f"\n🎉 {alerts_sent} price alert(s) on their way to your email!")
+    else:
+        print("\n😌 No alerts triggered this time. Your tracker is still watching...")
+
+    metrics.finish_wave()
+    logger.info("Price tracking session completed successfully")
+    return catalog_prices
+
+
+def run_daemon(interval_hours=CHECK_INTERVAL_HOURS, adaptive=ADAPTIVE_SCHEDULING):
+    """
+    Keeps checking prices until Ctrl+C (or a termination signal): every interval_hours, or - with
+    adaptive scheduling - each listing on its own interval, so flat prices are checked rarely and
+    moving ones (or ones close to their target) often.
+    One tracker, one HTTP connection pool and one set of browsers stay warm between waves,
+    so each check skips Python, import and Chrome start-up entirely.
     """
     tracker = PriceTracker()
+    listings = tracker.catalog.listings
+
+    if adaptive:
+        planner = get_check_planner()
+        planner.seed_from_history(listings)
+
+        def run_due_listings():
+            started = time.monotonic()
+            due = planner.due_listings(listings)
+            prices = run_price_check(tracker, due) if due else {}
+
+            # Wake up when the next listing is due, rather than after a fixed interval
+            scheduler.set_interval(max(60.0, planner.seconds_until_next_due(listings) + time.monotonic() - started))
+            logger.info(f"Adaptive schedule: checked {len(due)}/{len(listings)} listings, now about "
+                        f"{planner.checks_per_day(listings):.0f} checks/day "
+                        f"(a fixed {interval_hours:g}-hour schedule makes {len(listings) * 24 / interval_hours:.0f})")
+            return prices
+
+        scheduler = WaveScheduler(run_due_listings, interval_seconds=planner.min_interval, jitter=0)
+        print(f"⏰ Daemon mode: adaptive schedule, each listing checked every "
+              f"{ADAPTIVE_MIN_INTERVAL_HOURS:g}-{ADAPTIVE_MAX_INTERVAL_HOURS:g} hour(s)")
+    else:
+        scheduler = WaveScheduler(lambda: run_price_check(tracker), interval_seconds=interval_hours * 3600)
+        print(f"⏰ Daemon mode: checking prices every {interval_hours:g} hour(s)")
+
+    def request_shutdown(signum, frame):
+        print("\n🛑 Stopping after the current check... (press Ctrl+C again to quit immediately)")
+        logger.info(f"Received signal {signum} - shutting down after the current wave")
+        scheduler.stop()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_shutdown)
+
+    if METRICS_PORT:
+        get_metrics().serve(METRICS_PORT)
 
     try:
-        logger.info("Starting G-Shock price tracking session")
-        print("🚀 Starting G-Shock GA-2100-1A1 price check...")
+        # Start the browsers now, so the first wave doesn't wait for Chrome either
+        if USE_DRIVER_POOL and any(listing.config['method'] == 'dynamic' for listing in tracker.catalog.listings):
+            get_shared_pool().warm_up()
 
-        # Get current prices from all configured sites
-        current_prices = tracker.get_all_current_prices()
+        scheduler.run_forever()
 
-        if not current_prices:
-            print("❌ No prices could be retrieved. Check your internet connection and site configurations.")
-            return
+    finally:
+        tracker.cleanup()
+        if USE_DRIVER_POOL:
+            get_shared_pool().shutdown()
+        # Deliver any alerts still queued, then log out of the mail server
+        get_notifier().close()
+        logger.info("Daemon stopped")
 
-        # Save the data to our history file
-        tracker.save_price_data(current_prices)
 
-        # Check if any prices warrant alerts
-        alerts_sent = tracker.check_for_deals(current_prices)
+def main():
+    """
+    The main function that orchestrates the entire price checking process.
+    This is the conductor of your price tracking orchestra.
 
-        # Generate and display summary
-        tracker.generate_summary_report(current_prices)
+    Runs a single check by default (ideal for cron / Task Scheduler), or keeps running with --daemon.
+    """
+    parser = argparse.ArgumentParser(description="G-Shock price tracker")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and check prices on a schedule (adaptive, or every CHECK_INTERVAL_HOURS)")
+    parser.add_argument('--interval-hours', type=float, default=CHECK_INTERVAL_HOURS,
+                        help="Override CHECK_INTERVAL_HOURS for --daemon")
+    parser.add_argument('--fixed-schedule', action='store_true',
+                        help="Check every listing every --interval-hours, even if ADAPTIVE_SCHEDULING is on")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(args.interval_hours, adaptive=ADAPTIVE_SCHEDULING and not args.fixed_schedule)
+        return
 
-        if alerts_sent > 0:
-            print(f"\n🎉 {alerts_sent} price alert(s) sent to your email!")
-        else:
-            print("\n😌 No alerts triggered this time. Your tracker is still watching...")
+    tracker = PriceTracker()
 
-        logger.info("Price tracking session completed successfully")
+    try:
+        run_price_check(tracker)
 
     except Exception as e:
         logger.error(f"Error during main execution: {e}")
@@ -521,7 +882,9 @@ def main():
     finally:
         # Always clean up, even if something goes wrong
         tracker.cleanup()
+        # Wait for the alert emails before exiting
+        get_notifier().close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,249 @@
+# metrics.py - Where a scrape wave's time goes: timed spans per stage and site, exported for dashboards
+#
+# Every wave appends one line to METRICS_FILE (JSON lines). With METRICS_PORT set, --daemon also serves
+# the running totals in Prometheus text format at http://localhost:<METRICS_PORT>/metrics.
+
+import bisect
+import contextlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_FILE
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds - from a fast parse to a slow browser page
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# httpcore trace steps -> the HTTP phase they measure
+HTTP_PHASES = {
+    'connect_tcp': 'http.connect',  # Includes the DNS lookup - httpcore resolves the host while connecting
+    'start_tls': 'http.tls',
+    'receive_response_body': 'http.download',
+}
+
+
+class Histogram:
+    """Counts of observations per bucket, plus count/sum/max - the Prometheus histogram shape."""
+
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # The last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {'count': self.count, 'sum_s': round(self.sum, 6), 'max_s': round(self.max, 6)}
+
+
+class HttpPhaseTracer:
+    """
+    An httpx 'trace' callback that turns one request's connection events into phase durations:
+    connect (DNS + TCP), TLS, time to first byte and download. Read .phases once the response is in.
+    """
+
+    def __init__(self):
+        self._started = {}
+        self.phases = {}
+
+    def _add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    async def __call__(self, event_name, info):
+        now = time.perf_counter()
+        step, _, action = event_name.rpartition('.')
+        step = step.rsplit('.', 1)[-1]  # 'http11.send_request_headers' -> 'send_request_headers'
+
+        if action == 'started':
+            self._started[step] = now
+        elif action in ('complete', 'failed'):
+            if step in HTTP_PHASES and step in self._started:
+                self._add(HTTP_PHASES[step], now - self._started[step])
+            elif step == 'receive_response_headers' and 'send_request_headers' in self._started:
+                self._add('http.ttfb', now - self._started['send_request_headers'])
+
+
+class Metrics:
+    """
+    Timings of every pipeline stage, per site. Like a stopwatch on each station of an assembly line:
+    the totals show which station holds everything up, the buckets show how often it's slow.
+
+    Two sets of numbers are kept: running totals since start-up (what Prometheus scrapes) and the
+    current wave's (what the summary report and the JSON-lines file show). The site a thread is
+    working on is remembered with site(), so spans deep inside the scraper don't need it passed in.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, path=METRICS_FILE):
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = {}
+        self._wave = {}
+        self._wave_started = time.time()
+        self._server = None
+
+    # --- recording -------------------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def site(self, site):
+        """Labels every span the current thread records inside the with-block with this site."""
+        previous = getattr(self._local, 'site', None)
+        self._local.site = site
+        try:
+            yield
+        finally:
+            self._local.site = previous
+
+    def current_site(self):
+        """The site the current thread is working on (set with site()), or None."""
+        return getattr(self._local, 'site', None)
+
+    def observe(self, stage, seconds, site=None):
+        """Records one duration (in seconds) for a stage - for timings measured elsewhere."""
+        if not self.enabled:
+            return
+        site = site if site is not None else self.current_site()
+        key = (stage, site)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{stage} took {seconds * 1000:.1f} ms", extra={'site': site, 'stage': stage, 'duration': seconds})
+        with self._lock:
+            for series in (self._totals, self._wave):
+                histogram = series.get(key)
+                if histogram is None:
+                    histogram = series[key] = Histogram()
+                histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def span(self, stage, site=None):
+        """Times the with-block as one observation of the stage (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, site)
+
+    def observe_http(self, tracer, site=None):
+        for phase, seconds in tracer.phases.items():
+            self.observe(phase, seconds, site)
+
+    # --- waves -----------------------------------------------------------------------------
+
+    def start_wave(self):
+        with self._lock:
+            self._wave = {}
+            self._wave_started = time.time()
+
+    def wave_summary(self, sites=None):
+        """
+        {stage: {'count', 'sum_s', 'max_s', 'slowest_site', 'sites': {site: {...}}}} for the current wave.
+        With sites, only those sites' timings (and the ones not tied to a site) are included.
+        """
+        summary = {}
+        with self._lock:
+            for (stage, site), histogram in self._wave.items():
+                if sites is not None and site is not None and site not in sites:
+                    continue
+                entry = summary.setdefault(stage, {'count': 0, 'sum_s': 0.0, 'max_s': 0.0, 'slowest_site': None, 'sites': {}})
+                entry['count'] += histogram.count
+                entry['sum_s'] += histogram.sum
+                if histogram.max >= entry['max_s']:
+                    entry['max_s'] = histogram.max
+                    entry['slowest_site'] = site
+                entry['sites'][site or '-'] = histogram.to_dict()
+        return summary
+
+    def finish_wave(self):
+        """Appends the wave's timings to METRICS_FILE as one JSON line."""
+        if not self.enabled or not self.path:
+            return
+        record = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'wave_seconds': round(time.time() - self._wave_started, 3),
+            'stages': {
+                stage: {**{key: round(value, 6) if isinstance(value, float) else value
+                           for key, value in entry.items() if key != 'sites'}, 'sites': entry['sites']}
+                for stage, entry in self.wave_summary().items()
+            }
+        }
+        try:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record) + '\n')
+        except OSError as e:
+            logger.error(f"Could not write metrics to {self.path}: {e}")
+
+    # --- Prometheus ------------------------------------------------------------------------
+
+    def prometheus_text(self):
+        """The running totals in the Prometheus text exposition format."""
+        lines = [
+            '# HELP price_tracker_stage_seconds Time spent in each stage of a price check, per site.',
+            '# TYPE price_tracker_stage_seconds histogram'
+        ]
+        with self._lock:
+            series = sorted(self._totals.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+            for (stage, site), histogram in series:
+                labels = f'stage="{stage}"' + (f',site="{_escape(site)}"' if site else '')
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.buckets):
+                    cumulative += count
+                    lines.append(f'price_tracker_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'price_tracker_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'price_tracker_stage_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serves /metrics on a background thread (once per process)."""
+        if self._server is not None:
+            return self._server
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_shared_metrics = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Returns the process-wide metrics, so every tracker, thread and the notifier add to the same numbers."""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+        return _shared_metrics
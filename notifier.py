@@ -0,0 +1,289 @@
+# notifier.py - Sends deal alert emails in the background over one reused SMTP connection
+
+import atexit
+import logging
+import queue
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from config import EMAIL_CONFIG, NOTIFIER_DIGEST, NOTIFIER_IDLE_TIMEOUT, TEST_MODE
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def build_alert_body(alert_info, sender="your automated price tracker"):
+    """The email text for one alert ({'product_name', 'site', 'price', 'threshold', ...})."""
+    return f"""
+Great news! Your {alert_info['product_name']} has hit a great price!
+
+🏪 Store: {alert_info['site']}
+💰 Current Price: ₹{alert_info['price']:,.2f}
+🎯 Your Target: ₹{alert_info['threshold']:,.2f}
+📈 Historical Low: ₹{alert_info['historical_low']:,.2f}
+
+🔥 Alert Reason: {alert_info['reason']}
+
+⏰ Detected at: {alert_info.get('detected_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+🛒 Ready to buy? Here's the link:
+{alert_info['url']}
+
+Happy shopping! 🎉
+
+---
+This alert was sent by {sender}.
+    """
+
+
+def build_digest_body(alerts, sender="your automated price tracker"):
+    """One email text listing every alert of a wave, best price first within each product."""
+    lines = [f"Great news! {len(alerts)} deal(s) found in the latest price check:", ""]
+
+    products = {}
+    for alert_info in alerts:
+        products.setdefault(alert_info['product_name'], []).append(alert_info)
+
+    for product_name, product_alerts in products.items():
+        lines.append(f"⌚ {product_name} (target ₹{product_alerts[0]['threshold']:,.2f})")
+        for alert_info in sorted(product_alerts, key=lambda alert: alert['price']):
+            lines.append(f"  🏪 {alert_info['site']}: ₹{alert_info['price']:,.2f} - {alert_info['reason']}")
+            lines.append(f"     🛒 {alert_info['url']}")
+        lines.append("")
+
+    lines += [
+        f"⏰ Detected at: {alerts[0].get('detected_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "Happy shopping! 🎉",
+        "",
+        "---",
+        f"This digest was sent by {sender}."
+    ]
+    return "\n".join(lines)
+
+
+def build_messages(alerts, digest=NOTIFIER_DIGEST, sender="your automated price tracker"):
+    """Turns one wave's alerts into email messages: a single digest, or one message per alert."""
+    if not alerts:
+        return []
+
+    if digest and len(alerts) > 1:
+        subjects_and_bodies = [(f"🎯 {len(alerts)} Deal Alerts", build_digest_body(alerts, sender))]
+    else:
+        subjects_and_bodies = [
+            (f"🎯 {alert_info['product_name']} Deal Alert: {alert_info['site']}", build_alert_body(alert_info, sender))
+            for alert_info in alerts
+        ]
+
+    messages = []
+    for subject, body in subjects_and_bodies:
+        msg = MIMEMultipart()
+        msg['From'] = EMAIL_CONFIG['email']
+        msg['To'] = EMAIL_CONFIG['email']
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+        messages.append(msg)
+    return messages
+
+
+class EmailNotifier:
+    """
+    Sends alert emails from a background thread, so a scrape wave never waits for a mail server.
+    Like a mail room with one courier: letters are dropped in the tray and the courier, who keeps
+    the van running between rounds, delivers them - instead of every letter hiring a new courier.
+
+    The SMTP connection (TCP + STARTTLS + login) is opened once and reused for every message,
+    across waves too, until it has been idle for NOTIFIER_IDLE_TIMEOUT seconds. With
+    NOTIFIER_DIGEST all alerts of a wave go out as a single email.
+    """
+
+    def __init__(self, email_config=None, digest=NOTIFIER_DIGEST, idle_timeout=NOTIFIER_IDLE_TIMEOUT,
+                 test_mode=TEST_MODE):
+        self.email_config = email_config or EMAIL_CONFIG
+        self.digest = digest
+        self.idle_timeout = idle_timeout
+        self.test_mode = test_mode
+
+        self._queue = queue.Queue()
+        self._smtp = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.emails_sent = 0
+        self.alerts_sent = 0
+        self.connections_opened = 0
+        self.last_error = None
+
+    # --- queueing --------------------------------------------------------------------------
+
+    def send_alerts(self, alerts, sender="your automated price tracker"):
+        """
+        Queues one wave's alerts and returns straight away with how many were queued.
+        They're sent as one digest (or one email each) by the background thread.
+        In test mode they're only logged, and nothing counts as queued.
+        """
+        alerts = list(alerts)
+        if not alerts:
+            return 0
+
+        if self.test_mode:
+            for alert_info in alerts:
+                logger.info(f"TEST MODE: Would send alert for {alert_info}")
+            return 0
+
+        detected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for alert_info in alerts:
+            alert_info.setdefault('detected_at', detected_at)
+
+        self._ensure_worker()
+        self._queue.put((alerts, sender))
+        return len(alerts)
+
+    def flush(self, timeout=60):
+        """Waits until every queued alert has been handled. Returns False if that took longer than timeout."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=60):
+        """Sends whatever is still queued, then stops the background thread and logs out."""
+        self.flush(timeout)
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    # --- the background thread -------------------------------------------------------------
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='email-notifier', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # Nothing to send for a while - don't keep the server's connection slot busy
+                self._disconnect()
+                continue
+
+            try:
+                if job is None:
+                    return
+                alerts, sender = job
+                self._deliver(alerts, sender)
+            except Exception as e:
+                self.last_error = e
+                logger.error(f"Failed to send email alert: {e}")
+                print(f"❌ Failed to send email alert: {e}")
+            finally:
+                self._queue.task_done()
+                if job is None:
+                    self._disconnect()
+
+    def _deliver(self, alerts, sender):
+        """
+        Sends one wave's messages. A message that fails is logged and skipped - the wave's other
+        alerts still go out, each in its own email unless they share a digest.
+        """
+        messages = build_messages(alerts, digest=self.digest, sender=sender)
+        alerts_per_message = [alerts] if len(messages) == 1 else [[alert_info] for alert_info in alerts]
+
+        delivered, error = [], None
+        for msg, message_alerts in zip(messages, alerts_per_message):
+            try:
+                self._send(msg)
+            except Exception as e:
+                error = e
+                logger.error(f"Failed to send email alert '{msg['Subject']}': {e}")
+                print(f"❌ Failed to send email alert '{msg['Subject']}': {e}")
+                continue
+            self.emails_sent += 1
+            delivered.extend(message_alerts)
+
+        self.last_error = error
+        if not delivered:
+            return
+        self.alerts_sent += len(delivered)
+        sites = ', '.join(f"{alert_info['site']} - ₹{alert_info['price']:,.2f}" for alert_info in delivered)
+        logger.info(f"Email alert sent successfully for {len(delivered)} of {len(alerts)} deal(s)")
+        print(f"📧 Alert sent: {sites}")
+
+    def _send(self, msg):
+        try:
+            smtp = self._connection()
+            with get_metrics().span('email.send'):
+                smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the idle connection - log in again once and retry
+            self._disconnect()
+            smtp = self._connection()
+            with get_metrics().span('email.send'):
+                smtp.send_message(msg)
+
+    # --- the SMTP connection ---------------------------------------------------------------
+
+    def _connection(self):
+        """The open, logged-in SMTP connection - checked with NOOP, and reopened if the server closed it."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+
+        config = self.email_config
+        with get_metrics().span('email.connect'):
+            smtp = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=30)
+            try:
+                if config.get('use_tls', True):
+                    smtp.starttls()
+                if config.get('password'):
+                    smtp.login(config['email'], config['password'])
+            except Exception:
+                smtp.close()
+                raise
+
+        self._smtp = smtp
+        self.connections_opened += 1
+        logger.info(f"Opened SMTP connection to {config['smtp_server']}:{config['smtp_port']}")
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+
+_shared_notifier = None
+_shared_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """
+    Returns the process-wide notifier, so the CLI, the daemon and every dashboard tab
+    share one queue and one SMTP connection. Queued alerts are still sent at exit.
+    """
+    global _shared_notifier
+    with _shared_notifier_lock:
+        if _shared_notifier is None:
+            _shared_notifier = EmailNotifier()
+            atexit.register(_shared_notifier.close)
+        return _shared_notifier
@@ -0,0 +1,159 @@
+# price_parser.py - One shared, precompiled engine for turning price text into numbers
+
+import re
+from functools import lru_cache
+
+from config import PRICE_BOUNDS
+
+# An amount in Indian (1,23,456) or western (123,456) grouping, or ungrouped, with optional paise
+AMOUNT_PATTERN = re.compile(
+    r'(?<![\d.,])'
+    r'(?P<whole>\d{1,3}(?:,\d{2})*,\d{3}|\d{1,3}(?:,\d{3})+|\d+)'
+    r'(?:\.(?P<fraction>\d{1,2}))?'
+    r'(?![\d,]*\d)'
+)
+
+# Currency markers: ₹, Rs, Rs., INR (case-insensitive), directly before or after the amount
+CURRENCY_PATTERN = re.compile(r'(?:₹|\bRs\.?|\bINR\b)\s*$', re.IGNORECASE)
+TRAILING_CURRENCY_PATTERN = re.compile(r'^\s*(?:₹|INR\b|/-)', re.IGNORECASE)
+
+# Words that mark the list price rather than what you actually pay
+MRP_PATTERN = re.compile(
+    r'(?:\bM\.?\s?R\.?\s?P\.?|\bList\s+price|\bOriginal\s+price|\bWas\b|\bStrike\s+price)[\s:]*(?:₹|Rs\.?|INR)?\s*$',
+    re.IGNORECASE
+)
+
+# Words that mark the selling price
+SALE_PATTERN = re.compile(
+    r'(?:\b(?:Sale|Offer|Deal|Special|Selling|Final|Our|Best)\s+price|\bNow\b|\bYou\s+pay)[\s:]*(?:₹|Rs\.?|INR)?\s*$',
+    re.IGNORECASE
+)
+
+# Numbers that are percentages ("31% off") or counts ("1,234 ratings") are never prices
+NOT_A_PRICE_PATTERN = re.compile(
+    r'^\s*(?:%|percent|off\b|ratings?\b|reviews?\b|items?\b|left\b|sold\b)',
+    re.IGNORECASE
+)
+
+# How far before an amount to look for currency/MRP/sale markers
+CONTEXT_CHARS = 24
+
+
+class PriceCandidate:
+    """One number found in one piece of text, plus how much we believe it is the selling price."""
+
+    __slots__ = ('price', 'confidence', 'text', 'in_bounds')
+
+    def __init__(self, price, confidence, text, in_bounds):
+        self.price = price
+        self.confidence = confidence
+        self.text = text
+        self.in_bounds = in_bounds
+
+    def __repr__(self):
+        return f"PriceCandidate(price={self.price}, confidence={self.confidence:.2f}, text={self.text!r})"
+
+
+def get_price_bounds(site_config=None):
+    """Sanity bounds for a site: its own 'price_bounds' or the global PRICE_BOUNDS."""
+    if site_config and site_config.get('price_bounds'):
+        return tuple(site_config['price_bounds'])
+    return tuple(PRICE_BOUNDS)
+
+
+@lru_cache(maxsize=4096)
+def _scan(text):
+    """
+    Finds every amount in a text with the facts that matter for scoring.
+    Returns a tuple of (price, has_currency, is_mrp, is_sale) - cached, since pages repeat themselves.
+    """
+    amounts = []
+
+    for match in AMOUNT_PATTERN.finditer(text):
+        after = text[match.end():match.end() + 12]
+        if NOT_A_PRICE_PATTERN.match(after):
+            continue
+
+        before = text[max(0, match.start() - CONTEXT_CHARS):match.start()]
+        whole = match.group('whole').replace(',', '')
+        fraction = match.group('fraction') or '0'
+        price = float(f'{whole}.{fraction}')
+
+        amounts.append((
+            price,
+            bool(CURRENCY_PATTERN.search(before) or TRAILING_CURRENCY_PATTERN.match(after)),
+            bool(MRP_PATTERN.search(before)),
+            bool(SALE_PATTERN.search(before)),
+        ))
+
+    return tuple(amounts)
+
+
+def _score(has_currency, is_mrp, is_sale, struck, position):
+    """Confidence (0-1) that an amount is the price you'd actually pay."""
+    confidence = 0.5
+    if has_currency:
+        confidence += 0.2
+    if is_sale:
+        confidence += 0.15
+    if is_mrp:
+        confidence -= 0.35
+    if struck:
+        confidence -= 0.35
+    # Earlier amounts in the text are usually the headline price - a gentle tie-breaker
+    confidence -= min(position, 10) * 0.01
+    return max(0.0, min(1.0, confidence))
+
+
+def parse_candidates(candidates, bounds=None):
+    """
+    Parses many candidate price texts at once and returns the best PriceCandidate, or None.
+
+    Each candidate is either a plain string or a dict like
+    {'text': '₹12,995', 'struck': True} where 'struck' marks text shown with strike-through
+    (usually the MRP). Candidates should be ordered best-source-first, e.g. primary selector
+    matches before backup selector matches.
+
+    The first candidate with a parseable amount wins (struck-through ones only if nothing else
+    has an amount): selectors match the product's own price before recommended and sponsored
+    items, so a later element must never win just because its price looks more plausible - that
+    would hide exactly the drop below the bounds we want to catch. Within one text, the amount
+    with the most convincing context wins. Bounds don't choose anything; they only set in_bounds,
+    so callers can warn.
+    """
+    low, high = bounds or get_price_bounds()
+    struck_fallback = None
+
+    for candidate in candidates:
+        if isinstance(candidate, dict):
+            text = candidate.get('text') or ''
+            struck = candidate.get('struck', False)
+        else:
+            text = candidate or ''
+            struck = False
+
+        best = None
+        for position, (price, has_currency, is_mrp, is_sale) in enumerate(_scan(text)):
+            confidence = _score(has_currency, is_mrp, is_sale, struck, position)
+            if best is None or confidence > best.confidence:
+                best = PriceCandidate(price, confidence, text, low <= price <= high)
+
+        if best is None:
+            continue
+        if not struck:
+            return best
+        if struck_fallback is None:
+            struck_fallback = best
+
+    return struck_fallback
+
+
+def parse_price(text, bounds=None):
+    """Parses a single price text like '₹8,999.00' or 'Rs. 1,23,456' - returns the best PriceCandidate or None."""
+    return parse_candidates([text], bounds=bounds)
+
+
+def is_within_bounds(price, bounds=None):
+    """Whether a price passes the sanity bounds."""
+    low, high = bounds or get_price_bounds()
+    return low <= price <= high
@@ -0,0 +1,186 @@
+# rate_limit.py - Each retailer's request budget, shared by every thread, tracker and scrape method
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from catalog import get_site_domain
+from config import USER_AGENT, RATE_LIMIT_BURST, RESPECT_CRAWL_DELAY, RETRY_AFTER_MAX_SECONDS
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Answers that mean "slow down"
+SLOW_DOWN_STATUSES = {429, 503}
+SLOWDOWN_FACTOR = 0.5  # Each slow-down answer halves a domain's request rate...
+RECOVERY_STEP = 0.1  # ...and each normal answer gives back 10% of its configured rate
+MIN_RATE_FRACTION = 0.1  # Never below a tenth of the configured rate
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header - either a number of seconds or an HTTP date. None if unusable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc) if now is None else now
+    return max(0.0, (moment - now).total_seconds())
+
+
+class TokenBucket:
+    """
+    A domain's budget: tokens drip in at `rate` per second up to `capacity`, and every request
+    takes one. Callers that find the bucket empty reserve the next token anyway and are told how
+    long to wait for it, so waiting threads are served in order instead of racing each other.
+    """
+
+    __slots__ = ('base_rate', 'rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate, capacity, now):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """Takes a token and returns the seconds to wait before using it."""
+        if self.rate is None:
+            return max(0.0, self.blocked_until - now)
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def slow_down(self, now, retry_after=None):
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if self.rate is not None:
+            self.rate = max(self.base_rate * MIN_RATE_FRACTION, self.rate * SLOWDOWN_FACTOR)
+
+    def recover(self):
+        if self.rate is not None and self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+
+class DomainRateLimiter:
+    """
+    Paces requests per domain. Think of a doorman per shop: everyone may come in, but only as fast
+    as the shop allows - and when the shop says "we're full, come back in a minute" (429/503 with
+    Retry-After), the doorman holds everyone for that minute and lets them in more slowly afterwards.
+
+    A retailer's budget is one request per 'wait_time' seconds (or its robots.txt Crawl-delay, if
+    that is longer), with 'burst' requests allowed back-to-back. Time spent downloading counts
+    towards the wait, and different domains never wait for each other.
+    """
+
+    def __init__(self, burst=RATE_LIMIT_BURST, respect_crawl_delay=RESPECT_CRAWL_DELAY,
+                 retry_after_max=RETRY_AFTER_MAX_SECONDS):
+        self.burst = burst
+        self.respect_crawl_delay = respect_crawl_delay
+        self.retry_after_max = retry_after_max
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def crawl_delay(self, url):
+        """The Crawl-delay robots.txt asks of us for the URL's site, or None (also when it can't be read)."""
+        parts = url.split('/', 3)
+        robots_url = '/'.join(parts[:3]) + '/robots.txt'
+        try:
+            response = requests.get(robots_url, headers={'User-Agent': USER_AGENT}, timeout=5)
+            if response.status_code != 200:
+                return None
+            robots = RobotFileParser()
+            robots.parse(response.text.splitlines())
+            delay = robots.crawl_delay(USER_AGENT)
+            return float(delay) if delay is not None else None
+        except (requests.RequestException, ValueError) as e:
+            logger.info(f"Could not read {robots_url}: {e}")
+            return None
+
+    def _bucket(self, domain, url, site_config):
+        with self._lock:
+            bucket = self._buckets.get(domain)
+        if bucket is not None or site_config is None:
+            return bucket
+
+        interval = site_config.get('wait_time', 3)
+        if self.respect_crawl_delay:
+            # Read once per domain, outside the lock - other domains shouldn't wait for this one's robots.txt
+            delay = self.crawl_delay(url)
+            if delay and delay > interval:
+                logger.info(f"{domain} asks for a Crawl-delay of {delay:g} s - using it instead of {interval:g} s")
+                interval = delay
+
+        rate = 1 / interval if interval and interval > 0 else None
+        new_bucket = TokenBucket(rate, site_config.get('burst', self.burst), time.monotonic())
+        with self._lock:
+            return self._buckets.setdefault(domain, new_bucket)
+
+    def acquire(self, url, site_config=None):
+        """
+        Waits until the URL's domain may be sent another request, and returns the seconds waited.
+        site_config sets the budget the first time a domain is seen; without one (and no budget
+        yet) the request isn't paced.
+        """
+        bucket = self._bucket(get_site_domain(url), url, site_config)
+        if bucket is None:
+            return 0.0
+
+        with self._lock:
+            wait = bucket.reserve(time.monotonic())
+        if wait > 0:
+            get_metrics().observe('ratelimit.wait', wait)
+            time.sleep(wait)
+        return wait
+
+    def feedback(self, url, status_code, retry_after=None):
+        """
+        Tells the limiter how the domain answered. 429/503 slow it down (and pause it for the
+        Retry-After, capped at RETRY_AFTER_MAX_SECONDS); other answers let the rate recover.
+        """
+        domain = get_site_domain(url)
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                return  # Never paced (no budget was given), so there is nothing to slow down
+
+            if status_code in SLOW_DOWN_STATUSES:
+                pause = parse_retry_after(retry_after)
+                if pause is not None:
+                    pause = min(pause, self.retry_after_max)
+                bucket.slow_down(time.monotonic(), pause)
+            else:
+                bucket.recover()
+                return
+
+        logger.warning(f"{domain} answered {status_code} - slowing down"
+                       + (f", pausing it for {pause:.0f} s" if pause else ""))
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the process-wide rate limiter, so every thread, tracker and scrape method shares each domain's budget."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = DomainRateLimiter()
+        return _shared_limiter
@@ -0,0 +1,123 @@
+# refresh_service.py - One background price refresher shared by every dashboard tab
+
+import logging
+import threading
+from datetime import datetime
+
+from main import PriceTracker
+from metrics import get_metrics
+from scheduler import WaveScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshService:
+    """
+    Owns the dashboard's automatic price refreshes for the whole process.
+    Like a single newspaper delivery for the building instead of every flat fetching its own copy:
+    however many tabs are open, prices are scraped once per interval.
+
+    Tabs don't wait or sleep - they compare `version` with the last one they've seen and reload
+    their data only when it changed. Manual refreshes go through the same lock, so a button click
+    never runs alongside a scheduled wave.
+    """
+
+    def __init__(self, interval_minutes=60, deal_finder=None, alert_callback=None):
+        self.deal_finder = deal_finder  # Called with the wave's {(product_id, site): price}; returns the alerts
+        self.alert_callback = alert_callback  # Called once per wave with every alert found; returns how many were sent
+        self.enabled = False
+        self.version = 0
+        self.last_result = None
+
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._scheduler = WaveScheduler(self.refresh, interval_seconds=interval_minutes * 60,
+                                        run_immediately=False, name='dashboard-refresh')
+
+    @property
+    def interval_minutes(self):
+        return self._scheduler.interval_seconds / 60
+
+    @property
+    def next_refresh_at(self):
+        return self._scheduler.next_run_at if self.enabled else None
+
+    @property
+    def is_refreshing(self):
+        return self._refresh_lock.locked()
+
+    def configure(self, enabled, interval_minutes):
+        """Turns automatic refreshes on/off and sets their interval - shared by every open tab."""
+        with self._state_lock:
+            self._scheduler.set_interval(interval_minutes * 60)
+
+            if enabled and not self.enabled:
+                self._scheduler.start()
+                logger.info(f"Dashboard auto-refresh started (every {interval_minutes} minutes)")
+            elif not enabled and self.enabled:
+                self._scheduler.stop(timeout=0)  # A running wave still finishes in the background
+                logger.info("Dashboard auto-refresh stopped")
+
+            self.enabled = enabled
+
+    def refresh(self, progress=None):
+        """
+        Fetches, saves and checks the prices of every product in the catalog once, in a single wave.
+        progress(percent, message) is called along the way. Returns the result dict ('prices' holds
+        {(product_id, site): price}), or None if another refresh was already running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("Price refresh already running - not starting another one")
+            return None
+
+        def report(percent, message):
+            if progress:
+                progress(percent, message)
+
+        tracker = None
+        get_metrics().start_wave()
+        try:
+            report(0, "🔄 Initializing price tracker...")
+            tracker = PriceTracker()
+
+            report(20, "🌐 Fetching prices from all sites...")
+            catalog_prices = tracker.get_catalog_prices()
+
+            if not catalog_prices:
+                result = {'success': False, 'error': 'No prices retrieved', 'timestamp': datetime.now()}
+            else:
+                # Deals are judged against the history as it was before this wave
+                report(60, "🔍 Checking for price alerts...")
+                alerts = self.deal_finder(catalog_prices) if self.deal_finder else []
+
+                report(80, "💾 Saving price data...")
+                tracker.save_catalog_prices(catalog_prices)
+
+                # One hand-off per wave, so the notifier can send it as a single digest
+                alerts_sent = self.alert_callback(alerts) if self.alert_callback and alerts else 0
+
+                report(100, f"✅ Successfully updated {len(catalog_prices)} prices!")
+                result = {
+                    'success': True,
+                    'prices': catalog_prices,
+                    'alerts_sent': alerts_sent,
+                    'timestamp': datetime.now()
+                }
+            logger.info(f"Price refresh completed: {result}")
+
+        except Exception as e:
+            logger.error(f"Price refresh error: {e}")
+            result = {'success': False, 'error': str(e), 'timestamp': datetime.now()}
+
+        finally:
+            if tracker:
+                tracker.cleanup()
+            get_metrics().finish_wave()
+            self._refresh_lock.release()
+
+        # Publishing a new version is what tells every open tab to reload
+        with self._state_lock:
+            self.last_result = result
+            self.version += 1
+
+        return result
@@ -0,0 +1,215 @@
+# resilience.py - Retries for a site's hiccups, and a circuit breaker for sites that are down or blocking us
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import httpx
+import requests
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, WebDriverException
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from config import RESILIENCE_POLICY, CIRCUIT_STATE_FILE
+
+logger = logging.getLogger(__name__)
+
+# Responses worth asking again for: rate limited, or the server (or its gateway) having a bad moment
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_resilience_policy(site_config=None):
+    """RESILIENCE_POLICY with a site's own 'resilience' overrides applied."""
+    if site_config and site_config.get('resilience'):
+        return {**RESILIENCE_POLICY, **site_config['resilience']}
+    return RESILIENCE_POLICY
+
+
+def is_transient(error):
+    """
+    Whether trying again soon might work: dropped or refused connections, connect timeouts and
+    RETRY_STATUSES responses. Read timeouts are not retried - a server that took the whole timeout
+    once will likely do it again, and every retry would cost the wave another full timeout.
+    """
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    if isinstance(error, (httpx.ReadTimeout, httpx.WriteTimeout, httpx.PoolTimeout, requests.ReadTimeout)):
+        return False
+    return isinstance(error, (httpx.TransportError, requests.ConnectionError,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+class PriceElementMissing(Exception):
+    """
+    The page came back, but none of the price selectors matched (or the browser waited for them in
+    vain). That's what a block page, a bot wall or a captcha looks like from here.
+    """
+
+
+def is_site_failure(error):
+    """
+    Whether an error says the retailer itself is down or blocking us, rather than one listing being
+    broken: network errors, error statuses (but not 404/410 - that's one missing product page),
+    browser failures, and pages without any price element (PriceElementMissing). A price element
+    whose text can't be read as a price is that listing's problem and never counts.
+
+    A single listing with an outdated selector only trips the breaker if the site's other listings
+    fail too - every price found resets the count of failures in a row.
+    """
+    if isinstance(error, PriceElementMissing):
+        return True
+    if isinstance(error, (NoSuchElementException, StaleElementReferenceException)):
+        return False  # The page loaded; this listing's markup just isn't what we expected
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)):
+        return error.response is None or error.response.status_code not in (404, 410)
+    return isinstance(error, (httpx.HTTPError, requests.RequestException, WebDriverException))
+
+
+def call_with_retries(function, site_name, policy=RESILIENCE_POLICY):
+    """
+    Calls function() and retries transient errors (see is_transient) with exponential backoff
+    and jitter, up to policy['attempts'] tries in total. The last error is raised as-is.
+    """
+    if policy['attempts'] <= 1:
+        return function()
+
+    def log_retry(retry_state):
+        logger.warning(f"{site_name}: {retry_state.outcome.exception()} - try {retry_state.attempt_number + 1} "
+                       f"of {policy['attempts']} in {retry_state.next_action.sleep:.1f} s")
+
+    retrying = Retrying(
+        stop=stop_after_attempt(policy['attempts']),
+        wait=wait_exponential_jitter(initial=policy['backoff_seconds'], max=policy['max_backoff_seconds'],
+                                     jitter=policy['backoff_seconds']),
+        retry=retry_if_exception(is_transient),
+        before_sleep=log_retry,
+        reraise=True
+    )
+    return retrying(function)
+
+
+class CircuitBreakers:
+    """
+    One circuit breaker per site. Like a fuse box: a site that fails failure_threshold checks in
+    a row trips its fuse, and is then skipped - costing the wave nothing - until its cool-off is
+    over. Then one trial check is let through: if it works the circuit closes again, if not the
+    site is skipped for twice as long (up to max_cooloff_minutes).
+
+    State is kept in a small JSON file, so a site that was down in the last run isn't hammered
+    again by the next one.
+    """
+
+    def __init__(self, path=CIRCUIT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.sites = {}
+        self._load()
+
+    # --- state -----------------------------------------------------------------------------
+
+    def _load(self):
+        """Reads the state file; a missing or damaged file just means every circuit is closed."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.sites = json.load(file).get('sites', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable circuit breaker state {self.path}: {e}")
+
+        # A trial that was running when the last run stopped never reported back - allow a new one
+        for state in self.sites.values():
+            if state.get('state') == 'half_open':
+                state['state'] = 'open'
+
+    def save(self):
+        """Writes the state to disk atomically, so a crash never leaves half a file behind."""
+        with self._lock:
+            if not self._dirty:
+                return
+            serialized = json.dumps({'sites': self.sites}, indent=2)
+            self._dirty = False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False,
+                                             suffix='.tmp', encoding='utf-8') as temp_file:
+                temp_file.write(serialized)
+            os.replace(temp_file.name, self.path)
+        except OSError as e:
+            logger.error(f"Could not save circuit breaker state: {e}")
+
+    def _state(self, site):
+        return self.sites.setdefault(site, {'state': 'closed', 'failures': 0, 'open_until': None, 'cooloff': None})
+
+    # --- checks ----------------------------------------------------------------------------
+
+    def allow(self, site, now=None):
+        """
+        Whether the site may be checked now. True for a closed circuit, and for exactly one trial
+        check once an open circuit's cool-off has passed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self.sites.get(site)
+            if state is None or state['state'] == 'closed':
+                return True
+            if state['state'] == 'open' and now >= state['open_until']:
+                state['state'] = 'half_open'
+                self._dirty = True
+                logger.info(f"{site}: cool-off over, letting one trial check through")
+                return True
+            return False
+
+    def open_until(self, site):
+        """When an open circuit lets the site be checked again (a timestamp), or None if it's closed."""
+        with self._lock:
+            state = self.sites.get(site)
+            return state['open_until'] if state and state['state'] != 'closed' else None
+
+    def record(self, site, success, policy=RESILIENCE_POLICY, now=None):
+        """Records the outcome of one check of the site, opening or closing its circuit as needed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(site)
+
+            if success:
+                if state['state'] != 'closed':
+                    logger.info(f"{site} is answering again - circuit closed")
+                if state['failures'] or state['state'] != 'closed':
+                    state.update(state='closed', failures=0, open_until=None, cooloff=None)
+                    self._dirty = True
+                return
+
+            state['failures'] += 1
+            self._dirty = True
+
+            if state['state'] == 'half_open':
+                # The trial failed too - stay away for longer this time
+                cooloff = min(state['cooloff'] * 2, policy['max_cooloff_minutes'] * 60)
+            elif state['failures'] >= policy['failure_threshold']:
+                cooloff = policy['cooloff_minutes'] * 60
+            else:
+                return
+
+            state.update(state='open', open_until=now + cooloff, cooloff=cooloff)
+            logger.warning(f"{site} failed {state['failures']} checks in a row - skipping it until "
+                           f"{datetime.fromtimestamp(now + cooloff):%Y-%m-%d %H:%M}")
+
+
+_shared_breakers = None
+_shared_breakers_lock = threading.Lock()
+
+
+def get_circuit_breakers():
+    """Returns the process-wide circuit breakers, so every tracker and thread sees the same open circuits."""
+    global _shared_breakers
+    with _shared_breakers_lock:
+        if _shared_breakers is None:
+            _shared_breakers = CircuitBreakers()
+        return _shared_breakers
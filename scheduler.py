@@ -0,0 +1,137 @@
+# scheduler.py - Runs scrape waves on a fixed interval inside one long-lived process
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import CHECK_INTERVAL_HOURS, SCHEDULER_JITTER
+
+logger = logging.getLogger(__name__)
+
+
+class WaveScheduler:
+    """
+    Calls run_wave() every interval_seconds, shifted by a little random jitter, until stopped.
+    Think of it as an alarm clock that never rings while you're still busy with the last alarm.
+
+    Only one wave runs at a time: if a wave is still going when the next one is due (or when
+    run_now() is called), the new one is skipped instead of stacking up. Stopping waits for the
+    current wave to finish, so history and alerts are never left half-written.
+    """
+
+    def __init__(self, run_wave, interval_seconds=None, jitter=SCHEDULER_JITTER, run_immediately=True,
+                 name='price-waves'):
+        self.run_wave = run_wave
+        self.interval_seconds = interval_seconds or CHECK_INTERVAL_HOURS * 3600
+        self.jitter = jitter
+        self.run_immediately = run_immediately
+        self.name = name
+
+        self._wave_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()  # Set when the interval changes or on stop()
+        self._thread = None
+
+        self.next_run_at = None  # datetime of the next scheduled wave
+        self.last_started_at = None
+        self.last_finished_at = None
+        self.last_result = None
+        self.last_error = None
+        self.waves_run = 0
+        self.waves_skipped = 0
+
+    @property
+    def is_running_wave(self):
+        return self._wave_lock.locked()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def _next_delay(self):
+        """Interval plus or minus up to `jitter` of itself, so checks don't hit sites at the same minute."""
+        spread = self.interval_seconds * self.jitter
+        return max(0.0, self.interval_seconds + random.uniform(-spread, spread))
+
+    def run_now(self):
+        """Runs one wave right away. Returns False (and does nothing) if a wave is already running."""
+        if not self._wave_lock.acquire(blocking=False):
+            self.waves_skipped += 1
+            logger.warning(f"{self.name}: previous wave still running - skipping this one")
+            return False
+
+        try:
+            self.last_started_at = datetime.now()
+            logger.info(f"{self.name}: wave started")
+            self.last_result = self.run_wave()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            logger.error(f"{self.name}: wave failed: {e}")
+        finally:
+            self.last_finished_at = datetime.now()
+            self.waves_run += 1
+            self._wave_lock.release()
+
+        duration = (self.last_finished_at - self.last_started_at).total_seconds()
+        logger.info(f"{self.name}: wave finished in {duration:.1f}s")
+        return True
+
+    def set_interval(self, interval_seconds):
+        """Changes the interval; a waiting scheduler re-plans its next wave straight away."""
+        if interval_seconds != self.interval_seconds:
+            self.interval_seconds = interval_seconds
+            self._wake_event.set()
+
+    def _wait_until(self, deadline):
+        """Sleeps until the monotonic deadline. Returns False if woken early by set_interval() or stop()."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        self.next_run_at = datetime.now() + timedelta(seconds=remaining)
+        logger.info(f"{self.name}: next wave at {self.next_run_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        woken = self._wake_event.wait(remaining)
+        self._wake_event.clear()
+        return not woken
+
+    def run_forever(self):
+        """Blocks, running waves on schedule until stop() is called."""
+        reference = time.monotonic()  # When the current interval started counting
+        deadline = reference if self.run_immediately else reference + self._next_delay()
+
+        while not self._stop_event.is_set():
+            if not self._wait_until(deadline):
+                # Interval changed (or stopping) - count the new interval from the same starting point
+                deadline = reference + self._next_delay()
+                continue
+
+            reference = time.monotonic()
+            self.run_now()
+            elapsed = time.monotonic() - reference
+
+            # Keep a steady rhythm: the wave's own duration counts towards the interval
+            deadline = reference + self._next_delay()
+            if elapsed > self.interval_seconds:
+                logger.warning(f"{self.name}: wave took {elapsed:.0f}s, longer than the interval - "
+                               "starting the next one right away")
+
+        self.next_run_at = None
+        logger.info(f"{self.name}: scheduler stopped")
+
+    def start(self):
+        """Runs the schedule on a background daemon thread."""
+        if self._thread and self._thread.is_alive():
+            self._stop_event.clear()  # A stop that hasn't taken effect yet is simply cancelled
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Asks the scheduler to stop after the current wave; waits up to `timeout` seconds for it."""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
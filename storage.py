@@ -0,0 +1,719 @@
+# storage.py - Where price history lives: the classic CSV file or a SQLite database
+#
+# One-shot import of an existing CSV into SQLite (from the project folder):
+#   python storage.py import-csv
+#   python storage.py import-csv --csv old_history.csv --db price_history.db --force
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+try:
+    import fcntl
+except ImportError:  # Windows - only the in-process locks apply there
+    fcntl = None
+
+from config import HISTORY_FILE, HISTORY_BACKEND, HISTORY_DB, DEFAULT_PRODUCT
+from history_index import get_history_index, empty_aggregates
+from history_rollups import UPSERT_ROLLUP, ensure_rollup_schema, get_rollup_store, rollup_values
+
+logger = logging.getLogger(__name__)
+
+# 'product' comes last so files written before products existed only ever gain a column
+HISTORY_FIELDS = ['timestamp', 'site', 'price', 'is_new_low', 'below_threshold', 'product']
+REQUIRED_COLUMNS = ['timestamp', 'site', 'price']
+
+
+def _to_bool(value):
+    """CSV stores booleans as 'True'/'False' text; SQLite stores 1/0."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def _typed_frame(df):
+    """Gives a history DataFrame proper dtypes: datetime timestamps and numeric prices."""
+    import pandas as pd
+
+    if df.empty:
+        return df
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['price'] = pd.to_numeric(df['price'], errors='coerce')
+    # Rows recorded before products existed belong to DEFAULT_PRODUCT
+    if 'product' not in df.columns:
+        df['product'] = DEFAULT_PRODUCT
+    else:
+        df['product'] = df['product'].fillna(DEFAULT_PRODUCT)
+    return df.dropna(subset=['price'])
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on <path>.lock for the with-block. Threads have their own locks; this
+    one makes other processes (the scheduler, the dashboard, a compaction from cron) wait their turn
+    instead of writing a file while another process is rewriting it.
+    """
+    with open(f'{path}.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # Closing the file releases the lock
+
+
+class HistoryStore(ABC):
+    """
+    The interface every history backend offers.
+    Callers never care whether rows end up in a CSV file or a database.
+    """
+
+    @abstractmethod
+    def append_rows(self, rows):
+        """Adds one scrape wave worth of rows ({'timestamp', 'site', 'price', 'product', ...})."""
+
+    @abstractmethod
+    def get_all_aggregates(self):
+        """Returns {product: {'global': stats, 'sites': {site: stats}}} for every product with history."""
+
+    @abstractmethod
+    def get_aggregates(self, product=None):
+        """
+        Returns {'global': stats, 'sites': {site: stats}} with min/max/count/sum/last_price/last_timestamp
+        for one product (DEFAULT_PRODUCT if None). Backends look up just that product, so a wave that
+        asks once per product stays linear in the number of products.
+        """
+
+    @abstractmethod
+    def read_records(self, since=None, until=None, sites=None, product=None):
+        """Returns matching rows as a list of dicts, oldest first. product=None means every product."""
+
+    @abstractmethod
+    def query_frame(self, since=None, until=None, sites=None, product=None, after_offset=None):
+        """
+        Returns matching rows as a pandas DataFrame with typed timestamp and price columns.
+        after_offset (see read_appended) keeps only the rows written after that bookmark.
+        """
+
+    @abstractmethod
+    def read_appended(self, offset=0):
+        """
+        Returns (rows, next_offset): the rows written after offset, in the order they were written,
+        and the offset to pass next time. Like a bookmark - unlike a timestamp it never skips a row
+        that happens to share its second with the last one read.
+        """
+
+    @abstractmethod
+    def offset_through(self, timestamp):
+        """The offset just past the rows up to timestamp - for turning an old timestamp watermark into a bookmark."""
+
+    def is_empty(self):
+        return not any(aggregates['global']['count'] for aggregates in self.get_all_aggregates().values())
+
+
+class CsvTailReader:
+    """
+    Keeps the parsed history CSV in memory and, on each refresh, parses only the bytes appended since.
+    Like a reader with a bookmark: new pages are read, old ones are not read again.
+
+    The file's identity (inode), its first bytes and the bookmark offset are remembered. If the file
+    was replaced, rotated or truncated, those no longer match and the whole file is read once more.
+    """
+
+    SIGNATURE_BYTES = 256
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.row_count = 0
+        self._identity = None
+        self._signature = b''
+        self._header = b''
+        self._frame = None
+        self.full_reloads = 0
+
+    def _full_reload(self, file, identity):
+        import pandas as pd
+
+        content = file.read()
+        # A half-written last line is left for the next refresh
+        complete = content[:content.rfind(b'\n') + 1]
+
+        self._identity = identity
+        self._signature = content[:self.SIGNATURE_BYTES]
+        self._header = complete[:complete.find(b'\n') + 1]
+        self.offset = len(complete)
+        self.full_reloads += 1
+
+        df = pd.read_csv(io.BytesIO(complete)) if complete.strip() else pd.DataFrame()
+        if not df.empty and all(col in df.columns for col in REQUIRED_COLUMNS):
+            df = _typed_frame(df)
+        self._frame = df
+        self.row_count = len(df)
+
+    def _append_new_rows(self, file):
+        import pandas as pd
+
+        file.seek(self.offset)
+        content = file.read()
+        complete = content[:content.rfind(b'\n') + 1]
+        if not complete:
+            return
+
+        new_rows = pd.read_csv(io.BytesIO(self._header + complete))
+        self.offset += len(complete)
+
+        if new_rows.empty:
+            return
+        if self._frame is None or self._frame.empty:
+            self._frame = _typed_frame(new_rows)
+        else:
+            self._frame = pd.concat([self._frame, _typed_frame(new_rows)], ignore_index=True)
+        self.row_count = len(self._frame)
+
+    def frame(self):
+        """The whole live history as a typed DataFrame - shared, so treat it as read-only."""
+        import pandas as pd
+
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self._reset()
+                return pd.DataFrame()
+
+            identity = (stat.st_dev, stat.st_ino)
+            with open(self.path, 'rb') as file:
+                rotated = (
+                    self._frame is None
+                    or (not self._frame.empty and 'timestamp' not in self._frame.columns)
+                    or identity != self._identity
+                    or stat.st_size < self.offset
+                    or file.read(len(self._signature)) != self._signature
+                )
+                if rotated:
+                    file.seek(0)
+                    self._full_reload(file, identity)
+                elif stat.st_size > self.offset:
+                    self._append_new_rows(file)
+
+            return self._frame
+
+
+def _archive_baseline(store):
+    """Aggregates of the Parquet archive, and how many of the store's first rows they already count."""
+    from history_archive import get_history_archive  # Imported lazily - pyarrow is only needed once archived
+
+    archive = get_history_archive()
+    if not archive.exists():
+        return {}, 0
+    return archive.get_all_aggregates(), archive.archived_offset(store)
+
+
+class CsvHistoryStore(HistoryStore):
+    """The original append-only CSV file, with the aggregate index kept next to it."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._tail_reader = CsvTailReader(path)
+
+    def _index(self):
+        return get_history_index(self.path, baseline_loader=lambda: _archive_baseline(self))
+
+    def append_rows(self, rows):
+        with self._lock, file_lock(self.path):
+            # Check if file exists and has content
+            size_before = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size_before and self._needs_product_column():
+                size_before = self._add_product_column(size_before)
+
+            try:
+                with open(self.path, 'a', newline='', encoding='utf-8') as file:
+                    writer = csv.DictWriter(file, fieldnames=HISTORY_FIELDS, extrasaction='ignore')
+
+                    # Write headers only if file doesn't exist or is empty
+                    if size_before == 0:
+                        writer.writeheader()
+                        logger.info("Created new price history file with headers")
+
+                    writer.writerows(rows)
+
+            except Exception:
+                self._repair_headers()
+                raise
+
+            # Keep the running aggregates and the chart rollups in step with the file
+            self._index().record(rows, size_before)
+            get_rollup_store('csv').record(rows)
+
+    def _repair_headers(self):
+        """If the file exists but has lost its header row, recreate it with proper headers."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', newline='', encoding='utf-8') as file:
+                    first_line = file.readline().strip()
+                if not first_line or 'timestamp' not in first_line:
+                    with open(self.path, 'w', newline='', encoding='utf-8') as new_file:
+                        csv.DictWriter(new_file, fieldnames=HISTORY_FIELDS).writeheader()
+                    logger.warning("Recreated CSV file with proper headers")
+        except Exception as e:
+            logger.error(f"Could not fix CSV headers: {e}")
+
+    def _needs_product_column(self):
+        with open(self.path, 'r', newline='', encoding='utf-8') as file:
+            header = next(csv.reader(file), [])
+        return 'timestamp' in header and 'product' not in header
+
+    def _add_product_column(self, size_before):
+        """
+        One-off upgrade of a file written before products existed: every old row gets DEFAULT_PRODUCT.
+        Returns the new file size. The index totals don't change - those rows already counted there.
+        """
+        temp_path = f'{self.path}.tmp'
+        with open(self.path, 'r', newline='', encoding='utf-8') as source, \
+                open(temp_path, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.DictWriter(target, fieldnames=HISTORY_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for row in csv.DictReader(source):
+                row['product'] = row.get('product') or DEFAULT_PRODUCT
+                writer.writerow(row)
+        os.replace(temp_path, self.path)
+
+        self._index().mark_rewritten(size_before)
+        logger.info(f"Added a product column to {self.path} (existing rows belong to {DEFAULT_PRODUCT})")
+        return os.path.getsize(self.path)
+
+    def get_all_aggregates(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return {}
+        return self._index().get()
+
+    def get_aggregates(self, product=None):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return empty_aggregates()
+        return self._index().get_product(product or DEFAULT_PRODUCT) or empty_aggregates()
+
+    def read_records(self, since=None, until=None, sites=None, product=None):
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+
+            # Check if the required columns exist
+            if reader.fieldnames is None:
+                logger.warning("CSV file appears to be empty or malformed")
+                return []
+
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in reader.fieldnames]
+            if missing_columns:
+                logger.error(f"Missing columns in CSV: {missing_columns}")
+                logger.info("Consider deleting the CSV file to recreate it with proper headers")
+                return []
+
+            # Timestamps are 'YYYY-MM-DD HH:MM:SS', so plain string comparison orders them correctly
+            records = []
+            for row in reader:
+                row['product'] = row.get('product') or DEFAULT_PRODUCT
+                if ((since is None or row['timestamp'] >= since)
+                        and (until is None or row['timestamp'] < until)
+                        and (sites is None or row['site'] in sites)
+                        and (product is None or row['product'] == product)):
+                    records.append(row)
+            return records
+
+    def query_frame(self, since=None, until=None, sites=None, product=None, after_offset=None):
+        import pandas as pd
+
+        # Only rows appended since the last call are parsed - the rest is already in memory
+        df = self._tail_reader.frame()
+        if df.empty or any(col not in df.columns for col in REQUIRED_COLUMNS):
+            return df.copy()
+
+        mask = pd.Series(True, index=df.index)
+        if after_offset:
+            # The frame keeps the file's row order, so its index is the row offset
+            mask &= df.index >= after_offset
+        if since is not None:
+            mask &= df['timestamp'] >= pd.Timestamp(since)
+        if until is not None:
+            mask &= df['timestamp'] < pd.Timestamp(until)
+        if sites is not None:
+            mask &= df['site'].isin(list(sites))
+        if product is not None:
+            mask &= df['product'] == product
+
+        return df[mask].reset_index(drop=True)
+
+    def read_appended(self, offset=0):
+        """Offsets count data rows from the top of the file."""
+        with self._lock, file_lock(self.path):
+            if not os.path.exists(self.path):
+                return [], 0
+
+            with open(self.path, 'r', newline='', encoding='utf-8') as file:
+                reader = csv.DictReader(file)
+                if reader.fieldnames is None or any(col not in reader.fieldnames for col in REQUIRED_COLUMNS):
+                    logger.error(f"{self.path} has no usable header - nothing to read")
+                    return [], offset
+
+                skipped = sum(1 for _ in itertools.islice(reader, offset))
+                rows = list(reader)
+
+        if skipped < offset:
+            logger.warning(f"{self.path} has only {skipped} rows, fewer than the {offset} already read - "
+                           "it was replaced, reading on from its end")
+        for row in rows:
+            row['product'] = row.get('product') or DEFAULT_PRODUCT
+        return rows, skipped + len(rows)
+
+    def offset_through(self, timestamp):
+        return sum(1 for row in self.read_records() if row['timestamp'] <= timestamp)
+
+    def rotate_into_archive(self, archived_rows):
+        """
+        Rewrites the CSV without its first archived_rows rows, which now live in the archive.
+        Runs under the file lock, so rows another process appends meanwhile are kept, not lost.
+        The index keeps its totals, so aggregates still describe the whole history.
+        """
+        with self._lock, file_lock(self.path):
+            if not os.path.exists(self.path):
+                return 0
+
+            size_before = os.path.getsize(self.path)
+            kept, dropped = [], 0
+            with open(self.path, 'r', newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    if dropped < archived_rows:
+                        dropped += 1
+                    else:
+                        row['product'] = row.get('product') or DEFAULT_PRODUCT
+                        kept.append(row)
+
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=HISTORY_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(kept)
+            os.replace(temp_path, self.path)
+
+            self._index().mark_rewritten(size_before)
+            logger.info(f"Rotated {dropped} archived rows out of {self.path} ({len(kept)} rows kept)")
+            return dropped
+
+
+class SqliteHistoryStore(HistoryStore):
+    """
+    Price history in a SQLite database - safe for the CLI and the dashboard to use at the same time.
+
+    WAL mode lets readers carry on while a scrape wave is written, every wave is one transaction,
+    and (product, site, timestamp) is indexed so range queries stay fast at millions of rows. Aggregates
+    are kept in a small site_stats table that is updated in the same transaction as the inserts.
+    """
+
+    TABLES = f"""
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            site TEXT NOT NULL,
+            price REAL NOT NULL,
+            is_new_low INTEGER NOT NULL DEFAULT 0,
+            below_threshold INTEGER NOT NULL DEFAULT 0,
+            product TEXT NOT NULL DEFAULT '{DEFAULT_PRODUCT}'
+        );
+    """
+
+    # Created after the product column migration, which older databases need first
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_price_history_site_ts ON price_history (site, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_price_history_ts ON price_history (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_price_history_product_site_ts ON price_history (product, site, timestamp);
+        CREATE TABLE IF NOT EXISTS site_stats (
+            product TEXT NOT NULL,
+            site TEXT NOT NULL,
+            min_price REAL,
+            max_price REAL,
+            count INTEGER NOT NULL,
+            sum_price REAL NOT NULL,
+            last_price REAL,
+            last_timestamp TEXT,
+            PRIMARY KEY (product, site)
+        );
+    """
+
+    INSERT_ROW = """
+        INSERT INTO price_history (timestamp, site, price, is_new_low, below_threshold, product)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    UPSERT_STATS = """
+        INSERT INTO site_stats (product, site, min_price, max_price, count, sum_price, last_price, last_timestamp)
+        VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+        ON CONFLICT (product, site) DO UPDATE SET
+            min_price = MIN(min_price, excluded.min_price),
+            max_price = MAX(max_price, excluded.max_price),
+            count = count + 1,
+            sum_price = sum_price + excluded.sum_price,
+            last_price = CASE WHEN excluded.last_timestamp >= last_timestamp
+                              THEN excluded.last_price ELSE last_price END,
+            last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections can't be shared between threads
+        with self._connection() as connection:
+            connection.executescript(self.TABLES)
+            stats_need_rebuild = self._add_product_column(connection)
+            connection.executescript(self.INDEXES)
+            ensure_rollup_schema(connection)
+        if stats_need_rebuild:
+            self.rebuild_stats()
+
+    @staticmethod
+    def _columns(connection, table):
+        return [row[1] for row in connection.execute(f'PRAGMA table_info({table})')]
+
+    def _add_product_column(self, connection):
+        """
+        Upgrades a database created before products existed: old rows belong to DEFAULT_PRODUCT and
+        site_stats gets (product, site) as its key. Returns True if site_stats must be recomputed.
+        """
+        if 'product' not in self._columns(connection, 'price_history'):
+            connection.execute(
+                f"ALTER TABLE price_history ADD COLUMN product TEXT NOT NULL DEFAULT '{DEFAULT_PRODUCT}'"
+            )
+            logger.info(f"Added a product column to {self.path} (existing rows belong to {DEFAULT_PRODUCT})")
+
+        stats_columns = self._columns(connection, 'site_stats')
+        if stats_columns and 'product' not in stats_columns:
+            connection.execute('DROP TABLE site_stats')
+            return True
+        return False
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA busy_timeout=30000')
+            self._local.connection = connection
+        return connection
+
+    def append_rows(self, rows):
+        values = [
+            (row['timestamp'], row['site'], float(row['price']),
+             int(_to_bool(row.get('is_new_low', False))), int(_to_bool(row.get('below_threshold', False))),
+             row.get('product') or DEFAULT_PRODUCT)
+            for row in rows
+        ]
+
+        # One transaction per wave: the rows, the aggregates and the rollups land together or not at all
+        with self._connection() as connection:
+            connection.executemany(self.INSERT_ROW, values)
+            connection.executemany(
+                self.UPSERT_STATS,
+                [(product, site, price, price, price, price, timestamp)
+                 for timestamp, site, price, _, _, product in values]
+            )
+            connection.executemany(UPSERT_ROLLUP, rollup_values(rows))
+
+    def rebuild_stats(self):
+        """Recomputes site_stats from the raw rows, e.g. after rows were deleted by hand."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM site_stats')
+            connection.execute("""
+                INSERT INTO site_stats (product, site, min_price, max_price, count, sum_price,
+                                        last_price, last_timestamp)
+                SELECT product, site, MIN(price), MAX(price), COUNT(*), SUM(price),
+                       (SELECT price FROM price_history AS latest
+                        WHERE latest.product = grouped.product AND latest.site = grouped.site
+                        ORDER BY timestamp DESC, id DESC LIMIT 1),
+                       MAX(timestamp)
+                FROM price_history AS grouped
+                GROUP BY product, site
+            """)
+
+    @staticmethod
+    def _fold_stats_rows(rows):
+        """site_stats rows (oldest last_timestamp first) -> {product: {'global': stats, 'sites': {site: stats}}}."""
+        products = {}
+        for row in rows:
+            aggregates = products.setdefault(row['product'], empty_aggregates())
+            overall, sites = aggregates['global'], aggregates['sites']
+            stats = {
+                'min': row['min_price'],
+                'max': row['max_price'],
+                'count': row['count'],
+                'sum': row['sum_price'],
+                'last_price': row['last_price'],
+                'first_timestamp': row['first_timestamp'],
+                'last_timestamp': row['last_timestamp']
+            }
+            sites[row['site']] = stats
+
+            overall['count'] += stats['count']
+            overall['sum'] += stats['sum']
+            overall['min'] = stats['min'] if overall['min'] is None else min(overall['min'], stats['min'])
+            overall['max'] = stats['max'] if overall['max'] is None else max(overall['max'], stats['max'])
+            overall['last_price'] = stats['last_price']
+            overall['last_timestamp'] = stats['last_timestamp']
+            if stats['first_timestamp'] and (overall['first_timestamp'] is None
+                                             or stats['first_timestamp'] < overall['first_timestamp']):
+                overall['first_timestamp'] = stats['first_timestamp']
+        return products
+
+    # Each site's first timestamp is one seek on the (product, site, timestamp) index
+    STATS_QUERY = """
+        SELECT stats.*,
+               (SELECT MIN(timestamp) FROM price_history AS history
+                WHERE history.product = stats.product AND history.site = stats.site) AS first_timestamp
+        FROM site_stats AS stats
+    """
+
+    def get_all_aggregates(self):
+        rows = self._connection().execute(f'{self.STATS_QUERY} ORDER BY last_timestamp').fetchall()
+        return self._fold_stats_rows(rows)
+
+    def get_aggregates(self, product=None):
+        rows = self._connection().execute(
+            f'{self.STATS_QUERY} WHERE stats.product = ? ORDER BY last_timestamp', (product or DEFAULT_PRODUCT,)
+        ).fetchall()
+        return self._fold_stats_rows(rows).get(product or DEFAULT_PRODUCT) or empty_aggregates()
+
+    def _where(self, since, until, sites, product=None, after_offset=None):
+        """Builds the WHERE clause so filtering happens inside SQLite, using the indexes."""
+        clauses, params = [], []
+        if after_offset:
+            clauses.append('id > ?')
+            params.append(after_offset)
+        if product is not None:
+            clauses.append('product = ?')
+            params.append(product)
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until)
+        if sites is not None:
+            sites = list(sites)
+            clauses.append(f"site IN ({', '.join('?' * len(sites))})")
+            params.extend(sites)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def read_records(self, since=None, until=None, sites=None, product=None):
+        where, params = self._where(since, until, sites, product)
+        rows = self._connection().execute(
+            f'SELECT timestamp, site, price, is_new_low, below_threshold, product FROM price_history{where} '
+            'ORDER BY timestamp, id',
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def read_appended(self, offset=0):
+        """Offsets are row ids, which only ever grow."""
+        rows = self._connection().execute(
+            'SELECT id, timestamp, site, price, is_new_low, below_threshold, product FROM price_history '
+            'WHERE id > ? ORDER BY id',
+            (offset,)
+        ).fetchall()
+        if not rows:
+            return [], offset
+        return [{key: row[key] for key in HISTORY_FIELDS} for row in rows], rows[-1]['id']
+
+    def offset_through(self, timestamp):
+        row = self._connection().execute(
+            'SELECT COALESCE(MAX(id), 0) FROM price_history WHERE timestamp <= ?', (timestamp,)
+        ).fetchone()
+        return row[0]
+
+    def query_frame(self, since=None, until=None, sites=None, product=None, after_offset=None):
+        import pandas as pd
+
+        where, params = self._where(since, until, sites, product, after_offset)
+        df = pd.read_sql_query(
+            f'SELECT timestamp, site, price, is_new_low, below_threshold, product FROM price_history{where} '
+            'ORDER BY timestamp, id',
+            self._connection(),
+            params=params
+        )
+        df['is_new_low'] = df['is_new_low'].astype(bool)
+        df['below_threshold'] = df['below_threshold'].astype(bool)
+        return _typed_frame(df)
+
+    def import_csv(self, csv_path=HISTORY_FILE, force=False):
+        """
+        Copies every row of an existing history CSV into the database in one transaction.
+        Refuses to run twice unless force=True, so rows are never imported double.
+        """
+        if not force and not self.is_empty():
+            raise RuntimeError(f"{self.path} already contains history - use force=True to import anyway")
+
+        rows = CsvHistoryStore(csv_path).read_records()
+        valid_rows = []
+        for row in rows:
+            try:
+                float(row['price'])
+                valid_rows.append(row)
+            except (ValueError, TypeError):
+                logger.warning(f"Skipping row with invalid price: {row.get('price')}")
+
+        self.append_rows(valid_rows)
+        logger.info(f"Imported {len(valid_rows)} rows from {csv_path} into {self.path}")
+        return len(valid_rows)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(backend=None):
+    """Returns the shared store for the configured HISTORY_BACKEND ('csv' or 'sqlite')."""
+    backend = backend or HISTORY_BACKEND
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == 'sqlite':
+                _stores[backend] = SqliteHistoryStore(HISTORY_DB)
+            elif backend == 'csv':
+                _stores[backend] = CsvHistoryStore(HISTORY_FILE)
+            else:
+                raise ValueError(f"Unknown history backend: {backend}")
+        return _stores[backend]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price history storage tools")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subcommands.add_parser('import-csv', help="Copy an existing CSV history into SQLite")
+    import_parser.add_argument('--csv', default=HISTORY_FILE, help="CSV file to import")
+    import_parser.add_argument('--db', default=HISTORY_DB, help="SQLite database to import into")
+    import_parser.add_argument('--force', action='store_true', help="Import even if the database has data")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'import-csv':
+        try:
+            count = SqliteHistoryStore(args.db).import_csv(args.csv, force=args.force)
+            print(f"✅ Imported {count} rows into {args.db}")
+        except RuntimeError as e:
+            print(f"❌ {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+# structured_data.py - Reads prices from machine-readable data embedded in product pages
+
+import json
+import logging
+import re
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# <script type="application/ld+json"> blocks with schema.org Product/Offer data
+LD_JSON_PATTERN = re.compile(
+    r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Any <meta ...> tag; attributes are picked apart separately so their order doesn't matter
+META_TAG_PATTERN = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+META_ATTRIBUTE_PATTERN = re.compile(r'([\w:-]+)\s*=\s*(["\'])(.*?)\2', re.DOTALL)
+
+# Meta properties that carry a product price (OpenGraph, Facebook catalog and schema.org microdata)
+PRICE_META_NAMES = ('product:price:amount', 'og:price:amount', 'product:sale_price:amount', 'price')
+CURRENCY_META_NAMES = ('product:price:currency', 'og:price:currency', 'pricecurrency')
+
+# Next.js embeds its page props as JSON in a script tag
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Other frameworks assign their state to a window variable, e.g. window.__INITIAL_STATE__ = {...};
+WINDOW_STATE_PATTERN = re.compile(
+    r'window\.(__INITIAL_STATE__|__PRELOADED_STATE__|__NUXT__|__APOLLO_STATE__|__myx)\s*=\s*'
+)
+
+# Keys that usually hold the selling price in a product's node of a hydration blob, best guesses first.
+# They're only looked up in the node a site's 'structured_paths' point at, never anywhere in the blob -
+# recommended products carry the very same keys.
+DEFAULT_PRICE_KEYS = ('sellingPrice', 'finalPrice', 'discountedPrice', 'offerPrice', 'salePrice')
+
+# Stop walking a hydration blob after this many values - some of them describe the whole site
+MAX_NODES_VISITED = 200000
+
+_json_decoder = json.JSONDecoder()
+
+
+def _to_number(value):
+    """Turns 8999, 8999.0, '8999', '8,999.00' or {'value': 8999} into a float, or None."""
+    if isinstance(value, dict):
+        for key in ('value', 'amount', 'decimalValue'):
+            if key in value:
+                return _to_number(value[key])
+        return None
+
+    if isinstance(value, bool):
+        return None
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if isinstance(value, str):
+        cleaned = value.replace(',', '').strip()
+        try:
+            return float(cleaned)
+        except ValueError:
+            return None
+
+    return None
+
+
+def _walk(data):
+    """Yields every dict nested anywhere inside decoded JSON, with an upper bound on work."""
+    stack = [data]
+    visited = 0
+
+    while stack and visited < MAX_NODES_VISITED:
+        node = stack.pop()
+        visited += 1
+
+        if isinstance(node, dict):
+            yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _type_names(node):
+    """Returns the schema.org @type of a node as a set of strings."""
+    node_type = node.get('@type', [])
+    if isinstance(node_type, str):
+        return {node_type}
+    return set(node_type) if isinstance(node_type, list) else set()
+
+
+def _same_page(url, page_url):
+    """Whether two product URLs name the same page, ignoring host, query string and trailing slash."""
+    if not url or not page_url:
+        return False
+    return urlsplit(str(url)).path.rstrip('/').lower() == urlsplit(page_url).path.rstrip('/').lower()
+
+
+def _top_level_nodes(data):
+    """The nodes an ld+json block describes directly: the block itself, its list items or its @graph."""
+    nodes = data if isinstance(data, list) else [data]
+    for node in nodes:
+        if isinstance(node, dict):
+            yield node
+            graph = node.get('@graph')
+            if isinstance(graph, list):
+                yield from (item for item in graph if isinstance(item, dict))
+
+
+def _main_product_offers(blocks, page_url=None, sku=None):
+    """
+    The offer data of the page's own product, leaving out related, similar and recommended products
+    (which schema.org nests inside the main one, or lists next to it). The main product is the one
+    whose url or sku matches the listing, else the only product the page describes at top level.
+    Nothing if that's ambiguous.
+    """
+    products = [node for data in blocks for node in _walk(data) if _type_names(node) & {'Product', 'ProductGroup'}]
+    matching = [product for product in products
+                if _same_page(product.get('url'), page_url)
+                or (sku and str(sku) in {str(product.get(key)) for key in ('sku', 'productID', 'mpn')})]
+    if matching:
+        return [product.get('offers') for product in matching[:1]]
+
+    top_level = [node for data in blocks for node in _top_level_nodes(data)]
+    top_products = [node for node in top_level if _type_names(node) & {'Product', 'ProductGroup'}]
+    if len(top_products) == 1:
+        return [top_products[0].get('offers')]
+    if not products:
+        # Some shops publish a bare Offer for the page
+        return [node for node in top_level if _type_names(node) & {'Offer', 'AggregateOffer'}]
+    return []
+
+
+def _ld_json_candidates(html, page_url=None, sku=None):
+    """Prices from the schema.org Offer/AggregateOffer nodes of the page's own product in ld+json blocks."""
+    blocks = []
+    for match in LD_JSON_PATTERN.finditer(html):
+        try:
+            blocks.append(json.loads(match.group(1).strip()))
+        except ValueError:
+            continue
+
+    for offers in _main_product_offers(blocks, page_url, sku):
+        for node in _walk(offers):
+            if not _type_names(node) & {'Offer', 'AggregateOffer'}:
+                continue
+
+            currency = node.get('priceCurrency')
+            if currency and str(currency).upper() != 'INR':
+                continue
+
+            for key in ('price', 'lowPrice'):
+                price = _to_number(node.get(key))
+                if price is not None:
+                    yield price
+
+            specification = node.get('priceSpecification')
+            if isinstance(specification, dict):
+                price = _to_number(specification.get('price'))
+                if price is not None:
+                    yield price
+
+
+def _meta_candidates(html):
+    """
+    Prices from OpenGraph / microdata meta tags. Tags that disagree give nothing: itemprop="price"
+    also marks the prices in related-product carousels.
+    """
+    prices = []
+    currency = None
+
+    for tag in META_TAG_PATTERN.finditer(html):
+        attributes = {name.lower(): value for name, _, value in META_ATTRIBUTE_PATTERN.findall(tag.group(0))}
+        name = (attributes.get('property') or attributes.get('name') or attributes.get('itemprop') or '').lower()
+
+        if name in PRICE_META_NAMES:
+            price = _to_number(attributes.get('content'))
+            if price is not None:
+                prices.append(price)
+        elif name in CURRENCY_META_NAMES:
+            currency = attributes.get('content', '').upper()
+
+    if (currency and currency != 'INR') or len(set(prices)) > 1:
+        return []
+    return prices
+
+
+def _hydration_blobs(html):
+    """Decoded JSON state objects that JavaScript frameworks embed for hydration."""
+    for match in NEXT_DATA_PATTERN.finditer(html):
+        try:
+            yield json.loads(match.group(1).strip())
+        except ValueError:
+            continue
+
+    for match in WINDOW_STATE_PATTERN.finditer(html):
+        try:
+            data, _ = _json_decoder.raw_decode(html, match.end())
+            yield data
+        except ValueError:
+            continue
+
+
+def _follow_path(data, path):
+    """The value at a dotted path like 'props.pageProps.product' (numbers index lists), or None."""
+    node = data
+    for part in path.split('.'):
+        if isinstance(node, dict):
+            node = node.get(part)
+        elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+            node = node[int(part)]
+        else:
+            return None
+    return node
+
+
+def _hydration_candidates(html, paths, price_keys):
+    """
+    Prices from the page's own product inside hydration blobs: each path leads either to the price
+    itself or to the product's node, whose price_keys are then read in priority order.
+    """
+    for data in _hydration_blobs(html):
+        for path in paths:
+            node = _follow_path(data, path)
+            if isinstance(node, dict) and _to_number(node) is None:
+                values = [node[key] for key in price_keys if key in node]
+            else:
+                values = [node]
+            for value in values:
+                price = _to_number(value)
+                if price is not None:
+                    yield price
+
+
+def find_structured_price(html, is_plausible=None, price_keys=None, page_url=None, sku=None, paths=None):
+    """
+    Looks for the price of the page's own product in its machine-readable data, without building
+    a DOM. Sources are tried from most to least reliable: ld+json offers of the product whose url
+    (page_url) or sku matches, price meta tags, then hydration blobs such as __NEXT_DATA__ or
+    window.__INITIAL_STATE__ - only at the site's configured paths, since those blobs describe
+    every product on the page.
+
+    Returns (price, source), or (None, None) when the page has no usable structured data.
+    """
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+
+    is_plausible = is_plausible or (lambda price: price > 0)
+    price_keys = tuple(price_keys or DEFAULT_PRICE_KEYS)
+
+    sources = (
+        ('ld+json', _ld_json_candidates(html, page_url, sku)),
+        ('meta', _meta_candidates(html)),
+        ('hydration', _hydration_candidates(html, paths or (), price_keys)),
+    )
+
+    for source, candidates in sources:
+        for price in candidates:
+            if is_plausible(price):
+                return price, source
+
+    return None, None
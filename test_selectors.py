@@ -9,8 +9,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
-import re
 from config import WATCH_SITES, USER_AGENT
+from price_parser import parse_price, get_price_bounds
 
 
 class SelectorTester:
@@ -36,38 +36,25 @@ class SelectorTester:
 
         return self.driver
 
-    def extract_price_from_text(self, price_text):
+    def extract_price_from_text(self, price_text, site_config=None):
         """
-        Test version of price extraction - same logic as main script.
+        Test version of price extraction - uses the same shared price parser as the main script.
         This helps you see if your selector is finding the right text.
         """
         if not price_text:
             return None
 
-        # Remove common currency symbols and clean the text
-        cleaned_text = price_text.replace('₹', '').replace(',', '').replace('Rs', '').replace('INR', '')
+        bounds = get_price_bounds(site_config)
+        best = parse_price(price_text, bounds=bounds)
 
-        # Find all number patterns in the text
-        number_patterns = re.findall(r'\d+\.?\d*', cleaned_text)
-
-        if number_patterns:
-            try:
-                # Take the first number found (usually the price)
-                price = float(number_patterns[0])
-
-                # Sanity check: G-Shock watches typically cost between ₹5,000 and ₹15,000
-                if 5000 <= price <= 15000:
-                    return price
-                else:
-                    print(f"    ⚠️  Price {price} seems outside expected range for G-Shock")
-                    return price  # Return anyway, but warn about it
+        if best is None:
+            print(f"    ❌ No valid price found in text: '{price_text}'")
+            return None
 
-            except ValueError:
-                print(f"    ❌ Could not convert '{number_patterns[0]}' to float")
-                return None
+        if not best.in_bounds:
+            print(f"    ⚠️  Price {best.price} seems outside expected range ₹{bounds[0]:,}-₹{bounds[1]:,}")
 
-        print(f"    ❌ No valid price found in text: '{price_text}'")
-        return None
+        return best.price  # Return anyway, but warn about it
 
     def test_static_selector(self, site_name, site_config):
         """
@@ -97,7 +84,7 @@ class SelectorTester:
                 print(f"  Element {i + 1}: '{text}'")
 
                 # Try to extract price from this text
-                price = self.extract_price_from_text(text)
+                price = self.extract_price_from_text(text, site_config)
                 if price:
                     print(f"    ✅ Extracted price: ₹{price}")
                 else:
@@ -113,7 +100,7 @@ class SelectorTester:
                     print(f"  Element {i + 1}: '{text}'")
 
                     # Try to extract price from this text
-                    price = self.extract_price_from_text(text)
+                    price = self.extract_price_from_text(text, site_config)
                     if price:
                         print(f"    ✅ Extracted price: ₹{price}")
                     else:
@@ -123,7 +110,7 @@ class SelectorTester:
             if primary_elements:
                 best_element = primary_elements[0]
                 price_text = best_element.get_text(strip=True)
-                extracted_price = self.extract_price_from_text(price_text)
+                extracted_price = self.extract_price_from_text(price_text, site_config)
 
                 if extracted_price:
                     print(f"\n✅ PRIMARY SELECTOR WORKS PERFECTLY")
@@ -180,7 +167,7 @@ class SelectorTester:
                 print(f"Text content: '{price_text}'")
 
                 # Try to extract price
-                extracted_price = self.extract_price_from_text(price_text)
+                extracted_price = self.extract_price_from_text(price_text, site_config)
                 if extracted_price:
                     print(f"✅ Successfully extracted price: ₹{extracted_price}")
                     primary_success = True
@@ -206,7 +193,7 @@ class SelectorTester:
                     print(f"Text content: '{price_text}'")
 
                     # Try to extract price
-                    extracted_price = self.extract_price_from_text(price_text)
+                    extracted_price = self.extract_price_from_text(price_text, site_config)
                     if extracted_price:
                         print(f"✅ Successfully extracted price: ₹{extracted_price}")
                         backup_success = True
@@ -0,0 +1,122 @@
+# test_circuit_breaker.py - Which scrape outcomes count as the retailer failing
+
+import threading
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+import main
+from catalog import Listing
+from resilience import CircuitBreakers
+
+POLICY = {'attempts': 1, 'failure_threshold': 2, 'cooloff_minutes': 30}
+
+
+class BlockedBrowser:
+    """A browser on a bot wall: every page loads, and the price element never appears."""
+
+    def __init__(self):
+        self.pages = 0
+
+    def get(self, url):
+        self.pages += 1
+
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def execute_script(self, script):
+        return 'complete'
+
+
+class NeverWait:
+    """WebDriverWait that times out straight away instead of after 15 s."""
+
+    def __init__(self, driver, timeout):
+        pass
+
+    def until(self, condition):
+        raise TimeoutException('price element did not appear')
+
+
+class FakeResponse:
+    """A product page whose price element is there, but says no price."""
+    content = b'<html><body><span class="price">Call for price</span></body></html>'
+    headers = {}
+
+
+class BotWallResponse:
+    """A 200 answer that is a captcha page, not the product."""
+    content = b'<html><body><h1>Are you a robot?</h1></body></html>'
+    headers = {}
+
+
+class RateLimiterStub:
+    def acquire(self, url, site_config=None):
+        return 0.0
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    breakers = CircuitBreakers(str(tmp_path / 'circuit_breakers.json'))
+    browser = BlockedBrowser()
+    monkeypatch.setattr(main, 'get_circuit_breakers', lambda: breakers)
+    monkeypatch.setattr(main, 'get_rate_limiter', lambda: RateLimiterStub())
+    monkeypatch.setattr(main, 'WebDriverWait', NeverWait)
+    monkeypatch.setattr(main, 'USE_DRIVER_POOL', False)
+
+    tracker = main.PriceTracker()
+    monkeypatch.setattr(tracker, 'setup_browser', lambda: browser)
+    tracker.breakers, tracker.browser = breakers, browser
+    return tracker
+
+
+def make_listing(site, method='dynamic'):
+    config = {'url': f'https://{site.lower()}.example/phone', 'method': method, 'price_selector': '.price',
+              'backup_selector': '.offer-price', 'wait_time': 0, 'structured_data': False, 'resilience': POLICY}
+    return Listing('phone', site, config)
+
+
+def test_dynamic_site_that_never_shows_a_price_opens_its_circuit(tracker):
+    listing = make_listing('Walled')
+
+    for _ in range(3):
+        assert tracker.scrape_domain_group([listing]) == {}
+
+    # Two waves of selector timeouts trip the breaker; the third wave doesn't open a browser at all
+    assert tracker.breakers.sites['Walled']['state'] == 'open'
+    assert tracker.browser.pages == 2
+
+
+def test_static_bot_wall_opens_its_circuit(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, 'fetch_page_cached', lambda *args, **kwargs: (BotWallResponse(), None))
+    listing = make_listing('Walled', method='static')
+
+    for _ in range(2):
+        tracker.scrape_domain_group([listing])
+
+    assert tracker.breakers.sites['Walled']['state'] == 'open'
+
+
+def test_unreadable_price_text_does_not_count_against_the_site(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, 'fetch_page_cached', lambda *args, **kwargs: (FakeResponse(), None))
+    listing = make_listing('Shop', method='static')
+
+    for _ in range(3):
+        tracker.scrape_domain_group([listing])
+
+    assert tracker.breakers.sites['Shop']['state'] == 'closed'
+
+
+def test_each_thread_reports_its_own_error(tracker):
+    errors = []
+
+    def scrape():
+        tracker.scrape_site('Walled', make_listing('Walled').config)
+        errors.append(type(tracker.last_scrape_error()).__name__)
+
+    thread = threading.Thread(target=scrape)
+    thread.start()
+    thread.join()
+
+    assert errors == ['PriceElementMissing']
+    assert tracker.last_scrape_error() is None
@@ -0,0 +1,42 @@
+# test_deal_rules.py - Which retailers the spread rule compares a fresh price with
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from deal_rules import DealRules
+
+NOW = datetime(2025, 6, 6, 12, 0, 0)
+RULES = DealRules([{'rule': 'spread', 'percent': 10, 'max_age_hours': 18}])
+
+
+def make_state(last_prices):
+    """One product's state table from {site: (last_price, last_seen)}."""
+    index = pd.MultiIndex.from_tuples([('phone', site) for site in last_prices], names=['product', 'site'])
+    return pd.DataFrame({
+        'threshold': 0.0,
+        'site_low': [price for price, _ in last_prices.values()],
+        'last_price': [price for price, _ in last_prices.values()],
+        'product_low': 0.0,
+        'last_seen': pd.to_datetime([seen for _, seen in last_prices.values()]),
+    }, index=index)
+
+
+def test_recent_price_of_unchecked_retailer_counts():
+    state = make_state({'Amazon': (10000, NOW - timedelta(hours=1)), 'Flipkart': (10000, NOW - timedelta(hours=6))})
+    reasons = RULES.evaluate({('phone', 'Amazon'): 8500}, state, now=NOW)
+
+    assert 'Flipkart' in reasons[('phone', 'Amazon')][0]
+
+
+def test_stale_price_of_unchecked_retailer_is_ignored():
+    state = make_state({'Amazon': (10000, NOW - timedelta(hours=1)), 'Flipkart': (10000, NOW - timedelta(days=30))})
+
+    assert RULES.evaluate({('phone', 'Amazon'): 8500}, state, now=NOW) == {}
+
+
+def test_prices_checked_in_the_wave_always_count():
+    state = make_state({'Amazon': (10000, NOW - timedelta(days=30)), 'Flipkart': (10000, NOW - timedelta(days=30))})
+    reasons = RULES.evaluate({('phone', 'Amazon'): 8500, ('phone', 'Flipkart'): 9900}, state, now=NOW)
+
+    assert list(reasons) == [('phone', 'Amazon')]
@@ -0,0 +1,51 @@
+# test_history_rollups.py - Rollups catch up with history saved before they existed
+
+import pytest
+
+import history_archive
+import history_index
+import history_rollups
+import storage
+from config import HISTORY_FILE
+
+PRODUCT = 'phone'
+
+
+@pytest.fixture
+def fresh_stores(tmp_path, monkeypatch):
+    """The configured CSV store, index, archive and rollups - all new, and all in an empty folder."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, '_stores', {})
+    monkeypatch.setattr(history_index, '_indexes', {})
+    monkeypatch.setattr(history_rollups, '_rollup_stores', {})
+    monkeypatch.setattr(history_archive, '_shared_archive', history_archive.HistoryArchive(root=str(tmp_path / 'archive')))
+    return storage.get_history_store('csv')
+
+
+def write_history_before_rollups(lines):
+    with open(HISTORY_FILE, 'w', encoding='utf-8') as file:
+        file.write('timestamp,site,price,is_new_low,below_threshold,product\n')
+        file.writelines(f'{line},False,False,{PRODUCT}\n' for line in lines)
+
+
+def test_history_from_before_the_upgrade_is_rolled_up_on_first_read(fresh_stores):
+    write_history_before_rollups(['2025-01-10 09:00:00,Amazon,12000', '2025-01-10 09:30:00,Amazon,9000',
+                                  '2025-01-10 10:00:00,Amazon,11500'])
+    # The first save after upgrading starts filling the rollups
+    fresh_stores.append_rows([{'timestamp': '2025-06-06 12:00:00', 'site': 'Amazon', 'price': 11000,
+                               'product': PRODUCT}])
+
+    days = history_rollups.get_rollup_store('csv').read_frame('day', product=PRODUCT)
+
+    assert list(days['timestamp'].dt.strftime('%Y-%m-%d')) == ['2025-01-10', '2025-06-06']
+    january = days.iloc[0]
+    assert (january['open'], january['low'], january['high'], january['close']) == (12000, 9000, 12000, 11500)
+
+
+def test_rollups_that_cover_the_history_are_not_rebuilt(fresh_stores, monkeypatch):
+    fresh_stores.append_rows([{'timestamp': '2025-06-06 12:00:00', 'site': 'Amazon', 'price': 11000,
+                               'product': PRODUCT}])
+    rollups = history_rollups.get_rollup_store('csv')
+    monkeypatch.setattr(rollups, 'rebuild', lambda store: pytest.fail("rollups were rebuilt"))
+
+    assert len(rollups.read_frame('hour', product=PRODUCT)) == 1
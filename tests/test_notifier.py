@@ -0,0 +1,177 @@
+# test_notifier.py - The notifier against a small in-process SMTP server: one login per batch, and back after a drop
+
+import email
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from notifier import EmailNotifier
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib without TLS or login: EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.clients.append(self.request)
+        self.reply('220 stub ESMTP ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stub')
+            elif command.startswith('MAIL'):
+                if server.drop_next_mail:
+                    server.drop_next_mail = False
+                    return  # Hang up mid-conversation, like a server restarting
+                self.reply('250 OK')
+            elif command.startswith(('RCPT', 'NOOP', 'RSET')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                message = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                if server.reject_next_message:
+                    server.reject_next_message = False
+                    self.reply('554 Message rejected')
+                    continue
+                with server.lock:
+                    server.messages.append(message)
+                self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpStubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.clients = []
+        self.messages = []
+        self.drop_next_mail = False
+        self.reject_next_message = False
+
+    def drop_clients(self):
+        """Closes every open connection from the server's side, like an idle timeout on the mail server."""
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def smtp_server():
+    server = SmtpStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_notifier(server, digest, test_mode=False):
+    config = {'email': 'tracker@example.com', 'password': '', 'smtp_server': '127.0.0.1',
+              'smtp_port': server.server_address[1], 'use_tls': False}
+    return EmailNotifier(config, digest=digest, idle_timeout=60, test_mode=test_mode)
+
+
+def make_alerts(*sites):
+    return [{'product_name': 'Phone', 'site': site, 'price': 9999.0, 'threshold': 10000.0,
+             'historical_low': 9999.0, 'reason': 'At/below your target', 'url': f'https://{site}.example/phone'}
+            for site in sites]
+
+
+def test_batch_of_emails_shares_one_connection(smtp_server):
+    notifier = make_notifier(smtp_server, digest=False)
+    notifier.send_alerts(make_alerts('Amazon', 'Flipkart', 'Croma'))
+    notifier.send_alerts(make_alerts('Tata CLiQ', 'Reliance'))
+    assert notifier.flush(timeout=10)
+
+    assert notifier.emails_sent == 5
+    assert len(smtp_server.messages) == 5
+    assert notifier.connections_opened == smtp_server.connections == 1
+    notifier.close()
+
+
+def test_digest_sends_one_email_per_wave(smtp_server):
+    notifier = make_notifier(smtp_server, digest=True)
+    notifier.send_alerts(make_alerts('Amazon', 'Flipkart', 'Croma'))
+    assert notifier.flush(timeout=10)
+
+    assert notifier.emails_sent == 1
+    assert notifier.alerts_sent == 3
+    body = email.message_from_bytes(smtp_server.messages[0]).get_payload(0).get_payload(decode=True).decode()
+    assert all(site in body for site in ('Amazon', 'Flipkart', 'Croma'))
+    notifier.close()
+
+
+def test_reconnects_after_server_closes_idle_connection(smtp_server):
+    notifier = make_notifier(smtp_server, digest=True)
+    notifier.send_alerts(make_alerts('Amazon'))
+    assert notifier.flush(timeout=10)
+
+    smtp_server.drop_clients()
+    notifier.send_alerts(make_alerts('Flipkart'))
+    assert notifier.flush(timeout=10)
+
+    assert notifier.emails_sent == 2
+    assert notifier.connections_opened == smtp_server.connections == 2
+    assert notifier.last_error is None
+    notifier.close()
+
+
+def test_resends_message_when_connection_drops_mid_send(smtp_server):
+    notifier = make_notifier(smtp_server, digest=True)
+    notifier.send_alerts(make_alerts('Amazon'))
+    assert notifier.flush(timeout=10)
+
+    # The connection still answers NOOP, then goes away once the message is under way
+    smtp_server.drop_next_mail = True
+    notifier.send_alerts(make_alerts('Flipkart'))
+    assert notifier.flush(timeout=10)
+
+    assert notifier.emails_sent == 2
+    assert len(smtp_server.messages) == 2
+    assert notifier.connections_opened == 2
+    assert notifier.last_error is None
+    notifier.close()
+
+
+def test_one_rejected_email_does_not_hold_back_the_others(smtp_server):
+    notifier = make_notifier(smtp_server, digest=False)
+    smtp_server.reject_next_message = True
+    notifier.send_alerts(make_alerts('Amazon', 'Flipkart', 'Croma'))
+    assert notifier.flush(timeout=10)
+
+    assert notifier.emails_sent == notifier.alerts_sent == 2
+    assert len(smtp_server.messages) == 2
+    assert notifier.last_error is not None
+    notifier.close()
+
+
+def test_test_mode_queues_nothing(smtp_server):
+    notifier = make_notifier(smtp_server, digest=False, test_mode=True)
+
+    assert notifier.send_alerts(make_alerts('Amazon', 'Flipkart')) == 0
+    assert notifier.flush(timeout=10)
+    assert smtp_server.connections == 0
+    notifier.close()
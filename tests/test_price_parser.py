@@ -0,0 +1,63 @@
+# test_price_parser.py - Which amount the price engine picks when a page offers several
+
+import pytest
+
+from html_parsers import available_backends, parse_html
+from price_parser import parse_candidates, parse_price
+
+BOUNDS = (5000, 15000)
+
+# The product's own price has dropped below the bounds; a recommended product below it is in bounds
+DECOY_PAGE = """
+<html><body>
+  <div id="corePrice"><span class="a-price-whole">4,499</span></div>
+  <div class="recommendations">
+    <div class="sponsored"><span class="a-price-whole">9,195</span></div>
+  </div>
+</body></html>
+"""
+
+
+def test_first_match_wins_over_in_bounds_decoy():
+    best = parse_candidates(['₹4,499', '₹9,195'], bounds=BOUNDS)
+
+    assert best.price == 4499
+    assert not best.in_bounds
+
+
+@pytest.mark.parametrize('backend', [name for name in ('html.parser', 'lxml') if name in available_backends()])
+def test_real_price_below_bounds_is_not_replaced_by_recommendation(backend):
+    page = parse_html(DECOY_PAGE, backend=backend, selectors=['.a-price-whole'])
+    best = parse_candidates(page.select_all_candidates('.a-price-whole'), bounds=BOUNDS)
+
+    assert best.price == 4499
+    assert not best.in_bounds
+
+
+def test_struck_price_only_used_when_nothing_else_parses():
+    candidates = [{'text': '₹12,995', 'struck': True}, {'text': 'Deal: ₹8,999', 'struck': False}]
+    assert parse_candidates(candidates, bounds=BOUNDS).price == 8999
+
+    assert parse_candidates([{'text': '₹12,995', 'struck': True}, 'Out of stock'], bounds=BOUNDS).price == 12995
+
+
+def test_text_without_amount_is_skipped():
+    assert parse_candidates(['Currently unavailable', '₹7,250'], bounds=BOUNDS).price == 7250
+    assert parse_candidates(['Currently unavailable'], bounds=BOUNDS) is None
+
+
+def test_sale_price_beats_mrp_within_one_text():
+    assert parse_price('M.R.P.: ₹12,995 Deal price: ₹8,999', bounds=BOUNDS).price == 8999
+
+
+def test_partial_parse_keeps_the_strike_through_around_a_price():
+    page_html = """
+    <html><body><div class="pdp">
+      <del><span class="price">₹12,995</span></del>
+      <span class="price">₹8,999</span>
+    </div></body></html>
+    """
+    page = parse_html(page_html, backend='html.parser', selectors=['.price'], partial=True)
+
+    assert page.select_all_candidates('.price') == [{'text': '₹12,995', 'struck': True},
+                                                     {'text': '₹8,999', 'struck': False}]
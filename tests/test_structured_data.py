@@ -0,0 +1,50 @@
+# test_structured_data.py - Structured data gives the page's own price, not a related product's
+
+import json
+
+from structured_data import find_structured_price
+
+PAGE_URL = 'https://shop.example/casio-ga-2100/p/123?ref=home'
+
+
+def ld_json(*blocks):
+    return ''.join(f'<script type="application/ld+json">{json.dumps(block)}</script>' for block in blocks)
+
+
+def offer(price):
+    return {'@type': 'Offer', 'price': price, 'priceCurrency': 'INR'}
+
+
+def test_ld_json_takes_the_product_whose_url_matches_the_listing():
+    html = ld_json(
+        {'@type': 'Product', 'name': 'Bundle', 'url': 'https://shop.example/bundle/p/9', 'offers': offer(4999)},
+        {'@type': 'Product', 'name': 'Casio', 'url': 'https://shop.example/casio-ga-2100/p/123/',
+         'offers': offer(9195)},
+    )
+
+    assert find_structured_price(html, page_url=PAGE_URL) == (9195.0, 'ld+json')
+
+
+def test_ld_json_skips_related_products_nested_in_the_main_one():
+    html = ld_json({'@type': 'Product', 'name': 'Casio', 'offers': offer(9195),
+                    'isRelatedTo': [{'@type': 'Product', 'name': 'Strap', 'offers': offer(499)}]})
+
+    assert find_structured_price(html, page_url=PAGE_URL) == (9195.0, 'ld+json')
+
+
+def test_ld_json_with_several_unmatched_products_is_not_trusted():
+    html = ld_json({'@graph': [{'@type': 'Product', 'offers': offer(499)}, {'@type': 'Product', 'offers': offer(9195)}]})
+
+    assert find_structured_price(html, page_url=PAGE_URL) == (None, None)
+
+
+def test_hydration_reads_only_the_configured_path():
+    state = {'pdpData': {'price': {'mrp': 10995, 'discounted': 9195}},
+             'recommendations': [{'name': 'Strap', 'price': 499, 'discounted': 449}]}
+    html = f'<script>window.__myx = {json.dumps(state)};</script>'
+
+    found = find_structured_price(html, price_keys=['discounted'], paths=['pdpData.price'])
+    assert found == (9195.0, 'hydration')
+
+    # Without a path, the recommendations' keys are no reason to guess
+    assert find_structured_price(html, price_keys=['discounted']) == (None, None)